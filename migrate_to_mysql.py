@@ -13,6 +13,7 @@ from pathlib import Path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from yearplan.mysql_storage import MySQLStorage
+from yearplan import mysql_migrations
 
 def migrate_json_to_mysql(json_file_path=None):
     """Migrate data from JSON file to MySQL database"""
@@ -38,7 +39,8 @@ def migrate_json_to_mysql(json_file_path=None):
     
     # Initialize MySQL storage
     try:
-        storage = MySQLStorage()
+        storage = MySQLStorage(check_schema=False)
+        mysql_migrations.migrate(storage)
         print("Connected to MySQL database")
     except Exception as e:
         print(f"Error connecting to MySQL: {e}")
@@ -101,8 +103,15 @@ def migrate_json_to_mysql(json_file_path=None):
                 goals_failed += 1
                 continue
             
+            # Goals are owned by users.id
+            user = storage.get_user_by_email(user_email)
+            if not user:
+                print(f"Skipping goal {title}: no user {user_email}")
+                goals_failed += 1
+                continue
+
             # Add goal to MySQL
-            created_goal = storage.add_goal(user_email, title, description, target_date)
+            created_goal = storage.add_goal(user['id'], title, description, target_date)
             
             if created_goal:
                 goals_migrated += 1
@@ -111,7 +120,7 @@ def migrate_json_to_mysql(json_file_path=None):
                 # Update status if different from default
                 goal_status = goal.get('status', 'active')
                 if goal_status != 'active':
-                    storage.update_goal_status(created_goal['id'], goal_status, user_email)
+                    storage.update_goal_status(created_goal['id'], goal_status, user['id'])
             else:
                 goals_failed += 1
                 print(f"✗ Failed to migrate goal: {title} for {user_email}")
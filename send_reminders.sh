@@ -5,6 +5,9 @@
 # To set up as a cron job, add this line to your crontab:
 # 0 9 * * * /Users/jidai/workspace1/yearplan/send_reminders.sh
 # (This runs daily at 9 AM)
+#
+# Not needed when the app runs with YEARPLAN_REMINDER_SCHEDULER=1, which sends
+# reminders from a background thread as they fall due (yearplan/reminder_scheduler.py)
 
 # Change to the project directory
 cd /Users/jidai/workspace1/yearplan
@@ -17,6 +17,7 @@ os.environ['MYSQL_PASSWORD'] = 'dev_password_123'
 os.environ['MYSQL_DATABASE'] = 'yearplan_dev'
 os.environ['HOST_LINK'] = 'http://localhost:8081'
 os.environ['FLASK_SECRET_KEY'] = 'dev-secret-key-for-testing'
+os.environ.setdefault('YEARPLAN_AUTO_MIGRATE', '1')
 
 def main():
     print('='*60)
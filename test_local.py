@@ -131,7 +131,7 @@ def main():
                     # First, get the goal ID from database
                     with storage.get_connection() as conn:
                         cursor = conn.cursor()
-                        cursor.execute("SELECT id FROM goals WHERE user_email = %s ORDER BY created_at DESC LIMIT 1", (test_email,))
+                        cursor.execute("SELECT g.id FROM goals g JOIN users u ON u.id = g.user_id WHERE u.email = %s ORDER BY g.created_at DESC LIMIT 1", (test_email,))
                         result = cursor.fetchone()
                         if result:
                             goal_id = result[0]
@@ -38,3 +38,57 @@ def test_edit_and_delete_log(tmp_path):
     r2 = client.delete(f'/api/logs/{lid}')
     assert r2.status_code == 200
     assert r2.get_json().get('ok') is True
+
+
+def test_logs_keyset_pagination_and_ndjson(tmp_path):
+    import json
+    setup_temp_db(tmp_path)
+    gid = storage.add_goal_with_meta('Paged', start_date='2025-10-01', end_date='2025-10-10', target=10)
+    other = storage.add_goal_with_meta('Other', start_date='2025-10-01', end_date='2025-10-10', target=10)
+    for day in (3, 1, 2, 2, 5):
+        storage.add_log(gid, 'increment', value=day, ts=f'2025-10-0{day}')
+    storage.add_log(other, 'increment', value=1, ts='2025-10-04')
+    client = app.test_client()
+
+    seen, cursor = [], None
+    while True:
+        r = client.get('/api/logs', query_string={'limit': 2, **({'cursor': cursor} if cursor else {})})
+        assert r.status_code == 200
+        page = r.get_json()
+        assert len(page) <= 2
+        seen.extend(page)
+        cursor = r.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert [(l['ts'], l['id']) for l in seen] == sorted(((l['ts'], l['id']) for l in storage.list_logs()), reverse=True)
+
+    r = client.get(f'/api/goals/{gid}/logs?format=ndjson')
+    assert r.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+    assert [l['ts'] for l in rows] == ['2025-10-05', '2025-10-03', '2025-10-02', '2025-10-02', '2025-10-01']
+
+    assert client.get('/api/logs?cursor=bogus').status_code == 400
+
+
+def test_logs_without_limit_return_full_history(tmp_path, monkeypatch):
+    from yearplan import pagination
+    setup_temp_db(tmp_path)
+    monkeypatch.setattr(pagination, 'DEFAULT_LIMIT', 2)
+    gid = storage.add_goal_with_meta('Long', start_date='2025-10-01', end_date='2025-10-10', target=10)
+    for day in range(1, 6):
+        storage.add_log(gid, 'increment', value=day, ts=f'2025-10-0{day}')
+    client = app.test_client()
+
+    calls = []
+    page_logs = storage.page_logs
+    monkeypatch.setattr(storage, 'page_logs', lambda **kw: calls.append(kw) or page_logs(**kw))
+    for url in ('/api/logs', f'/api/goals/{gid}/logs'):
+        r = client.get(url)
+        assert len(r.get_json()) == 5 and 'X-Next-Cursor' not in r.headers
+    assert calls == [{'user_id': None}]  # the full history is one unbounded read, not a walk over pages
+    monkeypatch.setattr(storage, 'page_logs', page_logs)
+    r = client.get('/api/logs?limit=3')
+    assert len(r.get_json()) == 3
+    # a cursor without a limit pages with DEFAULT_LIMIT
+    r = client.get('/api/logs', query_string={'cursor': r.headers['X-Next-Cursor']})
+    assert [l['ts'] for l in r.get_json()] == ['2025-10-02', '2025-10-01']
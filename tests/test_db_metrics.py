@@ -0,0 +1,43 @@
+import sqlite3
+from flask import Flask, jsonify
+from yearplan import db_metrics
+
+
+def test_fingerprint_strips_literals_and_collapses_in_lists():
+    fp = db_metrics.fingerprint("""
+        SELECT id FROM goals
+        WHERE user_id = %s AND title = 'x' AND id IN (%s, %s, %s) LIMIT 200
+    """)
+    assert fp == "SELECT id FROM goals WHERE user_id = ? AND title = ? AND id IN (...) LIMIT ?"
+    assert db_metrics.fingerprint("SELECT * FROM goals WHERE id IN (1,2)") == \
+        db_metrics.fingerprint("SELECT * FROM goals WHERE id IN (%s)")
+
+
+def test_request_summary_header_and_slow_buffer(monkeypatch):
+    monkeypatch.setattr(db_metrics, 'SLOW_QUERY_MS', 0)
+    db_metrics.clear_slow_queries()
+    db = sqlite3.connect(':memory:')
+    db.execute("CREATE TABLE goals (id INTEGER PRIMARY KEY)")
+    db.executemany("INSERT INTO goals VALUES (?)", [(i,) for i in range(5)])
+
+    app = Flask(__name__)
+    db_metrics.init_app(app)
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        conn = db_metrics.InstrumentedConnection(db)
+        db_metrics.record_acquire(1.5)
+        for gid in range(3):
+            conn.cursor().execute("SELECT id FROM goals WHERE id = ?", (gid,))
+        return jsonify({})
+
+    resp = app.test_client().get('/n-plus-one')
+    assert resp.headers['Server-Timing'].startswith('db;dur=')
+    assert 'desc="3 queries"' in resp.headers['Server-Timing']
+    assert 'db-acquire;dur=1.5' in resp.headers['Server-Timing']
+
+    slow = db_metrics.slow_queries()
+    assert len(slow) == 3
+    assert {q['fingerprint'] for q in slow} == {"SELECT id FROM goals WHERE id = ?"}
+    assert all(q['path'] == '/n-plus-one' for q in slow)
+    db_metrics.clear_slow_queries()
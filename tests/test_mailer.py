@@ -0,0 +1,91 @@
+import smtplib
+from email.mime.text import MIMEText
+from yearplan import mailer as mailer_mod
+from yearplan.mailer import SMTPMailer
+
+
+class FakeSMTP:
+    opened = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.logins = 0
+        self.tls = False
+        self.drop_next = False
+        FakeSMTP.opened.append(self)
+
+    def starttls(self):
+        self.tls = True
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def send_message(self, msg):
+        if self.drop_next:
+            self.drop_next = False
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        if msg['To'] == 'bad@x':
+            raise smtplib.SMTPRecipientsRefused({'bad@x': (550, b'no such user')})
+        self.sent.append(msg['To'])
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _msg(to):
+    msg = MIMEText('hi')
+    msg['To'] = to
+    return msg
+
+
+def test_mailer_reuses_session_rotates_and_reconnects(monkeypatch):
+    FakeSMTP.opened = []
+    monkeypatch.setattr(mailer_mod.smtplib, 'SMTP', FakeSMTP)
+    cfg = {'smtp_server': 'smtp.test', 'smtp_port': 587, 'email': 'me@x', 'password': 'pw'}
+
+    with SMTPMailer(cfg, max_per_connection=3) as m:
+        for i in range(5):
+            m.send(_msg(f'u{i}@x'))
+        # 3 on the first session, then a fresh one; one login per session
+        assert [s.sent for s in FakeSMTP.opened] == [['u0@x', 'u1@x', 'u2@x'], ['u3@x', 'u4@x']]
+        assert all(s.tls and s.logins == 1 for s in FakeSMTP.opened)
+
+        # server dropped the idle session: reconnect once and deliver
+        FakeSMTP.opened[-1].drop_next = True
+        m.send(_msg('u5@x'))
+        assert FakeSMTP.opened[-1].sent == ['u5@x'] and m.reconnects == 1
+
+        # a refused recipient is the caller's error; the session stays
+        try:
+            m.send(_msg('bad@x'))
+        except smtplib.SMTPRecipientsRefused:
+            pass
+        else:
+            raise AssertionError('expected SMTPRecipientsRefused')
+        m.send(_msg('u6@x'))
+        assert len(FakeSMTP.opened) == 3 and m.sent == 7
+
+
+def test_mailer_closes_session_when_login_fails(monkeypatch):
+    class RejectingSMTP(FakeSMTP):
+        quits = 0
+
+        def login(self, user, password):
+            raise smtplib.SMTPAuthenticationError(535, b'bad credentials')
+
+        def quit(self):
+            RejectingSMTP.quits += 1
+
+    FakeSMTP.opened = []
+    monkeypatch.setattr(mailer_mod.smtplib, 'SMTP', RejectingSMTP)
+    m = SMTPMailer({'smtp_server': 'smtp.test', 'smtp_port': 587, 'email': 'me@x', 'password': 'pw'})
+    try:
+        m.send(_msg('u0@x'))
+    except smtplib.SMTPAuthenticationError:
+        pass
+    else:
+        raise AssertionError('expected SMTPAuthenticationError')
+    assert len(FakeSMTP.opened) == 1 and RejectingSMTP.quits == 1 and m._server is None
@@ -0,0 +1,220 @@
+import random
+import re
+import sqlite3
+from datetime import date
+from yearplan.mysql_pool import ConnectionPool
+from yearplan.mysql_storage import (MySQLStorage, current_value_from_aggregate, current_value_from_goal_state,
+                                    goal_columns, goal_extras, goal_fields)
+
+
+class _Cursor:
+    """Just enough of a pymysql cursor over sqlite3 for the aggregate and goal_state queries.
+
+    Dict rows when created with a cursor class (DictCursor), tuples otherwise.
+    """
+
+    def __init__(self, db, as_dict=False):
+        self.db = db
+        self.as_dict = as_dict
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @staticmethod
+    def _sql(sql):
+        sql = sql.replace('%s', '?').replace(' FOR UPDATE', '')
+        if 'ON DUPLICATE KEY UPDATE' in sql:
+            sql = re.sub(r'VALUES\((\w+)\)', r'excluded.\1',
+                         sql.replace('ON DUPLICATE KEY UPDATE', 'ON CONFLICT(goal_id) DO UPDATE SET'))
+        return sql
+
+    def execute(self, sql, params=()):
+        self.cur = self.db.execute(self._sql(sql), params)
+        self.rowcount, self.lastrowid = self.cur.rowcount, self.cur.lastrowid
+
+    def executemany(self, sql, rows):
+        self.cur = self.db.executemany(self._sql(sql), rows)
+        self.rowcount = self.cur.rowcount
+
+    def _row(self, row):
+        if row is None or not self.as_dict:
+            return row
+        return dict(zip([d[0] for d in self.cur.description], row))
+
+    def fetchone(self):
+        return self._row(self.cur.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self.cur.fetchall()]
+
+
+class _Conn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *cls):
+        return _Cursor(self.db, as_dict=bool(cls))
+
+    def ping(self, reconnect=False):
+        pass
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        pass
+
+
+def _storage(db):
+    storage = MySQLStorage.__new__(MySQLStorage)
+    storage.pool = ConnectionPool(lambda: _Conn(db), max_size=1)
+    return storage
+
+
+def test_log_aggregates_match_replaying_logs():
+    db = sqlite3.connect(':memory:')
+    db.executescript("""
+        CREATE TABLE goals (id INTEGER PRIMARY KEY, user_id INT);
+        CREATE TABLE goal_logs (id INTEGER PRIMARY KEY, goal_id INT, user_id INT,
+                                action TEXT, value REAL, created_at TEXT);
+    """)
+    rng = random.Random(13)
+    logs = {}
+    for gid in range(1, 31):
+        db.execute("INSERT INTO goals VALUES (?, ?)", (gid, 1 if gid <= 25 else 2))
+        logs[gid] = []
+    for lid in range(1, 400):
+        gid = rng.randint(1, 20)  # goals 21-25 keep no logs
+        action = rng.choice(['increment', 'decrement', 'update'])
+        value = float(rng.randint(0, 50))
+        created = f"2025-01-{rng.randint(1, 28):02d} 10:00:00"
+        db.execute("INSERT INTO goal_logs VALUES (?, ?, 1, ?, ?, ?)", (lid, gid, action, value, created))
+        logs[gid].append((created, lid, action, value))
+
+    aggs = _storage(db).get_goal_log_aggregates(1)
+
+    assert set(aggs) == set(range(1, 26))
+    for gid in range(1, 26):
+        current = 5
+        for _, _, action, value in sorted(logs[gid]):
+            if action == 'increment':
+                current += value
+            elif action == 'decrement':
+                current -= value
+            else:
+                current = value
+        assert aggs[gid]['log_count'] == len(logs[gid])
+        assert current_value_from_aggregate(5, aggs[gid]) == current
+    assert current_value_from_aggregate(5, aggs[21]) == 5
+
+
+def test_goal_fields_prefer_typed_columns_and_fall_back_to_json():
+    desc = '{"task_type": "Decrement", "target": "70", "start_value": 90, "start_date": "2025-02-01T00:00"}'
+    assert goal_columns(goal_extras(desc)) == (90.0, 70.0, 'decrement', date(2025, 2, 1))
+    assert goal_columns(goal_extras('free text')) == (0.0, None, 'increment', None)
+
+    legacy = {'description': desc, 'task_type': None}
+    assert goal_fields(legacy)['target'] == '70'
+    typed = {'description': '{}', 'task_type': 'decrement', 'start_value': 90.0, 'target': 70.0,
+             'start_date': date(2025, 2, 1)}
+    assert goal_fields(typed) == {'start_value': 90.0, 'target': 70.0, 'task_type': 'decrement',
+                                  'start_date': '2025-02-01'}
+
+
+GOAL_STATE_SCHEMA = """
+    CREATE TABLE goals (id INTEGER PRIMARY KEY, user_id INT, description TEXT, start_value REAL,
+                        target REAL, task_type TEXT, start_date TEXT);
+    CREATE TABLE goal_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, goal_id INT, user_id INT, action TEXT,
+                            value REAL, created_at TEXT DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE goal_state (goal_id INTEGER PRIMARY KEY, current_value REAL, log_count INT,
+                             last_log_at TEXT, percent REAL, is_completed INT);
+"""
+
+
+def _goal_state_rows(db):
+    return db.execute("SELECT goal_id, current_value, log_count, last_log_at, percent, is_completed "
+                      "FROM goal_state ORDER BY goal_id").fetchall()
+
+
+def test_incremental_goal_state_matches_rebuild_with_deletes():
+    db = sqlite3.connect(':memory:')
+    db.executescript(GOAL_STATE_SCHEMA)
+    kinds = [(0, 100, 'increment'), (90, 70, 'decrement'), (0, None, 'increment'), (0, 100, 'percentage'),
+             (10, 10, 'increment'), (5, 50, None)]  # task_type NULL: fields come from the description
+    for gid, (start, target, task_type) in enumerate(kinds, start=1):
+        desc = '{"start_value": %d, "target": 40, "task_type": "increment"}' % start
+        db.execute("INSERT INTO goals VALUES (?, 1, ?, ?, ?, ?, '2025-01-01')", (gid, desc, start, target, task_type))
+    storage = _storage(db)
+    rng = random.Random(7)
+    live = []
+    replay = {gid: [] for gid in range(1, len(kinds) + 1)}
+    for step in range(400):
+        if live and rng.random() < 0.25:
+            lid = live.pop(rng.randrange(len(live)))
+            assert storage.delete_log(lid, 1)
+            for logs in replay.values():
+                logs[:] = [entry for entry in logs if entry[0] != lid]
+        else:
+            gid = rng.randint(1, len(kinds))
+            action = rng.choice(['increment', 'decrement', 'update'])
+            value = float(rng.randint(0, 30))
+            row = storage.add_goal_log(gid, 1, action, value)
+            live.append(row['id'])
+            replay[gid].append((row['id'], action, value))
+        if step % 50 == 49:
+            incremental = _goal_state_rows(db)
+            assert storage.rebuild_goal_states(batch_size=4) == len(kinds)
+            assert _goal_state_rows(db) == incremental
+
+    assert not storage.delete_log(10 ** 6, 1)
+    states = storage.get_goal_states(1)
+    for gid, (start, _, _) in enumerate(kinds, start=1):
+        current = start
+        for _, action, value in replay[gid]:
+            current = value if action == 'update' else current + (value if action == 'increment' else -value)
+        assert states[gid]['log_count'] == len(replay[gid])
+        assert current_value_from_goal_state(start, states[gid]) == current
+
+
+def test_deleting_logs_reverts_to_earlier_update():
+    db = sqlite3.connect(':memory:')
+    db.executescript(GOAL_STATE_SCHEMA)
+    db.execute("INSERT INTO goals VALUES (1, 1, '{}', 0, 100, 'increment', '2025-01-01')")
+    storage = _storage(db)
+    ids = [storage.add_goal_log(1, 1, action, value)['id']
+           for action, value in [('update', 10), ('increment', 5), ('update', 3), ('increment', 1)]]
+    assert storage.get_goal_states(1)[1]['current_value'] == 4
+    assert storage.delete_log(ids[3], 1)    # rollback of the newest log
+    assert storage.get_goal_states(1)[1]['current_value'] == 3
+    assert storage.delete_log(ids[2], 1)    # the earlier 'update' applies again
+    state = storage.get_goal_states(1)[1]
+    assert (state['current_value'], state['log_count'], state['percent']) == (15, 2, 15)
+    assert not storage.delete_log(ids[0], 2)  # another user's log
+    for lid in ids[:2]:
+        storage.delete_log(lid, 1)
+    assert current_value_from_goal_state(0, storage.get_goal_states(1)[1]) == 0
+
+    # rows missing from goal_state (goals older than the table) are rebuilt on read
+    storage.add_goal_log(1, 1, 'increment', 7)
+    db.execute("DELETE FROM goal_state")
+    assert storage.get_goal_states(1)[1]['current_value'] == 7
+
+
+def test_logging_against_another_users_goal_is_refused():
+    db = sqlite3.connect(':memory:')
+    db.executescript(GOAL_STATE_SCHEMA)
+    db.execute("INSERT INTO goals VALUES (1, 1, '{}', 0, 100, 'increment', '2025-01-01')")
+    storage = _storage(db)
+    storage.add_goal_log(1, 1, 'increment', 10)
+    before = _goal_state_rows(db)
+
+    assert storage.add_goal_log(1, 2, 'increment', 90) is None  # user 2 on user 1's goal
+    assert storage.add_goal_log(99, 1, 'increment', 5) is None  # no such goal
+    assert db.execute("SELECT COUNT(*) FROM goal_logs").fetchone()[0] == 1
+    assert _goal_state_rows(db) == before
+    assert storage.rebuild_goal_states() == 1 and _goal_state_rows(db) == before
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from yearplan import mysql_migrations
+
+
+class FakeCursor:
+    """Records statements; answers the few queries the runner reads from."""
+
+    def __init__(self, db):
+        self.db = db
+        self.row = None
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self.db.statements.append(sql)
+        if sql.startswith('SELECT GET_LOCK') or sql.startswith('SELECT COUNT(*) FROM information_schema'):
+            self.row = (1,)
+        elif sql.startswith('SELECT CONSTRAINT_NAME'):
+            self.rows = [('goals_ibfk_1',)] if params == ('goals', 'user_email') else []
+        elif sql.startswith('SELECT COALESCE(MAX(id)'):
+            self.row = (12000,)
+        elif sql.startswith('SELECT MAX(version)'):
+            self.row = (max(self.db.versions, default=None),)
+        elif sql.startswith('INSERT INTO schema_version'):
+            self.db.versions.add(params[0])
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeStorage:
+    def __init__(self, versions=()):
+        self.versions = set(versions)
+        self.statements = []
+        self.backfills = 0
+
+    @contextmanager
+    def get_connection(self):
+        class Conn:
+            cursor = lambda _self: FakeCursor(self)
+            commit = lambda _self: None
+        yield Conn()
+
+    def backfill_goal_columns(self):
+        self.backfills += 1
+
+
+def test_migrate_applies_only_pending_versions_once():
+    fresh = FakeStorage()
+    assert mysql_migrations.migrate(fresh) == [v for v, _, _ in mysql_migrations.MIGRATIONS]
+    assert fresh.versions == {1, 2, 3, 4, 5, 6, 7, 8} and fresh.backfills == 1
+    assert any('CREATE TABLE IF NOT EXISTS goal_state' in s for s in fresh.statements)
+    assert fresh.statements[-1].startswith('SELECT RELEASE_LOCK')
+
+    assert mysql_migrations.migrate(fresh) == []
+
+    partial = FakeStorage(versions={1})
+    assert mysql_migrations.migrate(partial, target=2) == [2]
+    assert not any('CREATE TABLE IF NOT EXISTS users' in s for s in partial.statements)
+    assert mysql_migrations.current_version(FakeCursor(partial)) == 2
+
+
+def test_user_id_migration_backfills_in_batches_then_drops_user_email():
+    storage = FakeStorage(versions={1, 2, 3, 4})
+    assert mysql_migrations.migrate(storage, target=5) == [5]
+    backfills = [s for s in storage.statements if s.startswith('UPDATE goals t JOIN users u')]
+    assert len(backfills) == 3  # ids 1..12000 in batches of 5000
+    assert any('FOREIGN KEY (user_id) REFERENCES users(id)' in s for s in storage.statements)
+    assert not any('DROP COLUMN user_email' in s for s in storage.statements)
+
+    storage.statements.clear()
+    assert mysql_migrations.migrate(storage, target=6) == [6]
+    assert 'ALTER TABLE goals DROP FOREIGN KEY `goals_ibfk_1`, ALGORITHM=INPLACE, LOCK=NONE' in storage.statements
+    assert sum('MODIFY user_id INT NOT NULL, DROP COLUMN user_email' in s for s in storage.statements) == 2
@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+import pytest
+from yearplan.mysql_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError('gone away')
+
+    def rollback(self):
+        if not self.alive:
+            raise ConnectionError('gone away')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_reuses_and_bounds_connections():
+    made = []
+    pool = ConnectionPool(lambda: made.append(FakeConn()) or made[-1], max_size=2, timeout=0.2)
+
+    a = pool.acquire()
+    pool.release(a)
+    assert pool.acquire() is a
+    b = pool.acquire()
+    assert len(made) == 2
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    # A waiter gets the connection as soon as it is returned
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    time.sleep(0.05)
+    pool.release(b)
+    t.join()
+    assert got == [b]
+    stats = pool.stats()
+    assert stats['in_use'] == 2 and stats['utilization'] == 1.0
+    assert stats['timeouts'] == 1 and stats['waits'] >= 1 and stats['wait_max_ms'] > 0
+
+
+def test_pool_drops_dead_expired_and_discarded_connections():
+    made = []
+    pool = ConnectionPool(lambda: made.append(FakeConn()) or made[-1], max_size=1, max_lifetime=60)
+
+    a = pool.acquire()
+    pool.release(a)
+    a.alive = False
+    b = pool.acquire()
+    assert b is not a and a.closed
+
+    pool.release(b, discard=True)
+    assert b.closed
+
+    c = pool.acquire()
+    pool.release(c)
+    pool._idle[-1] = (c, time.monotonic() - 120)
+    d = pool.acquire()
+    assert d is not c and c.closed
+    stats = pool.stats()
+    assert (stats['ping_failures'], stats['discarded'], stats['recycled']) == (1, 1, 1)
+    assert stats['open'] == 1
+
+
+def test_pool_rolls_back_returned_connections():
+    made = []
+    pool = ConnectionPool(lambda: made.append(FakeConn()) or made[-1], max_size=1)
+
+    a = pool.acquire()
+    pool.release(a)  # e.g. an early return inside conn.begin()
+    assert a.rollbacks == 1 and pool.acquire() is a
+
+    a.alive = False
+    pool.release(a)
+    assert a.closed and pool.stats()['discarded'] == 1
+    assert pool.acquire() is not a
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_pool_starts_empty_in_forked_child():
+    made = []
+    pool = ConnectionPool(lambda: made.append(FakeConn()) or made[-1], max_size=1)
+    parent_conn = pool.acquire()
+    pool.release(parent_conn)
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = pool.acquire() is not parent_conn and not parent_conn.closed
+        os.write(w, b'1' if ok else b'0')
+        os._exit(0)
+    os.close(w)
+    assert os.read(r, 1) == b'1'
+    os.waitpid(pid, 0)
+    assert pool.acquire() is parent_conn
@@ -0,0 +1,24 @@
+import threading
+from yearplan import mysql_storage
+from yearplan.mysql_storage import MySQLStorage
+
+
+def test_get_stats_is_cached_across_threads(monkeypatch):
+    calls = []
+    storage = MySQLStorage.__new__(MySQLStorage)
+    storage._stats_cache = None
+    storage._stats_lock = threading.Lock()
+    storage._compute_stats = lambda: calls.append(1) or {'total_users': len(calls)}
+
+    threads = [threading.Thread(target=storage.get_stats) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert storage.get_stats() == {'total_users': 1}
+    assert len(calls) == 1
+
+    # Expired: recomputed once
+    monkeypatch.setattr(mysql_storage, 'STATS_TTL', 0)
+    storage._stats_cache = (0, storage._stats_cache[1])
+    assert storage.get_stats() == {'total_users': 2}
@@ -0,0 +1,71 @@
+from yearplan import outbox
+from yearplan.outbox import FileOutbox, OutboxSender
+
+
+class FlakyMailer:
+    def __init__(self, log, fail):
+        self.log = log
+        self.fail = fail
+
+    def send(self, mime):
+        if mime['To'] in self.fail:
+            raise ConnectionError('connection refused')
+        self.log.append((mime['To'], mime['Subject']))
+
+    def close(self):
+        pass
+
+
+def test_file_outbox_retries_dead_letters_and_dedupes(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, 'BASE_DELAY', 0)
+    monkeypatch.setattr(outbox, 'MAX_ATTEMPTS', 3)
+    path = tmp_path / 'outbox.jsonl'
+    box = FileOutbox(path)
+    # a second handle on the same journal stands in for another worker process
+    other = FileOutbox(path)
+
+    assert box.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')
+    assert not box.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')
+    assert not other.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')  # other process: found in the journal
+    other.enqueue('congrats:1:2', 'down@x', 'Congrats', 'well done', '<p>well done</p>')
+
+    sent = []
+    fail = {'down@x'}
+    cfg = {'email': 'me@x', 'password': 'pw'}
+    sender = OutboxSender(box, cfg, mailer_factory=lambda: FlakyMailer(sent, fail))
+    assert sender.drain() == 2
+    assert sent == [('a@x', 'Verify')]
+    assert other.claim() == []  # only the process holding the sender lock drains
+
+    assert sender.drain() == 1  # retried (no backoff in this test), fails again
+    assert sender.drain() == 1
+    assert sender.drain() == 0  # third failure: dead-lettered
+    dead = box.dead_letters()
+    assert [(m['key'], m['attempts'], m['last_error']) for m in dead] == [('congrats:1:2', 3, 'connection refused')]
+
+    # state survives a restart, and compaction keeps it (the lock is still held by ``box``)
+    restarted = FileOutbox(path)
+    restarted._lead = lambda: True
+    assert restarted.claim() == []
+    assert [m['key'] for m in restarted.dead_letters()] == ['congrats:1:2']
+    restarted._compact()
+    again = FileOutbox(path)
+    again._lead = lambda: True
+    assert again.claim() == [] and [m['status'] for m in again.dead_letters()] == ['dead']
+    assert not again.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')
+    assert not box.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')  # rescanned after the rewrite
+    assert again.claim() == []  # already sent: the key still deduplicates after compaction
+
+    # once compaction drops a sent message (after SENT_RETENTION), its key is free again
+    monkeypatch.setattr(outbox, 'SENT_RETENTION', outbox.timedelta(seconds=-1))
+    again._compact()
+    assert box.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')
+    assert not other.enqueue('verify:t1', 'a@x', 'Verify', 'link 1')
+
+
+def test_retry_delay_grows_exponentially_and_caps(monkeypatch):
+    monkeypatch.setattr(outbox, 'BASE_DELAY', 10)
+    monkeypatch.setattr(outbox, 'MAX_DELAY', 100)
+    assert 5 <= outbox.retry_delay(1) <= 10
+    assert 20 <= outbox.retry_delay(3) <= 40
+    assert 50 <= outbox.retry_delay(10) <= 100
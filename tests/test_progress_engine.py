@@ -0,0 +1,50 @@
+import importlib
+import random
+from datetime import date
+from pathlib import Path
+import pytest
+from yearplan.storage import YearPlanStorage
+
+np = pytest.importorskip('numpy')
+from yearplan import progress_engine  # noqa: E402
+
+
+def _random_store(tmp_path: Path, n=60, seed=3):
+    rnd = random.Random(seed)
+    s = YearPlanStorage(tmp_path / 'db.json')
+    for i in range(n):
+        task_type = rnd.choice(['increment', 'decrement', 'percentage'])
+        start = f'2025-{rnd.randint(1, 6):02d}-{rnd.randint(1, 28):02d}'
+        end = rnd.choice([f'2025-{rnd.randint(6, 12):02d}-{rnd.randint(1, 28):02d}', None])
+        gid = s.add_goal_with_meta(f'g{i}', start, end, target=rnd.choice([None, 0, 10, 50]),
+                                   task_type=task_type, start_value=rnd.choice([None, 5, 80]))
+        for _ in range(rnd.randint(0, 6)):
+            s.add_log(gid, rnd.choice(['increment', 'decrement', 'update']), rnd.randint(0, 30),
+                      f'2025-03-{rnd.randint(1, 28):02d}')
+    return s
+
+
+def test_vectorized_matches_per_goal_reports(tmp_path: Path, monkeypatch):
+    app_module = importlib.import_module('yearplan.app')
+    s = _random_store(tmp_path)
+    monkeypatch.setattr(app_module, 'storage', s)
+    goals = s.list_goals()
+    vec = app_module._vectorized_statuses(goals)
+    single = s.progress_status_many([g['id'] for g in goals])
+    for g in goals:
+        st = single[g['id']]
+        assert vec[g['id']]['percent'] == pytest.approx(st['percent'])
+        assert vec[g['id']]['progress'] == pytest.approx(st['progress'])
+        assert vec[g['id']]['label'] == app_module._expected_and_label(g, st)[1]
+    assert app_module.build_goals_report_text(None, vec) == app_module.build_goals_report_text(None)
+
+
+def test_fold_logs_resets_on_update():
+    current = progress_engine.fold_logs(
+        3,
+        log_goal=[0, 0, 1, 0, 1, 0],
+        log_action=[0, 2, 1, 0, 2, 1],  # inc, update, dec, inc, update, dec
+        log_value=[5, 10, 2, 3, 7, 1],
+        baseline=[1.0, 20.0, 4.0],
+    )
+    assert list(current) == [12.0, 7.0, 4.0]
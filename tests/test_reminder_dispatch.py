@@ -0,0 +1,64 @@
+import threading
+import time
+from yearplan import reminder_dispatch
+from yearplan.reminder_dispatch import TokenBucket, dispatch, summarize
+
+
+def test_dispatch_pipelines_and_tracks_every_user():
+    users = [{'id': i, 'email': f'u{i}@x'} for i in range(40)]
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+    recorded = []
+    mailers = []
+
+    def render(user):
+        if user['id'] == 3:
+            raise ValueError('bad goal data')
+        if user['id'] == 4:
+            return None
+        return f"report for {user['email']}"
+
+    def send(user, payload, mailer):
+        assert payload == f"report for {user['email']}" and mailer is not None
+        with lock:
+            active.append(1)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+        mailer['sent'] += 1
+        return 'mailbox full' if user['id'] == 5 else None
+
+    def factory():
+        m = {'sent': 0}
+        mailers.append(m)
+        return m
+
+    start = time.perf_counter()
+    results = dispatch(users, render, send, mailer_factory=factory,
+                       on_sent=lambda u: recorded.append(u['id']), render_workers=3, send_workers=4)
+    elapsed = time.perf_counter() - start
+
+    assert [r['user_id'] for r in results] == list(range(40))
+    assert results[3]['status'] == 'failed' and 'bad goal data' in results[3]['reason']
+    assert results[4]['status'] == 'skipped'
+    assert results[5] == dict(results[5], status='failed', reason='mailbox full')
+    assert summarize(results) == {'sent': 37, 'failed': 2, 'skipped': 1}
+    assert sorted(recorded) == [i for i in range(40) if i not in (3, 4, 5)]
+    # one session per sender thread, all of them used concurrently
+    assert len(mailers) == 4 and sum(m['sent'] for m in mailers) == 38
+    assert peak[0] > 1 and elapsed < 38 * 0.01
+
+
+def test_token_bucket_limits_rate_after_burst(monkeypatch):
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.perf_counter()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 from the burst, then 10 more at 50/s
+    assert time.perf_counter() - start >= 0.18
+
+    monkeypatch.setattr(reminder_dispatch, '_buckets', {})
+    assert reminder_dispatch.bucket_for('smtp.a') is reminder_dispatch.bucket_for('smtp.a')
+    assert reminder_dispatch.bucket_for('smtp.a') is not reminder_dispatch.bucket_for('smtp.b')
@@ -0,0 +1,42 @@
+import importlib
+from pathlib import Path
+from yearplan.storage import YearPlanStorage
+
+
+def test_report_built_once_and_shared_by_renderers(tmp_path: Path, monkeypatch):
+    app_module = importlib.import_module('yearplan.app')
+    s = YearPlanStorage(tmp_path / 'db.json')
+    done = s.add_goal_with_meta('Read books', '2025-01-01', '2025-12-31', target=10)
+    s.add_log(done, 'increment', 10, '2025-02-01')
+    s.add_goal_with_meta('Run', '2025-01-01', None, target=None)
+    monkeypatch.setattr(app_module, 'storage', s)
+
+    calls = {'list_goals': 0, 'progress_status_many': 0}
+    for name in calls:
+        orig = getattr(s, name)
+
+        def counted(*a, _orig=orig, _name=name, **kw):
+            calls[_name] += 1
+            return _orig(*a, **kw)
+        monkeypatch.setattr(s, name, counted)
+
+    report = app_module.build_reminder_report(None)
+    plain, html = app_module.reminder_email_bodies(report)
+    assert calls == {'list_goals': 1, 'progress_status_many': 1}
+
+    assert [r['name'] for r in report.rows] == ['Read books', 'Run']
+    assert report.total == 2 and report.completed == 1
+    assert report.rows[0]['percent'] == 100.0 and report.rows[0]['expected'] is not None
+    assert plain.startswith('📊 Goals: 2 | ✅ Completed: 1 | 🔄 In Progress: 1\n\n📊 Goals Detailed Report:')
+    assert 'Read books | 10 | 10.0 | 100.0% |' in plain
+    assert '<td>Run</td><td>-</td>' in html
+    # the user_id entry points still work and agree with the shared model
+    assert app_module.build_goals_report_text(None) == app_module.build_goals_report_text(None, report=report)
+
+
+def test_report_for_user_without_goals(tmp_path: Path, monkeypatch):
+    app_module = importlib.import_module('yearplan.app')
+    monkeypatch.setattr(app_module, 'storage', YearPlanStorage(tmp_path / 'db.json'))
+    report = app_module.build_reminder_report(None)
+    assert not report.has_goals and report.rows == []
+    assert app_module.build_goals_single_line(None, report=report) == "📝 No goals yet — add your first goal today!"
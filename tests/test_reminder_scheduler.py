@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from yearplan.reminder_scheduler import FileLease, ReminderScheduler, next_due
+from yearplan.storage import YearPlanStorage
+
+NOW = datetime(2025, 6, 1, 9, 0, 0)
+
+
+def _ago(**kw):
+    return (NOW - timedelta(**kw)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def test_next_due_from_frequency_and_last_sent():
+    assert next_due('weekly', None) == 0.0
+    assert next_due('weekly', 'garbage') == 0.0
+    assert next_due('daily', NOW) == (NOW + timedelta(days=1)).timestamp()
+    assert next_due(None, _ago(days=3)) == (NOW + timedelta(days=4)).timestamp()
+    assert next_due('hourly', _ago(days=3)) is None
+
+
+def test_tick_pops_only_due_users_and_reschedules(tmp_path: Path):
+    s = YearPlanStorage(tmp_path / 'db.json')
+    ids = [s.create_user(f'u{i}', f'u{i}@x', 'h')['id'] for i in range(5)]
+    s.update_last_reminder_sent(ids[0], _ago(days=8))    # weekly: due
+    s.update_last_reminder_sent(ids[1], _ago(days=2))    # weekly: not yet
+    s.update_user_reminder_preferences(ids[2], 'daily')
+    s.update_last_reminder_sent(ids[2], _ago(hours=30))  # daily: due
+    s.update_user_reminder_preferences(ids[3], 'weekly', enabled=False)
+    # ids[4] never had one: due
+
+    loads, runs = [], []
+    failing = {ids[4]}
+
+    def load():
+        loads.append(1)
+        return s.get_reminder_schedule()
+
+    def run(users):
+        runs.append(sorted(u['id'] for u in users))
+        results = [{'user_id': u['id'], 'status': 'failed' if u['id'] in failing else 'sent'} for u in users]
+        failing.clear()
+        return results
+
+    sched = ReminderScheduler(load, run, tick=60, reload=10 * 86400, retry=600)
+    now = NOW.timestamp()
+    results = sched.tick(now)
+    assert runs == [sorted([ids[0], ids[2], ids[4]])] and len(results) == 3
+    assert len(sched) == 4  # disabled user never scheduled
+
+    # nothing due a minute later; no reload before RELOAD_SECONDS
+    assert sched.tick(now + 60) == [] and len(loads) == 1
+    # the failed send comes back after the retry delay, alone
+    assert [r['user_id'] for r in sched.tick(now + 600)] == [ids[4]]
+    # the daily user is due again a day after it was sent
+    runs.clear()
+    sched.tick(now + 86400)
+    assert runs == [[ids[2]]]
+
+    # a preference change reschedules at once and the old heap entry is ignored
+    sched.schedule(dict(s.get_user_by_id(ids[1]), reminder_frequency='daily'))
+    sched.schedule(dict(s.get_user_by_id(ids[0]), reminder_enabled=False))
+    runs.clear()
+    sched.tick(now + 86400 + 1)
+    assert runs == [[ids[1]]]
+    assert ids[0] not in [u for r in runs for u in r] and len(sched) == 3
+
+
+def test_only_the_lease_holder_ticks(tmp_path: Path):
+    lock = tmp_path / 'scheduler.lock'
+    calls = []
+    leader = ReminderScheduler(lambda: calls.append('load') or [{'id': 1}], lambda users: [],
+                               lease=FileLease(lock))
+    other = ReminderScheduler(lambda: calls.append('other') or [], lambda users: [], lease=FileLease(lock))
+    leader.tick()
+    assert other.tick() == [] and calls == ['load']
@@ -0,0 +1,91 @@
+from pathlib import Path
+from yearplan.storage import YearPlanStorage
+from yearplan.sharded_storage import ShardedYearPlanStorage, shard_existing
+
+
+def test_writes_touch_only_the_owners_shard(tmp_path: Path):
+    s = ShardedYearPlanStorage(tmp_path)
+    alice = s.create_user('Alice', 'a@example.com', 'x')['id']
+    bob = s.create_user('Bob', 'b@example.com', 'x')['id']
+    ga = s.add_goal_with_meta('Run', target=10, user_id=alice)
+    gb = s.add_goal_with_meta('Read', target=5, user_id=bob)
+    bob_file = s.shard_path(bob)
+    before = bob_file.stat().st_mtime_ns
+
+    entry = s.update_goal_value(ga, 'increment', 3, user_id=alice)
+    assert bob_file.stat().st_mtime_ns == before
+    assert s.goal_progress_status(ga)['progress'] == 3
+    assert s.get_goal(gb, alice) is None
+    assert s.user_owns_log(entry['id'], alice) and not s.user_owns_log(entry['id'], bob)
+
+    # A fresh instance finds everything again, loading shards on demand
+    again = ShardedYearPlanStorage(tmp_path)
+    assert again._shards == {}
+    again._owner_ids = None  # a log is found through the goal owners, never by globbing the shard dir
+    assert again.get_user_by_email('b@example.com')['id'] == bob
+    assert again.edit_log(entry['id'], value=4)['value'] == 4
+    assert again._calculate_current_value(ga) == 4.0
+    assert list(again._shards) == [alice]
+
+
+def test_lru_evicts_to_budget_and_reloads(tmp_path: Path):
+    s = ShardedYearPlanStorage(tmp_path, cache_bytes=1)
+    users = [s.create_user(f'U{i}', f'u{i}@example.com', 'x')['id'] for i in range(4)]
+    goals = {u: s.add_goal_with_meta('Goal', target=10, user_id=u) for u in users}
+    for u in users:
+        s.update_goal_value(goals[u], 'increment', u, user_id=u)
+    assert len(s._shards) == 1  # only the most recently used one stays
+    for u in users:
+        assert s._calculate_current_value(goals[u]) == float(u)
+    assert {g['id'] for g in s.list_goals()} == set(goals.values())
+    many = s.progress_status_many(list(goals.values()))
+    assert [many[goals[u]]['progress'] for u in users] == [float(u) for u in users]
+
+    assert s.delete_user(users[0])
+    assert not s.shard_path(users[0]).exists()
+    assert s.get_goal(goals[users[0]]) is None
+
+
+def test_budget_counts_loaded_rows(tmp_path: Path):
+    s = ShardedYearPlanStorage(tmp_path)
+    users = [s.create_user(f'U{i}', f'u{i}@example.com', 'x')['id'] for i in range(3)]
+    for u in users:
+        gid = s.add_goal_with_meta('Goal', target=100, user_id=u)
+        for _ in range(20):
+            s.add_log(gid, 'increment', 1)
+    sizes = [s._footprint(u, s._shards[u]) for u in users]
+    assert all(size > s.shard_path(u).stat().st_size for u, size in zip(users, sizes))
+
+    s.cache_bytes = sizes[1] + sizes[2]
+    s._evict()
+    assert list(s._shards) == users[1:]  # the least recently used one went
+
+
+def test_log_lookup_keeps_the_index_to_users_and_goals(tmp_path: Path):
+    s = ShardedYearPlanStorage(tmp_path)
+    uid = s.create_user('A', 'a@example.com', 'x')['id']
+    gid = s.add_goal_with_meta('Run', target=10, user_id=uid)
+    index_before = (tmp_path / 'index.json').read_bytes()
+    lids = [s.add_log(gid, 'increment', 1)['id'] for _ in range(5)]
+    assert (tmp_path / 'index.json').read_bytes() == index_before
+    s.close()
+
+    again = ShardedYearPlanStorage(tmp_path)
+    again._owner_ids = None  # not resident: only the goal owners' shards are searched
+    assert again.edit_log(lids[0], value=3)['value'] == 3
+    assert again.rollback_log(lids[1])['deleted_log_ids'] == [lids[1]]
+    assert again.delete_log(lids[2]) and not again.delete_log(lids[2])
+    assert again._calculate_current_value(gid) == 5.0
+
+
+def test_shard_existing_single_file(tmp_path: Path):
+    old = YearPlanStorage(tmp_path / 'db.json')
+    uid = old.create_user('A', 'a@example.com', 'x')['id']
+    gid = old.add_goal_with_meta('Run', target=10, user_id=uid)
+    old.add_log(gid, 'increment', 2)
+    lone = old.add_goal('Loose')
+
+    s = shard_existing(tmp_path / 'db.json', tmp_path / 'shards')
+    assert s._calculate_current_value(gid) == 2.0
+    assert s.get_goal(lone)['text'] == 'Loose'
+    assert s.add_goal('New') > max(gid, lone, uid)
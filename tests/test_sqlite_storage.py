@@ -0,0 +1,92 @@
+import random
+from datetime import date
+from pathlib import Path
+from yearplan.storage import YearPlanStorage
+from yearplan.sqlite_storage import SQLiteStorage, import_json
+
+
+def test_sqlite_matches_json_store(tmp_path: Path):
+    rnd = random.Random(11)
+    js = YearPlanStorage(tmp_path / 'db.json')
+    sq = SQLiteStorage(tmp_path / 'db.sqlite3')
+    assert sq._conn().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    specs = [dict(target=50, task_type='increment'), dict(target=10, task_type='decrement', start_value=80),
+             dict(target=100, task_type='percentage'), dict(target=5, task_type='increment')]
+    pairs = [(js.add_goal_with_meta('g', '2025-01-01', '2025-12-31', **kw),
+              sq.add_goal_with_meta('g', '2025-01-01', '2025-12-31', **kw)) for kw in specs]
+    log_pairs = []
+    for _ in range(150):
+        jg, sg = rnd.choice(pairs)
+        op = rnd.random()
+        if op < 0.6 or not log_pairs:
+            action, value, ts = rnd.choice(['increment', 'decrement', 'update']), rnd.randint(0, 9), f'2025-01-{rnd.randint(1, 28):02d}'
+            log_pairs.append((js.add_log(jg, action, value, ts)['id'], sq.add_log(sg, action, value, ts)['id']))
+        elif op < 0.75:
+            jl, sl = rnd.choice(log_pairs)
+            v = rnd.randint(0, 9)
+            js.edit_log(jl, value=v)
+            sq.edit_log(sl, value=v)
+        elif op < 0.85:
+            jl, sl = log_pairs.pop(rnd.randrange(len(log_pairs)))
+            assert js.delete_log(jl) == sq.delete_log(sl)
+        else:
+            v = rnd.randint(0, 9)
+            assert (js.update_goal_value(jg, 'update', v) is None) == (sq.update_goal_value(sg, 'update', v) is None)
+        for jg2, sg2 in pairs:
+            assert js._calculate_current_value(jg2) == sq._calculate_current_value(sg2)
+    today = date(2025, 6, 1)
+    many = sq.progress_status_many([sg for _, sg in pairs], today=today)
+    for jg, sg in pairs:
+        assert js.goal_progress_status(jg, today) == sq.goal_progress_status(sg, today) == many[sg]
+        assert js.get_goal(jg).get('is_completed') == sq.get_goal(sg).get('is_completed')
+
+        # keyset pages walk the same (ts, id) order
+        jp = js.page_logs(goal_id=jg, limit=5)
+        sp = sq.page_logs(goal_id=sg, limit=5)
+        jp += js.page_logs(goal_id=jg, before=js.log_key(jp[-1]), limit=100) if jp else []
+        sp += sq.page_logs(goal_id=sg, before=sq.log_key(sp[-1]), limit=100) if sp else []
+        assert [(l['ts'], l['action'], l['value']) for l in jp] == [(l['ts'], l['action'], l['value']) for l in sp]
+        assert len(jp) == len(js.get_logs_for_goal(jg))
+
+
+def test_sqlite_users_and_transactions(tmp_path: Path):
+    s = SQLiteStorage(tmp_path / 'db.sqlite3')
+    u = s.create_unverified_user('A', 'a@example.com', 'h', 'ABC-def')
+    assert s.get_user_by_token('  abc-DEF ')['id'] == u['id']
+    assert not s.is_user_verified(u['id'])
+    assert s.get_users_needing_reminders() == []
+    assert s.verify_user_email('abc-def')
+    assert s.is_user_verified(u['id'])
+    assert [x['id'] for x in s.get_users_needing_reminders()] == [u['id']]
+    s.update_last_reminder_sent(u['id'])
+    assert s.get_users_needing_reminders() == []
+
+    gid = s.add_goal_with_meta('Run', target=10, user_id=u['id'])
+    try:
+        with s.transaction():
+            s.update_goal_value(gid, 'increment', 3, user_id=u['id'])
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert s.get_logs_for_goal(gid) == []
+
+    log = s.update_goal_value(gid, 'increment', 12, user_id=u['id'])
+    assert s.user_owns_log(log['id'], u['id']) and not s.user_owns_log(log['id'], u['id'] + 1)
+    assert s.get_goal(gid)['is_completed'] is True and s.get_goal(gid)['target'] == 12
+    assert s.delete_user(u['id'])
+    assert s.list_goals() == [] and s.list_logs() == []
+
+
+def test_import_json(tmp_path: Path):
+    js = YearPlanStorage(tmp_path / 'db.json')
+    uid = js.create_user('A', 'a@example.com', 'h')['id']
+    gid = js.add_goal_with_meta('Run', target=10, user_id=uid)
+    js.add_log(gid, 'increment', 4)
+    js.set_goal_field(gid, 'is_archived', True)
+
+    sq = import_json(tmp_path / 'db.json', tmp_path / 'db.sqlite3')
+    assert sq.get_user_by_email('a@example.com')['id'] == uid
+    assert sq._calculate_current_value(gid) == 4.0
+    assert sq.get_goal(gid, uid)['is_archived'] is True
+    assert sq.add_goal('New') > gid
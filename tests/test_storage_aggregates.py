@@ -0,0 +1,67 @@
+import random
+from pathlib import Path
+from yearplan.storage import YearPlanStorage
+
+
+def _replay(s, goal_id):
+    """Reference: recompute the current value from scratch like the original full scan."""
+    goal = s.get_goal(goal_id)
+    logs = [l for l in s.list_logs() if l.get('goal_id') == goal_id]
+    tt = goal.get('task_type', 'increment')
+    if tt == 'increment':
+        total = 0.0
+        for l in logs:
+            v = float(l.get('value') or 0)
+            total += -v if l['action'] == 'decrement' else v
+        return max(0, total)
+    if tt == 'decrement':
+        cur = float(goal['start_value'] if goal.get('start_value') is not None else goal.get('target') or 0)
+        for l in logs:
+            v = float(l.get('value') or 0)
+            if l['action'] == 'decrement':
+                cur -= v
+            elif l['action'] == 'increment':
+                cur += v
+            else:
+                cur = v
+        return max(0, cur)
+    latest, latest_ts = 0.0, None
+    for l in logs:
+        if l['action'] == 'update' and (latest_ts is None or (l['ts'] and l['ts'] > latest_ts)):
+            latest_ts, latest = l['ts'], float(l['value'])
+    return min(100, max(0, latest))
+
+
+def test_aggregates_match_full_replay(tmp_path: Path):
+    rnd = random.Random(7)
+    s = YearPlanStorage(tmp_path / 'db.json')
+    goals = [
+        s.add_goal_with_meta('inc', target=50, task_type='increment'),
+        s.add_goal_with_meta('dec', target=10, task_type='decrement', start_value=80),
+        s.add_goal_with_meta('pct', target=100, task_type='percentage'),
+    ]
+    actions = ['increment', 'decrement', 'update']
+    for i in range(200):
+        gid = rnd.choice(goals)
+        op = rnd.random()
+        logs = [l for l in s.list_logs() if l['goal_id'] == gid]
+        if op < 0.6 or not logs:
+            s.add_log(gid, rnd.choice(actions), value=rnd.randint(0, 9), ts=f'2025-01-{rnd.randint(1, 28):02d}')
+        elif op < 0.75:
+            s.edit_log(rnd.choice(logs)['id'], value=rnd.randint(0, 9))
+        elif op < 0.9:
+            s.delete_log(rnd.choice(logs)['id'])
+        else:
+            s.rollback_log(logs[-1]['id'])
+        for g in goals:
+            assert s._calculate_current_value(g) == _replay(s, g)
+
+
+def test_edit_keeps_log_order(tmp_path: Path):
+    s = YearPlanStorage(tmp_path / 'db.json')
+    gid = s.add_goal_with_meta('dec', target=0, task_type='decrement', start_value=10)
+    first = s.add_log(gid, 'update', value=5)
+    s.add_log(gid, 'decrement', value=1)
+    s.edit_log(first['id'], value=6)
+    assert s._calculate_current_value(gid) == 5.0
+    assert [l['id'] for l in s.get_logs_for_goal(gid)][0] == first['id']
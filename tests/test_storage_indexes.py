@@ -0,0 +1,57 @@
+from pathlib import Path
+from yearplan.storage import YearPlanStorage
+
+
+def test_indexes_follow_mutations(tmp_path: Path):
+    s = YearPlanStorage(tmp_path / 'db.json')
+    u = s.create_unverified_user('Ann', 'ann@example.com', 'h', 'Tok-123')
+    gid = s.add_goal_with_meta('Run', target=10, user_id=u['id'])
+    l1 = s.add_log(gid, 'increment', value=1)
+    l2 = s.add_log(gid, 'increment', value=2)
+
+    assert s.get_user_by_email('ann@example.com') is u
+    assert s.get_user_by_token('  tok-123 ') is u
+    assert s.user_owns_log(l1['id'], u['id'])
+    assert [l['id'] for l in s.get_logs_for_goal(gid)] == [l1['id'], l2['id']]
+
+    s.update_user_email(u['id'], 'ann@new.example.com')
+    assert s.get_user_by_email('ann@example.com') is None
+    assert s.get_user_by_email('ann@new.example.com') is u
+
+    assert s.verify_user_email('TOK-123')
+    assert s.get_user_by_token('tok-123') is None
+
+    s.delete_log(l1['id'])
+    assert s.user_owns_log(l1['id'], u['id']) is False
+    assert s._calculate_current_value(gid) == 2.0
+
+    assert s.delete_user(u['id'])
+    assert s.get_user_by_id(u['id']) is None
+    assert s.get_goal(gid) is None
+    assert s.list_logs() == []
+
+
+def test_indexes_rebuilt_on_load(tmp_path: Path):
+    db = tmp_path / 'db.json'
+    s = YearPlanStorage(db)
+    u = s.create_user('Bob', 'bob@example.com', 'h')
+    gid = s.add_goal('Swim', user_id=u['id'])
+
+    s2 = YearPlanStorage(db)
+    assert s2.get_user_by_email('bob@example.com')['id'] == u['id']
+    assert s2.get_goal(gid, u['id'])['text'] == 'Swim'
+    assert s2.get_goal(gid, u['id'] + 100) is None
+
+
+def test_ids_are_monotonic_and_shared_between_instances(tmp_path: Path):
+    db = tmp_path / 'db.json'
+    a = YearPlanStorage(db)
+    b = YearPlanStorage(db)
+    gid = a.add_goal('A')
+    lid = a.add_log(gid, 'increment', value=1)['id']
+    a.delete_log(lid)
+
+    # b never saw a's rows in memory but still allocates past them
+    other = b.add_goal('B')
+    assert other > lid
+    assert a.add_goal('C') > other
@@ -0,0 +1,45 @@
+from pathlib import Path
+from yearplan.storage import YearPlanStorage
+
+
+def test_journal_replays_after_reload(tmp_path: Path):
+    db = tmp_path / 'db.json'
+    s = YearPlanStorage(db, journal=True)
+    gid = s.add_goal_with_meta('Read', start_date='2025-01-01', end_date='2025-12-31', target=10)
+    e1 = s.add_log(gid, 'increment', value=2, ts='2025-01-02')
+    s.add_log(gid, 'increment', value=3, ts='2025-01-03')
+    s.edit_log(e1['id'], value=4)
+    s.update_goal_name(gid, 'Read more')
+
+    # nothing checkpointed yet: only the journal was written
+    assert not db.exists()
+    assert s.wal_path.exists()
+
+    s2 = YearPlanStorage(db, journal=True)
+    assert s2.get_goal(gid)['text'] == 'Read more'
+    assert s2._calculate_current_value(gid) == 7.0
+
+
+def test_journal_checkpoint_truncates_wal(tmp_path: Path):
+    db = tmp_path / 'db.json'
+    s = YearPlanStorage(db, journal=True, checkpoint_every=3)
+    gid = s.add_goal('A')
+    s.add_log(gid, 'increment', value=1)
+    s.add_log(gid, 'increment', value=1)
+    assert db.exists()
+    assert not s.wal_path.exists()
+
+    lid = s.add_log(gid, 'increment', value=1)['id']
+    s.delete_log(lid)
+    s2 = YearPlanStorage(db, journal=True)
+    assert len(s2.list_logs()) == 2
+
+
+def test_journal_ignores_torn_tail(tmp_path: Path):
+    db = tmp_path / 'db.json'
+    s = YearPlanStorage(db, journal=True)
+    s.add_goal('A')
+    with open(s.wal_path, 'a', encoding='utf-8') as fh:
+        fh.write('{"op":"append","coll":"goals","row":{"id":9')
+    s2 = YearPlanStorage(db, journal=True)
+    assert [g['text'] for g in s2.list_goals()] == ['A']
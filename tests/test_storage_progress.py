@@ -28,3 +28,18 @@ def test_progress_in_track():
     assert status2['progress'] == 60.0
     assert status2['expected'] == 50.0
     assert status2['in_track'] is True
+
+
+def test_progress_status_many_matches_single():
+    tf = Path(tempfile.mkdtemp()) / 'db.json'
+    s = YearPlanStorage(tf)
+    today = date.fromisoformat('2025-10-05')
+    a = s.add_goal_with_meta('A', start_date='2025-10-01', end_date='2025-10-10', target=100)
+    b = s.add_goal_with_meta('B', start_date='2025-10-01', end_date='2025-10-10', target=10, task_type='decrement', start_value=40)
+    s.add_log(a, 'increment', value=30, ts='2025-10-02')
+    s.add_log(b, 'decrement', value=5, ts='2025-10-03')
+
+    many = s.progress_status_many([a, b, 999], today=today)
+    assert many[a] == s.goal_progress_status(a, today=today)
+    assert many[b] == s.goal_progress_status(b, today=today)
+    assert many[999] is None
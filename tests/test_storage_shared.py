@@ -0,0 +1,46 @@
+import threading
+from pathlib import Path
+import pytest
+from yearplan.storage import YearPlanStorage
+
+
+@pytest.mark.parametrize('journal', [False, True])
+def test_shared_instances_see_each_others_writes(tmp_path: Path, journal):
+    db = tmp_path / 'db.json'
+    a = YearPlanStorage(db, journal=journal, shared=True)
+    b = YearPlanStorage(db, journal=journal, shared=True)
+
+    gid = a.add_goal_with_meta('Run', target=10)
+    assert b.get_goal(gid)['text'] == 'Run'
+
+    b.add_log(gid, 'increment', value=3)
+    a.add_log(gid, 'increment', value=2)
+    assert a._calculate_current_value(gid) == 5.0
+    assert len(b.get_logs_for_goal(gid)) == 2
+
+    a.checkpoint()
+    b.update_goal_name(gid, 'Run more')
+    assert a.get_goal(gid)['text'] == 'Run more'
+
+
+@pytest.mark.parametrize('journal', [False, True])
+def test_shared_concurrent_writers_lose_nothing(tmp_path: Path, journal):
+    db = tmp_path / 'db.json'
+    gid = YearPlanStorage(db).add_goal_with_meta('Steps', target=1000)
+    workers = [YearPlanStorage(db, journal=journal, checkpoint_every=7, shared=True) for _ in range(3)]
+
+    def hammer(s):
+        for _ in range(20):
+            s.add_log(gid, 'increment', value=1)
+
+    threads = [threading.Thread(target=hammer, args=(s,)) for s in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    fresh = YearPlanStorage(db, journal=journal)
+    logs = fresh.get_logs_for_goal(gid)
+    assert len(logs) == 60
+    assert len({l['id'] for l in logs}) == 60
+    assert fresh._calculate_current_value(gid) == 60.0
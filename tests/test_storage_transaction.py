@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+import pytest
+from yearplan.storage import YearPlanStorage
+
+
+def test_transaction_saves_once(tmp_path: Path, monkeypatch):
+    s = YearPlanStorage(tmp_path / 'db.json')
+    gid = s.add_goal_with_meta('Books', target=2)
+    saves = []
+    real_save = s._save
+    monkeypatch.setattr(s, '_save', lambda: saves.append(1) or real_save())
+
+    with s.transaction():
+        s.add_log(gid, 'increment', value=1)
+        s.update_goal_name(gid, 'More books')
+        assert saves == []
+    assert saves == [1]
+
+    # update_goal_value appends, raises the target and marks completion in one write
+    saves.clear()
+    s.update_goal_value(gid, 'increment', 5)
+    assert saves == [1]
+    assert s.get_goal(gid)['is_completed'] is True
+
+    reloaded = YearPlanStorage(tmp_path / 'db.json')
+    assert reloaded.get_goal(gid)['text'] == 'More books'
+    assert reloaded._calculate_current_value(gid) == 6.0
+
+
+def test_transaction_rolls_back_on_error(tmp_path: Path):
+    s = YearPlanStorage(tmp_path / 'db.json', journal=True)
+    u = s.create_user('Ann', 'ann@example.com', 'h')
+    gid = s.add_goal_with_meta('Run', target=10, user_id=u['id'])
+    keep = s.add_log(gid, 'increment', value=3)
+
+    with pytest.raises(RuntimeError):
+        with s.transaction():
+            s.add_log(gid, 'increment', value=4)
+            s.delete_log(keep['id'])
+            s.update_user_email(u['id'], 'changed@example.com')
+            s.update_goal_name(gid, 'Walk')
+            raise RuntimeError('boom')
+
+    assert s.get_goal(gid)['text'] == 'Run'
+    assert s.get_user_by_email('ann@example.com') is u
+    assert s.get_user_by_email('changed@example.com') is None
+    assert [l['id'] for l in s.get_logs_for_goal(gid)] == [keep['id']]
+    assert s._calculate_current_value(gid) == 3.0
+
+    # nothing from the failed block reached the journal
+    reloaded = YearPlanStorage(tmp_path / 'db.json', journal=True)
+    assert reloaded.get_goal(gid)['text'] == 'Run'
+    assert len(reloaded.list_logs()) == 1
+
+
+def test_snapshot_write_is_atomic(tmp_path: Path, monkeypatch):
+    db = tmp_path / 'db.json'
+    s = YearPlanStorage(db)
+    s.add_goal('Keep me')
+
+    def broken_fsync(fd):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'fsync', broken_fsync)
+    s.add_goal('Lost')
+    monkeypatch.undo()
+
+    # the failed write left the previous snapshot intact and no temp files behind
+    assert [g['text'] for g in YearPlanStorage(db).list_goals()] == ['Keep me']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['db.json', 'db.json.seq']
+    # the change is still queued and goes out with the next flush
+    assert s.flush()
+    assert len(YearPlanStorage(db).list_goals()) == 2
+
+
+def test_background_flusher_and_barrier(tmp_path: Path):
+    db = tmp_path / 'db.json'
+    s = YearPlanStorage(db, journal=True, flush_interval=60)
+    gid = s.add_goal('Later')
+    s.add_log(gid, 'increment', value=1)
+    # request path only marked the store dirty
+    assert not s.wal_path.exists()
+    assert s.flush()
+    assert len(YearPlanStorage(db, journal=True).list_logs()) == 1
+    s.add_log(gid, 'increment', value=1)
+    s.close()
+    assert len(YearPlanStorage(db, journal=True).list_logs()) == 2
@@ -1,5 +1,12 @@
 from flask import Flask, jsonify, request, render_template, session, redirect, url_for
 from .storage import YearPlanStorage
+from . import progress_engine
+from . import pagination
+from .mailer import SMTPMailer
+from .outbox import FileOutbox, OutboxSender
+from . import reminder_dispatch
+from . import reminder_scheduler
+from .reminder_scheduler import FileLease, ReminderScheduler
 from pathlib import Path
 import os
 import hashlib
@@ -15,7 +22,27 @@ from time import time
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.secret_key = secrets.token_hex(16)  # Generate a secret key for sessions
 DB_PATH = Path.home() / '.yearplan.json'
-storage = YearPlanStorage(DB_PATH)
+# YEARPLAN_JOURNAL=1 appends changes to a write-ahead log instead of rewriting the whole file
+JOURNAL = os.environ.get('YEARPLAN_JOURNAL', '0') in {'1', 'true', 'True', 'yes'}
+# YEARPLAN_FLUSH_MS=200 writes changes from a background thread at most 200 ms later
+FLUSH_MS = int(os.environ.get('YEARPLAN_FLUSH_MS', '0') or 0)
+# YEARPLAN_SHARED=1 when several worker processes (e.g. gunicorn -w 2) use the same file
+SHARED = os.environ.get('YEARPLAN_SHARED', '0') in {'1', 'true', 'True', 'yes'}
+# YEARPLAN_STORAGE=sharded keeps one file per user under YEARPLAN_SHARD_DIR (default ~/.yearplan.d),
+# loading users on demand and keeping at most YEARPLAN_SHARD_CACHE_MB of them in memory;
+# YEARPLAN_STORAGE=sqlite uses an indexed SQLite database at YEARPLAN_SQLITE_PATH (default ~/.yearplan.sqlite3)
+STORAGE_ENGINE = os.environ.get('YEARPLAN_STORAGE', 'json').strip().lower()
+if STORAGE_ENGINE == 'sqlite':
+    from .sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(Path(os.environ.get('YEARPLAN_SQLITE_PATH', str(Path.home() / '.yearplan.sqlite3'))).expanduser())
+elif STORAGE_ENGINE == 'sharded':
+    from .sharded_storage import ShardedYearPlanStorage
+    storage = ShardedYearPlanStorage(
+        Path(os.environ.get('YEARPLAN_SHARD_DIR', str(Path.home() / '.yearplan.d'))).expanduser(),
+        journal=JOURNAL, flush_interval=(FLUSH_MS / 1000.0) or None, shared=SHARED,
+        cache_bytes=int(os.environ.get('YEARPLAN_SHARD_CACHE_MB', '64') or 64) * 1024 * 1024)
+else:
+    storage = YearPlanStorage(DB_PATH, journal=JOURNAL, flush_interval=(FLUSH_MS / 1000.0) or None, shared=SHARED)
 
 # Email configuration (can be configured via environment variables)
 EMAIL_CONFIG = {
@@ -60,6 +87,56 @@ def save_email_config(config):
 
 # Load email config on startup
 load_email_config()
+
+# Transactional emails (verification, congrats) go through a durable outbox drained by a
+# background thread, so request latency never depends on the SMTP server
+OUTBOX = FileOutbox(Path(os.environ.get('YEARPLAN_OUTBOX_PATH', str(Path.home() / '.yearplan.outbox.jsonl'))).expanduser())
+OUTBOX_SENDER = OutboxSender(OUTBOX, EMAIL_CONFIG, mailer_factory=lambda: SMTPMailer(EMAIL_CONFIG, starttls=True))
+
+
+@app.before_request
+def _start_outbox_sender():
+    # also drains messages left pending by a previous process
+    OUTBOX_SENDER.start()
+
+
+# YEARPLAN_REMINDER_SCHEDULER=1 sends reminders as they fall due from a background thread in one
+# elected worker process (see yearplan.reminder_scheduler), instead of cron calling /api/process-reminders
+REMINDER_SCHEDULER = None
+if reminder_scheduler.ENABLED:
+    REMINDER_SCHEDULER = ReminderScheduler(
+        storage.get_reminder_schedule, lambda users: send_reminders(users),
+        lease=FileLease(Path(os.environ.get('YEARPLAN_REMINDER_LOCK_PATH', str(Path.home() / '.yearplan.scheduler.lock'))).expanduser()),
+    )
+
+
+@app.before_request
+def _start_reminder_scheduler():
+    if REMINDER_SCHEDULER is not None:
+        REMINDER_SCHEDULER.start()
+
+
+def reschedule_reminders(user_id):
+    """Apply a user's new reminder preferences or last_reminder_sent to the scheduler, if it runs here."""
+    if REMINDER_SCHEDULER is None:
+        return
+    user = storage.get_user_by_id(user_id)
+    if user is None:
+        REMINDER_SCHEDULER.unschedule(user_id)
+    else:
+        REMINDER_SCHEDULER.schedule(user)
+
+
+def queue_email(key, to, subject, text, html=None):
+    """Enqueue an email (``key`` deduplicates); returns False only if it could not be stored."""
+    try:
+        OUTBOX.enqueue(key, to, subject, text, html)
+    except Exception as e:
+        print(f"[OUTBOX] enqueue failed for {to}: {e}")
+        return False
+    OUTBOX_SENDER.wake()
+    return True
+
 @app.context_processor
 def inject_asset_version():
     """Inject a changing asset version to bust cache during development."""
@@ -73,6 +150,29 @@ def inject_asset_version():
  
 
 
+def verification_email_body(name, token):
+    verification_link = f"{BASE_URL}/verify-email?token={token}"
+    return f"""
+Hello {name},
+
+Welcome to Year Plan! Please verify your email address by clicking the link below:
+
+{verification_link}
+
+This link will expire in 24 hours.
+
+If you didn't create an account, please ignore this email.
+
+Best regards,
+Year Plan Team
+        """
+
+
+def queue_verification_email(email, token, name):
+    """Put the verification email in the outbox (one per token)."""
+    return queue_email(f"verify:{token}", email, "Verify Your Year Plan Account", verification_email_body(name, token))
+
+
 def send_verification_email(email, token, name):
     """Send email verification link to user"""
     if not EMAIL_CONFIG['email'] or not EMAIL_CONFIG['password']:
@@ -87,21 +187,7 @@ def send_verification_email(email, token, name):
         msg['Subject'] = "Verify Your Year Plan Account"
         
         # Email body
-        verification_link = f"{BASE_URL}/verify-email?token={token}"
-        body = f"""
-Hello {name},
-
-Welcome to Year Plan! Please verify your email address by clicking the link below:
-
-{verification_link}
-
-This link will expire in 24 hours.
-
-If you didn't create an account, please ignore this email.
-
-Best regards,
-Year Plan Team
-        """
+        body = verification_email_body(name, token)
         
         msg.attach(MIMEText(body, 'plain', 'utf-8'))
         
@@ -124,10 +210,11 @@ def generate_verification_token():
     """Generate a unique verification token"""
     return str(uuid.uuid4())
 
-def send_reminder_email(user, goals_summary, html_summary=None):
+def send_reminder_email(user, goals_summary, html_summary=None, mailer=None):
     """Send goal reminder email to user.
     - goals_summary: plain-text string (single line + ASCII table)
-    - html_summary: optional HTML string (pretty table); if None, falls back to <pre> wrapper"""
+    - html_summary: optional HTML string (pretty table); if None, falls back to <pre> wrapper
+    - mailer: SMTPMailer whose session is reused across a batch; one-off connection if None"""
     if not EMAIL_CONFIG['email'] or not EMAIL_CONFIG['password']:
         print(f"Email not configured. Reminder email for {user['email']}: {goals_summary}")
         return True  # For development, just print the reminder
@@ -156,14 +243,11 @@ def send_reminder_email(user, goals_summary, html_summary=None):
         msg.attach(MIMEText(html_body, 'html', 'utf-8'))
 
         # Send email
-        server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-        server.starttls()
-        # Ensure credentials are ASCII compatible
-        email_cred = EMAIL_CONFIG['email'].encode('ascii', 'ignore').decode('ascii')
-        password_cred = EMAIL_CONFIG['password'].encode('ascii', 'ignore').decode('ascii')
-        server.login(email_cred, password_cred)
-        server.send_message(msg)
-        server.quit()
+        if mailer is not None:
+            mailer.send(msg)
+        else:
+            with SMTPMailer(EMAIL_CONFIG, starttls=True) as one_off:
+                one_off.send(msg)
 
         return True
     except Exception as e:
@@ -172,21 +256,12 @@ def send_reminder_email(user, goals_summary, html_summary=None):
 
 
 def send_congrats_email(user, goal):
-        """Send a congratulations email when a goal is completed."""
-        if not EMAIL_CONFIG['email'] or not EMAIL_CONFIG['password']:
-                print(f"[Congrats] Email not configured. Would send congrats to {user['email']} for goal '{goal.get('text')}'.")
-                return True
-        try:
-                name = user.get('name') or 'there'
-                goal_name = goal.get('text') or 'your goal'
-                completed_at = goal.get('completed_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                # Build message
-                msg = MIMEMultipart('alternative')
-                msg['From'] = f"{EMAIL_CONFIG['from_name']} <{EMAIL_CONFIG['email']}>"
-                msg['To'] = user['email']
-                msg['Subject'] = f"🎉 Congratulations on completing '{goal_name}'!"
-                plain = f"Congrats {name}!\n\nYou completed '{goal_name}' on {completed_at}.\nKeep up the great work!"
-                html = f"""
+        """Queue a congratulations email when a goal is completed (at most one per goal per day)."""
+        name = user.get('name') or 'there'
+        goal_name = goal.get('text') or 'your goal'
+        completed_at = goal.get('completed_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        plain = f"Congrats {name}!\n\nYou completed '{goal_name}' on {completed_at}.\nKeep up the great work!"
+        html = f"""
 <html>
     <body style=\"font-family: -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; font-size:20px;\">
         <p>🎉 Congrats <strong>{name}</strong>!</p>
@@ -194,19 +269,8 @@ def send_congrats_email(user, goal):
         <p>Keep up the great work!</p>
     </body>
 </html>"""
-                msg.attach(MIMEText(plain, 'plain', 'utf-8'))
-                msg.attach(MIMEText(html, 'html', 'utf-8'))
-                server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-                server.starttls()
-                email_cred = EMAIL_CONFIG['email'].encode('ascii', 'ignore').decode('ascii')
-                password_cred = EMAIL_CONFIG['password'].encode('ascii', 'ignore').decode('ascii')
-                server.login(email_cred, password_cred)
-                server.send_message(msg)
-                server.quit()
-                return True
-        except Exception as e:
-                print(f"Failed to send congrats email: {e}")
-                return False
+        key = f"congrats:{user.get('id')}:{goal.get('id')}:{datetime.now().strftime('%Y-%m-%d')}"
+        return queue_email(key, user['email'], f"🎉 Congratulations on completing '{goal_name}'!", plain, html)
 
 
 def _compute_inclusive_days(start_date_str, end_date_str):
@@ -284,71 +348,148 @@ def _status_label_from_expected(actual_pct, expected_pct):
     return 'Pending'
 
 
-def build_goals_report_text(user_id):
-    """Create a concise plaintext report for email with Name, Target, Current, Progress%, Status."""
-    goals = storage.list_goals(user_id)
-    if not goals:
-        return "📝 You haven't created any goals yet. Start by adding your first annual goal!"
+_ENGINE_LABELS = {
+    progress_engine.PENDING: 'Pending',
+    progress_engine.IN_PROGRESS: '⏳ In Progress',
+    progress_engine.ON_TRACK: '✅ On Track',
+    progress_engine.AHEAD: '🚀 Ahead',
+    progress_engine.BEHIND: '⚠️ Behind',
+    progress_engine.COMPLETED: '🏁 Completed',
+}
+
+
+def _vectorized_statuses(goals, today=None):
+    """Report statuses for many goals in one NumPy pass (see yearplan.progress_engine).
 
-    # Active (not archived)
+    Same 'percent'/'progress'/'task_type' as goal_progress_status, plus the
+    'expected_pct' and 'label' the report builders would otherwise work out per goal.
+    """
+    ids = [g.get('id') for g in goals]
+    currents = storage.current_values_many(ids)
+    rows = []
+    for g in goals:
+        task_type = g.get('task_type', 'increment')
+        start = g.get('start_value')
+        if start is None:
+            start = (g.get('target') or 0) if task_type == 'decrement' else 0
+        rows.append({'task_type': task_type, 'start': start, 'target': g.get('target'),
+                     'start_date': g.get('start_date'), 'end_date': g.get('end_date')})
+    cols = progress_engine.GoalColumns.from_rows(rows)
+    progress, percent, expected, status = progress_engine.evaluate(cols, [currents.get(i, 0.0) for i in ids], today=today)
+    out = {}
+    for i, (gid, row) in enumerate(zip(ids, rows)):
+        # Like goal_progress_status: a float clamped into [start, target] when there is a
+        # numeric target, otherwise the storage value as is
+        bounded = row['task_type'] != 'percentage' and cols.target[i] == cols.target[i]
+        out[gid] = {
+            'percent': float(percent[i]),
+            'progress': float(progress[i]) if bounded else currents.get(gid, 0.0),
+            'task_type': row['task_type'],
+            'expected_pct': None if expected[i] != expected[i] else float(expected[i]),  # NaN -> None
+            'label': _ENGINE_LABELS[int(status[i])],
+        }
+    return out
+
+
+def _expected_and_label(goal, status):
+    """(expected percent, status label) for a goal; taken as is from a _vectorized_statuses row."""
+    if 'label' in status:
+        return status.get('expected_pct'), status['label']
+    actual_pct = float(status.get('percent', 0.0))
+    # Status label based on expected percent (time-based preference)
+    expected_pct = _expected_percent_for_goal(goal, status)
+    return expected_pct, _status_label_from_expected(actual_pct, expected_pct if expected_pct is not None else 0)
+
+
+class ReminderReport:
+    """One user's reminder data, computed once and shared by the text, HTML and one-line renderers.
+
+    rows: active goals as {'goal_id', 'name', 'target', 'current', 'percent', 'expected', 'label'}.
+    has_goals is False only when the user has no goals at all (archived ones count).
+    """
+
+    def __init__(self, has_goals, rows):
+        self.has_goals = has_goals
+        self.rows = rows
+
+    @property
+    def total(self):
+        return len(self.rows)
+
+    @property
+    def completed(self):
+        return sum(1 for r in self.rows if r['percent'] >= 100)
+
+
+def build_reminder_report(user_id, statuses=None):
+    """Build the ReminderReport for a user: one list_goals call and one progress pass.
+
+    statuses: optional precomputed {goal_id: status} (e.g. from _vectorized_statuses).
+    """
+    goals = storage.list_goals(user_id)
     active_goals = [g for g in goals if not g.get('is_archived', False)]
+    if statuses is None:
+        statuses = storage.progress_status_many([g.get('id') for g in active_goals])
+    rows = []
+    for g in active_goals:
+        status = statuses.get(g.get('id')) or {}
+        actual_pct = float(status.get('percent', 0.0))
+        expected_pct, label = _expected_and_label(g, status)
+        rows.append({
+            'goal_id': g.get('id'),
+            'name': g.get('text') or g.get('name') or 'Unnamed',
+            'target': g.get('target'),
+            'current': status.get('progress', 0),
+            'percent': actual_pct,
+            'expected': expected_pct,
+            'label': label,
+        })
+    return ReminderReport(bool(goals), rows)
+
+
+def build_goals_report_text(user_id, statuses=None, report=None):
+    """Create a concise plaintext report for email with Name, Target, Current, Progress%, Status.
+
+    report: a ReminderReport to format; built from user_id/statuses when not given.
+    """
+    if report is None:
+        report = build_reminder_report(user_id, statuses)
+    if not report.has_goals:
+        return "📝 You haven't created any goals yet. Start by adding your first annual goal!"
 
     lines = []
     # Header summary
-    completed_count = 0
-    for g in active_goals:
-        st = storage.goal_progress_status(g.get('id')) or {}
-        if st.get('percent', 0) >= 100:
-            completed_count += 1
     lines.append("📊 Goals Detailed Report:")
-    lines.append(f"Total: {len(active_goals)} | Completed: {completed_count} | Active: {len(active_goals) - completed_count}")
+    lines.append(f"Total: {report.total} | Completed: {report.completed} | Active: {report.total - report.completed}")
     lines.append("")
     lines.append("Name | Target | Current | Progress% | Status")
     lines.append("-----|--------|---------|-----------|--------")
 
-    for g in active_goals:
-        status = storage.goal_progress_status(g.get('id')) or {}
-        actual_pct = float(status.get('percent', 0.0))
-        # Status label based on expected percent (time-based preference)
-        expected_pct = _expected_percent_for_goal(g, status)
-        label = _status_label_from_expected(actual_pct, expected_pct if expected_pct is not None else 0)
-        name = g.get('text') or g.get('name') or 'Unnamed'
-        target = g.get('target')
-        current = status.get('progress', 0)
-        lines.append(f"{name} | {target if target is not None else '-'} | {current} | {actual_pct:5.1f}% | {label}")
+    for r in report.rows:
+        target = r['target']
+        lines.append(f"{r['name']} | {target if target is not None else '-'} | {r['current']} | {r['percent']:5.1f}% | {r['label']}")
 
     return "\n".join(lines)
 
 
-def build_goals_single_line(user_id):
+def build_goals_single_line(user_id, statuses=None, report=None):
     """Build a single-line summary for reminders: Total, Completed, In Progress."""
-    goals = storage.list_goals(user_id)
-    if not goals:
+    if report is None:
+        report = build_reminder_report(user_id, statuses)
+    if not report.has_goals:
         return "📝 No goals yet — add your first goal today!"
-    active = [g for g in goals if not g.get('is_archived', False)]
-    completed = 0
-    for g in active:
-        st = storage.goal_progress_status(g.get('id')) or {}
-        if st.get('percent', 0) >= 100:
-            completed += 1
-    in_progress = max(0, len(active) - completed)
-    return f"📊 Goals: {len(active)} | ✅ Completed: {completed} | 🔄 In Progress: {in_progress}"
+    in_progress = max(0, report.total - report.completed)
+    return f"📊 Goals: {report.total} | ✅ Completed: {report.completed} | 🔄 In Progress: {in_progress}"
 
 
-def build_goals_report_html(user_id):
+def build_goals_report_html(user_id, statuses=None, report=None):
         """Build an HTML table for the goals report (Name, Target, Current, Progress%, Status)."""
-        goals = storage.list_goals(user_id)
-        active_goals = [g for g in goals if not g.get('is_archived', False)]
+        if report is None:
+                report = build_reminder_report(user_id, statuses)
         rows = []
-        for g in active_goals:
-                status = storage.goal_progress_status(g.get('id')) or {}
-                actual_pct = float(status.get('percent', 0.0))
-                expected_pct = _expected_percent_for_goal(g, status)
-                label = _status_label_from_expected(actual_pct, expected_pct if expected_pct is not None else 0)
-                name = g.get('text') or g.get('name') or 'Unnamed'
-                target = g.get('target')
-                current = status.get('progress', 0)
-                rows.append(f"<tr><td>{name}</td><td>{'-' if target is None else target}</td><td>{current}</td><td>{actual_pct:.1f}%</td><td>{label}</td></tr>")
+        for r in report.rows:
+                target = r['target']
+                rows.append(f"<tr><td>{r['name']}</td><td>{'-' if target is None else target}</td><td>{r['current']}</td><td>{r['percent']:.1f}%</td><td>{r['label']}</td></tr>")
 
         table = """
 <table style="border-collapse:collapse; width:100%; font-size:20px;">
@@ -369,6 +510,23 @@ def build_goals_report_html(user_id):
 
         return table
 
+
+def reminder_email_bodies(report):
+    """(plain, html) reminder bodies: the single-line summary plus the detailed table, from one report."""
+    single = build_goals_single_line(None, report=report)
+    table_text = build_goals_report_text(None, report=report)
+    table_html = build_goals_report_html(None, report=report)
+    goals_summary = f"{single}\n\n{table_text}"
+    html_summary = f"""
+<html>
+    <body>
+        <div style="font-size:24px; line-height:1.5; font-family: -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; margin-bottom:16px;">{single}</div>
+        {table_html}
+    </body>
+</html>
+"""
+    return goals_summary, html_summary
+
 def require_auth(f):
     """Decorator to require authentication for routes"""
     def decorated_function(*args, **kwargs):
@@ -418,12 +576,12 @@ def simple():
 def api_goals():
     user_id = session['user_id']
     goals = storage.list_goals(user_id)
-    # augment with status
+    # augment with status (one batch for the whole dashboard)
+    statuses = storage.progress_status_many([g.get('id') for g in goals])
     out = []
     for g in goals:
         gcopy = dict(g)
-        status = storage.goal_progress_status(g.get('id'))
-        gcopy['status'] = status
+        gcopy['status'] = statuses.get(g.get('id'))
         out.append(gcopy)
     return jsonify(out)
 
@@ -432,10 +590,15 @@ def api_goals():
 def api_completed_goals():
     user_id = session['user_id']
     goals = storage.list_goals(user_id)
-    completed = []
-    for g in goals:
-        if g.get('is_completed'):
-            completed.append(g)
+    completed = [dict(g) for g in goals if g.get('is_completed')]
+    # Goals completed before completed_value was recorded show their current value
+    missing = [g.get('id') for g in completed if g.get('completed_value') is None]
+    if missing:
+        statuses = storage.progress_status_many(missing)
+        for g in completed:
+            st = statuses.get(g.get('id'))
+            if g.get('completed_value') is None and st:
+                g['completed_value'] = st.get('progress')
     # newest first
     completed.sort(key=lambda x: x.get('completed_at',''), reverse=True)
     return jsonify(completed)
@@ -546,7 +709,14 @@ def api_update_goal_target(goal_id):
 @app.route('/api/logs', methods=['GET'])
 @require_auth
 def api_logs():
-    return jsonify(storage.list_logs())
+    """The user's logs, newest first: all of them by default, ?limit=&cursor= pages (X-Next-Cursor),
+    ?format=ndjson streams all."""
+    user_id = session.get('user_id')
+    return pagination.keyset_response(
+        lambda before, limit: storage.page_logs(user_id=user_id, before=before, limit=limit),
+        storage.log_key,
+        fetch_all=lambda: storage.page_logs(user_id=user_id),
+    )
 
 
 @app.route('/api/goals/<int:goal_id>/logs', methods=['GET'])
@@ -557,10 +727,11 @@ def api_goal_logs(goal_id):
     if not goal:
         return jsonify({'error': 'goal not found'}), 404
     
-    logs = storage.get_logs_for_goal(goal_id)
-    if logs is None:
-        return jsonify({'error': 'goal not found'}), 404
-    return jsonify(logs)
+    return pagination.keyset_response(
+        lambda before, limit: storage.page_logs(goal_id=goal_id, before=before, limit=limit),
+        storage.log_key,
+        fetch_all=lambda: storage.get_logs_for_goal(goal_id) or [],
+    )
 
 
 @app.route('/api/logs/<int:log_id>', methods=['PUT'])
@@ -637,8 +808,10 @@ def api_register():
     # Create unverified user
     user = storage.create_unverified_user(name, email, password_hash, verification_token)
     if user:
-        # Send verification email
-        if send_verification_email(email, verification_token, name):
+        # The emailed link must keep working even if the process dies right after
+        storage.flush()
+        # Queue verification email (sent in the background)
+        if queue_verification_email(email, verification_token, name):
             return jsonify({
                 'message': 'Registration successful! Please check your email to verify your account.',
                 'email': email
@@ -741,16 +914,13 @@ def api_resend_verification():
     verification_token = generate_verification_token()
     
     # Update user with new token
-    users = storage._data.get('users', [])
-    for u in users:
-        if u.get('id') == user['id']:
-            u['verification_token'] = verification_token
-            u['token_expires'] = (datetime.now() + timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
-            break
-    storage._save()
-    
-    # Send verification email
-    if send_verification_email(email, verification_token, user['name']):
+    token_expires = (datetime.now() + timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
+    storage.update_verification_token(email, verification_token, token_expires)
+    # The emailed link must keep working even if the process dies right after
+    storage.flush()
+    
+    # Queue verification email (sent in the background)
+    if queue_verification_email(email, verification_token, user['name']):
         return jsonify({'message': 'Verification email sent successfully'}), 200
     else:
         return jsonify({'error': 'Failed to send verification email'}), 500
@@ -909,6 +1079,7 @@ def update_reminder_preferences():
     success = storage.update_user_reminder_preferences(user_id, frequency, enabled)
     
     if success:
+        reschedule_reminders(user_id)
         return jsonify({'message': 'Reminder preferences updated successfully'}), 200
     else:
         return jsonify({'error': 'Failed to update preferences'}), 500
@@ -923,19 +1094,8 @@ def send_manual_reminder():
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Build single-line summary and detailed table, include both in email
-    single = build_goals_single_line(user_id)
-    table_text = build_goals_report_text(user_id)
-    table_html = build_goals_report_html(user_id)
-    goals_summary = f"{single}\n\n{table_text}"
-    html_summary = f"""
-<html>
-    <body>
-        <div style="font-size:24px; line-height:1.5; font-family: -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; margin-bottom:16px;">{single}</div>
-        {table_html}
-    </body>
-</html>
-"""
+    # Single-line summary and detailed table, both formatted from one report
+    goals_summary, html_summary = reminder_email_bodies(build_reminder_report(user_id))
 
     # Send reminder email
     success = send_reminder_email(user, goals_summary, html_summary)
@@ -943,55 +1103,64 @@ def send_manual_reminder():
     if success:
         # Update last reminder sent timestamp
         storage.update_last_reminder_sent(user_id)
+        reschedule_reminders(user_id)
         return jsonify({'message': 'Reminder email sent successfully!'}), 200
     else:
         return jsonify({'error': 'Failed to send reminder email'}), 500
 
+def send_reminders(users_needing_reminders):
+    """Render and send reminders to these users; returns one reminder_dispatch result row per user."""
+    # Optional NumPy engine: statuses for every goal of every user in one pass
+    statuses = None
+    if progress_engine.enabled():
+        try:
+            goals = [g for user in users_needing_reminders for g in storage.list_goals(user['id'])
+                     if not g.get('is_archived', False)]
+            statuses = _vectorized_statuses(goals)
+        except Exception as e:
+            print(f"[REMINDER] vectorized progress failed, using per-goal path: {e}")
+            statuses = None
+
+    def render(user):
+        # Single-line summary + detailed table for this user, from one report
+        return reminder_email_bodies(build_reminder_report(user['id'], statuses))
+
+    def send(user, payload, mailer):
+        if not send_reminder_email(user, *payload, mailer=mailer):
+            return 'send failed'
+
+    def on_sent(user):
+        storage.update_last_reminder_sent(user['id'])
+        print(f"Sent reminder to {user['email']}")
+
+    # Render and send in parallel; each sender keeps one SMTP session for the whole run
+    configured = bool(EMAIL_CONFIG['email'] and EMAIL_CONFIG['password'])
+    results = reminder_dispatch.dispatch(
+        users_needing_reminders, render, send,
+        mailer_factory=(lambda: SMTPMailer(EMAIL_CONFIG, starttls=True)) if configured else (lambda: None),
+        on_sent=on_sent,
+        bucket=reminder_dispatch.bucket_for(EMAIL_CONFIG['smtp_server']) if configured else None,
+    )
+    for r in results:
+        if r['status'] == 'failed':
+            print(f"Failed to send reminder to {r['email']}: {r['reason']}")
+    return results
+
+
 @app.route('/api/process-reminders', methods=['POST'])
 def process_all_reminders():
     """Process and send reminder emails to all users who need them (cron job endpoint)"""
-    # This endpoint can be called by a cron job or scheduler
+    # This endpoint can be called by a cron job; YEARPLAN_REMINDER_SCHEDULER=1 does the same in-process
     users_needing_reminders = storage.get_users_needing_reminders()
-    
-    sent_count = 0
-    failed_count = 0
-    
-    for user in users_needing_reminders:
-        try:
-            # Single-line summary + detailed table for this user
-            single = build_goals_single_line(user['id'])
-            table_text = build_goals_report_text(user['id'])
-            table_html = build_goals_report_html(user['id'])
-            goals_summary = f"{single}\n\n{table_text}"
-            html_summary = f"""
-<html>
-    <body>
-        <div style="font-size:24px; line-height:1.5; font-family: -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; margin-bottom:16px;">{single}</div>
-        {table_html}
-    </body>
-</html>
-"""
-            
-            # Send reminder email
-            success = send_reminder_email(user, goals_summary, html_summary)
-            
-            if success:
-                storage.update_last_reminder_sent(user['id'])
-                sent_count += 1
-                print(f"Sent reminder to {user['email']}")
-            else:
-                failed_count += 1
-                print(f"Failed to send reminder to {user['email']}")
-                
-        except Exception as e:
-            failed_count += 1
-            print(f"Error processing reminder for {user.get('email', 'unknown')}: {e}")
-    
+    results = send_reminders(users_needing_reminders)
+    counts = reminder_dispatch.summarize(results)
+
     return jsonify({
         'message': f'Processed reminders for {len(users_needing_reminders)} users',
-        'sent': sent_count,
-        'failed': failed_count,
-        'total_processed': len(users_needing_reminders)
+        'sent': counts['sent'],
+        'failed': counts['failed'],
+        'skipped': counts['skipped'],
+        'total_processed': len(users_needing_reminders),
     }), 200
 
 
@@ -7,6 +7,7 @@ from flask import Flask, request, redirect, url_for, flash, session, jsonify
 
 # Import MySQL storage instead of JSON storage
 from yearplan.mysql_storage import MySQLStorage
+from yearplan import db_metrics
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-change-this')
@@ -40,6 +41,7 @@ def get_paypal_link():
 
 # Initialize MySQL storage
 storage = MySQLStorage()
+db_metrics.init_app(app)
 
 @app.before_request
 def _log_request():
@@ -49,6 +51,16 @@ def _log_request():
         except Exception:
             pass
 
+@app.before_request
+def _ensure_session_user_id():
+    # goals are keyed by users.id; older sessions only carry the email
+    if 'user_email' in session and not session.get('user_id'):
+        user = storage.get_user_by_email(session['user_email'])
+        if user:
+            session['user_id'] = user['id']
+        else:
+            session.clear()
+
 @app.errorhandler(Exception)
 def _handle_exception(e):
     # Centralized error logging to surface root cause instead of silent retries
@@ -58,8 +70,9 @@ def _handle_exception(e):
 @app.route('/health')
 def health():
     try:
-        stats = storage.get_stats()
-        return jsonify({'status': 'ok', 'db': 'ok', 'stats': stats})
+        # Cheap liveness probe; counts are served (cached) by / and /stats
+        storage.ping()
+        return jsonify({'status': 'ok', 'db': 'ok'})
     except Exception as e:
         print(f"[API] /health error: {e}\n{traceback.format_exc()}")
         return jsonify({'status': 'error', 'detail': str(e)}), 500
@@ -67,7 +80,7 @@ def health():
 @app.route('/')
 def index():
     # if 'user_email' in session:
-    #     user_goals = storage.get_user_goals(session['user_email'])
+    #     user_goals = storage.get_user_goals(session['user_id'])
     #     stats = storage.get_stats()
     #     return jsonify({
     #         'status': 'logged_in',
@@ -171,7 +184,7 @@ def dashboard():
     if 'user_email' not in session:
         return jsonify({'error': 'Please login first'}), 401
     
-    user_goals = storage.get_user_goals(session['user_email'])
+    user_goals = storage.get_user_goals(session['user_id'])
     stats = storage.get_stats()
     
     return jsonify({
@@ -195,7 +208,7 @@ def create_goal():
     if not title:
         return jsonify({'error': 'Goal title is required'}), 400
     
-    goal = storage.add_goal(session['user_email'], title, description, target_date)
+    goal = storage.add_goal(session['user_id'], title, description, target_date)
     if goal:
         return jsonify({
             'success': True,
@@ -214,7 +227,7 @@ def update_goal_status(goal_id, status):
     if status not in valid_statuses:
         return jsonify({'error': f'Invalid status. Valid options: {valid_statuses}'}), 400
     
-    if storage.update_goal_status(goal_id, status, session['user_email']):
+    if storage.update_goal_status(goal_id, status, session['user_id']):
         return jsonify({
             'success': True,
             'message': f'Goal marked as {status}!'
@@ -7,10 +7,20 @@ from datetime import datetime, timedelta
 import traceback
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import pymysql
 from flask import Flask, request, render_template, redirect, url_for, flash, session, jsonify
 
 # Import MySQL storage instead of JSON storage
-from yearplan.mysql_storage import MySQLStorage
+from yearplan.mysql_storage import MySQLStorage, current_value_from_goal_state, goal_fields
+from yearplan import progress_engine
+from yearplan import pagination
+from yearplan import db_metrics
+from yearplan.mailer import SMTPMailer
+from yearplan import reminder_dispatch
+from yearplan.mysql_outbox import MySQLOutbox
+from yearplan.outbox import OutboxSender
+from yearplan import reminder_scheduler
+from yearplan.reminder_scheduler import MySQLLease, ReminderScheduler
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-change-this')
@@ -83,25 +93,25 @@ def get_paypal_link():
 
 # Initialize MySQL storage
 storage = MySQLStorage()
-_REMINDER_PREFS = {}
+db_metrics.init_app(app)
+# Verification emails are queued in email_outbox and sent by a background thread
+OUTBOX = MySQLOutbox(storage)
 
 # Lightweight health check
 @app.route('/health', methods=['GET'])
 def health():
     try:
-        # Minimal DB check: attempt a simple stats query
+        # Minimal DB check: SELECT 1 on a pooled connection (stats live on /stats)
         try:
-            stats = storage.get_stats()
-            db_ok = True
+            db_ok = storage.ping()
         except Exception as e:
             if DEBUG_WEB:
                 print(f"[HEALTH] DB error: {e}")
-            stats = None
             db_ok = False
         return jsonify({
             'status': 'ok' if db_ok else 'degraded',
             'db': 'up' if db_ok else 'down',
-            'stats': stats
+            'pool': storage.pool_stats(),
         }), (200 if db_ok else 503)
     except Exception as e:
         if DEBUG_WEB:
@@ -116,6 +126,19 @@ def _log_req():
         except Exception:
             pass
 
+@app.before_request
+def _ensure_session_user_id():
+    # goals/goal_logs are keyed by users.id; sessions from before that change only carry the email
+    if 'user_email' in session and not session.get('user_id'):
+        try:
+            user = storage.get_user_by_email(session['user_email'])
+        except Exception:
+            user = None
+        if user:
+            session['user_id'] = user['id']
+        else:
+            session.clear()
+
 # Email configuration (GUI support)
 EMAIL_CONFIG_FILE = Path.home() / '.yearplan_email_config.json'
 EMAIL_CONFIG = {
@@ -172,9 +195,10 @@ def send_test_email(
     cfg: dict,
     subject: str = 'Year Plan Test Email',
     body_text: str = 'This is a test email from Year Plan.',
-    body_html: str = None
+    body_html: str = None,
+    mailer=None
 ):
-    server = None
+    """Send one email; returns None on success or the error text. ``mailer`` reuses a batch SMTP session."""
     try:
         msg = MIMEMultipart('alternative')
         msg['From'] = f"{cfg.get('from_name','Year Plan App')} <{cfg.get('email','')}>"
@@ -186,32 +210,37 @@ def send_test_email(
         if body_html:
             msg.attach(MIMEText(body_html, 'html', 'utf-8'))
 
-        port = int(cfg.get('smtp_port', 587))
-        smtp_server = cfg.get('smtp_server', '')
-        if port == 465:
-            server = smtplib.SMTP_SSL(smtp_server, port, timeout=10)
-        elif port == 587:
-            server = smtplib.SMTP(smtp_server, port, timeout=10)
-            server.starttls()
+        if mailer is not None:
+            mailer.send(msg)
         else:
-            server = smtplib.SMTP(smtp_server, port, timeout=10)
-        email_cred = cfg.get('email','').encode('ascii', 'ignore').decode('ascii')
-        password_cred = cfg.get('password','').encode('ascii', 'ignore').decode('ascii')
-        if email_cred and password_cred:
-            server.login(email_cred, password_cred)
-        server.send_message(msg)
+            with SMTPMailer(cfg) as one_off:
+                one_off.send(msg)
         return None
     except Exception as e:
         return str(e)
-    finally:
-        try:
-            if server:
-                server.quit()
-        except Exception:
-            pass
 
 load_site_config()
 load_email_config()
+OUTBOX_SENDER = OutboxSender(OUTBOX, EMAIL_CONFIG)
+
+@app.before_request
+def _start_outbox_sender():
+    # also drains messages left pending by a previous process
+    OUTBOX_SENDER.start()
+
+# YEARPLAN_REMINDER_SCHEDULER=1: send reminders as they fall due from one elected worker
+# (GET_LOCK; see yearplan.reminder_scheduler) instead of cron calling /api/process-reminders
+REMINDER_SCHEDULER = None
+if reminder_scheduler.ENABLED:
+    REMINDER_SCHEDULER = ReminderScheduler(
+        storage.get_reminder_schedule, lambda users: send_reminders(users),
+        lease=MySQLLease(lambda: pymysql.connect(**storage.config)),
+    )
+
+@app.before_request
+def _start_reminder_scheduler():
+    if REMINDER_SCHEDULER is not None:
+        REMINDER_SCHEDULER.start()
 
 @app.route('/email-config')
 def email_config_page():
@@ -352,6 +381,25 @@ def site_config_delete_seed_user():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Slowest recent statements (fingerprints only, no parameters); DELETE clears the buffer
+@app.route('/site-config/slow-queries', methods=['GET', 'DELETE'])
+def site_config_slow_queries():
+    if request.method == 'DELETE':
+        db_metrics.clear_slow_queries()
+        return jsonify({'ok': True})
+    queries = db_metrics.slow_queries()
+    by_fp = {}
+    for q in queries:
+        agg = by_fp.setdefault(q['fingerprint'], {'fingerprint': q['fingerprint'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        agg['count'] += 1
+        agg['total_ms'] = round(agg['total_ms'] + q['ms'], 2)
+        agg['max_ms'] = max(agg['max_ms'], q['ms'])
+    return jsonify({
+        'threshold_ms': db_metrics.SLOW_QUERY_MS,
+        'queries': queries,
+        'by_fingerprint': sorted(by_fp.values(), key=lambda a: a['total_ms'], reverse=True),
+    })
+
 # Purge all known seed/admin users (safety for production)
 @app.route('/site-config/seed-users/purge', methods=['DELETE'])
 def site_config_purge_seed_users():
@@ -375,6 +423,19 @@ def site_config_purge_seed_users():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def verification_email_text(name: str, verification_link: str) -> str:
+    return f"Hello {name},\n\nPlease verify your email by clicking the link below:\n\n{verification_link}\n\nThis link will expire in 24 hours.\n\n"
+
+def queue_verification_email(to_email: str, name: str, verification_link: str, token: str):
+    """Put the verification email in the outbox (one per token); returns None or the error text."""
+    try:
+        OUTBOX.enqueue(f"verify:{token}", to_email, 'Verify Your Year Plan Account',
+                       verification_email_text(name, verification_link))
+    except Exception as e:
+        return str(e)
+    OUTBOX_SENDER.wake()
+    return None
+
 def send_verification_email(to_email: str, name: str, verification_link: str, cfg: dict):
     server = None
     try:
@@ -382,7 +443,7 @@ def send_verification_email(to_email: str, name: str, verification_link: str, cf
         msg['From'] = f"{cfg.get('from_name','Year Plan App')} <{cfg.get('email','')}>"
         msg['To'] = to_email
         msg['Subject'] = 'Verify Your Year Plan Account'
-        body = f"Hello {name},\n\nPlease verify your email by clicking the link below:\n\n{verification_link}\n\nThis link will expire in 24 hours.\n\n"
+        body = verification_email_text(name, verification_link)
         msg.attach(MIMEText(body, 'plain', 'utf-8'))
 
         port = int(cfg.get('smtp_port', 587))
@@ -482,7 +543,7 @@ def register():
                 host_link = get_host_link()
                 verification_link = f"{host_link}/verify-email?token={verification_token}"
                 if EMAIL_CONFIG.get('email') and EMAIL_CONFIG.get('password'):
-                    err = send_verification_email(email, email.split('@')[0], verification_link, EMAIL_CONFIG)
+                    err = queue_verification_email(email, email.split('@')[0], verification_link, verification_token)
                     if err:
                         flash(f'Warning: could not send verification email ({err}). Link: {verification_link}')
                     else:
@@ -541,7 +602,7 @@ def dashboard():
     if 'user_email' not in session:
         return redirect(url_for('login'))
     
-    user_goals = storage.get_user_goals(session['user_email'])
+    user_goals = storage.get_user_goals(session['user_id'])
     stats = storage.get_stats()
     
     return render_template('dashboard.html', 
@@ -563,7 +624,7 @@ def create_goal():
             flash('Goal title is required')
             return render_template('create_goal.html')
         
-        goal = storage.add_goal(session['user_email'], title, description, target_date)
+        goal = storage.add_goal(session['user_id'], title, description, target_date)
         if goal:
             flash('Goal created successfully!')
             return redirect(url_for('dashboard'))
@@ -582,7 +643,7 @@ def update_goal_status(goal_id, status):
         flash('Invalid status')
         return redirect(url_for('dashboard'))
     
-    if storage.update_goal_status(goal_id, status, session['user_email']):
+    if storage.update_goal_status(goal_id, status, session['user_id']):
         flash(f'Goal marked as {status}!')
     else:
         flash('Failed to update goal')
@@ -654,36 +715,21 @@ def api_current_user():
 def api_goals():
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
-    raw = storage.get_user_goals(session['user_email'])
+    raw = storage.get_user_goals(session['user_id'])
+    # materialized progress of every goal (goal_state), one round trip
+    try:
+        states = storage.get_goal_states(session['user_id'])
+    except Exception:
+        states = {}
     out = []
     for g in raw:
-        # parse description JSON if available
-        extras = {}
-        try:
-            if g.get('description'):
-                import json as _json
-                extras = _json.loads(g['description']) if isinstance(g['description'], str) else (g['description'] or {})
-        except Exception:
-            extras = {}
-        # compute progress from logs
+        # typed goal columns (description JSON until backfilled)
+        extras = goal_fields(g)
+        # progress from the goal's materialized state
         start_val = extras.get('start_value', 0) or 0
         target_val = extras.get('target')
         task_type = extras.get('task_type', 'increment')
-        logs = []
-        try:
-            logs = storage.get_goal_logs(g.get('id'), session['user_email'])
-        except Exception:
-            logs = []
-        current = start_val
-        for l in reversed(logs):  # apply oldest to newest
-            act = (l.get('action') or '').lower()
-            val = float(l.get('value') or 0)
-            if act == 'increment':
-                current += val
-            elif act == 'decrement':
-                current -= val
-            elif act == 'update':
-                current = val
+        current = current_value_from_goal_state(start_val, states.get(g.get('id')))
         percent = 0
         if task_type == 'percentage':
             percent = max(0, min(100, float(current)))
@@ -771,7 +817,7 @@ def api_goals_create():
     import json as _json
     description = _json.dumps(extras)
     target_date = data.get('end_date') or None
-    goal = storage.add_goal(session['user_email'], text, description, target_date)
+    goal = storage.add_goal(session['user_id'], text, description, target_date)
     if not goal:
         return jsonify({'error': 'Failed to create goal'}), 500
     return jsonify({'id': goal.get('id'), 'text': text})
@@ -790,9 +836,9 @@ def api_goal_update(goal_id: int):
             val = float(val)
         except Exception:
             val = 0.0
-        # add log
-        storage.add_goal_log(goal_id, session['user_email'], action, val)
-        return jsonify({'ok': True})
+        # add log (None when the goal is missing or not this user's)
+        ok = storage.add_goal_log(goal_id, session['user_id'], action, val)
+        return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
     return jsonify({'error': 'unsupported action'}), 400
 
 @app.route('/api/goals/<int:goal_id>/name', methods=['PUT'])
@@ -803,7 +849,7 @@ def api_goal_update_name(goal_id: int):
     text = (data.get('text') or '').strip()
     if not text:
         return jsonify({'error': 'Missing text'}), 400
-    ok = storage.update_goal_title(goal_id, session['user_email'], text)
+    ok = storage.update_goal_title(goal_id, session['user_id'], text)
     if not ok:
         return jsonify({'error': 'Update failed'}), 400
     return jsonify({'ok': True})
@@ -814,19 +860,11 @@ def api_goal_update_target(goal_id: int):
         return jsonify({'error': 'unauthorized'}), 401
     data = request.get_json(silent=True) or {}
     target = data.get('target')
-    # Update description JSON with new target
-    goal = storage.get_goal_for_user(goal_id, session['user_email'])
+    # Single UPDATE of the target column (and its copy in the description JSON)
+    goal = storage.get_goal_for_user(goal_id, session['user_id'])
     if not goal:
         return jsonify({'error': 'Not found'}), 404
-    try:
-        extras = {}
-        if goal.get('description'):
-            extras = json.loads(goal['description']) if isinstance(goal['description'], str) else (goal['description'] or {})
-        extras['target'] = target
-        new_desc = json.dumps(extras)
-    except Exception as e:
-        return jsonify({'error': f'Invalid description JSON: {e}'}), 500
-    ok = storage.update_goal_description(goal_id, session['user_email'], new_desc)
+    ok = storage.update_goal_target(goal_id, session['user_id'], target)
     if not ok:
         return jsonify({'error': 'Update failed'}), 400
     return jsonify({'ok': True})
@@ -835,7 +873,7 @@ def api_goal_update_target(goal_id: int):
 def api_goal_delete(goal_id: int):
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
-    ok = storage.delete_goal(goal_id, session['user_email'])
+    ok = storage.delete_goal(goal_id, session['user_id'])
     return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
 
 # Compatibility routes for older/cached frontends calling increment/decrement as POSTs
@@ -848,8 +886,8 @@ def api_goal_increment(goal_id: int):
         val = float(data.get('value', 1))
     except Exception:
         val = 1.0
-    storage.add_goal_log(goal_id, session['user_email'], 'increment', val)
-    return jsonify({'ok': True})
+    ok = storage.add_goal_log(goal_id, session['user_id'], 'increment', val)
+    return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
 
 @app.route('/api/goals/<int:goal_id>/decrement', methods=['POST'])
 def api_goal_decrement(goal_id: int):
@@ -860,8 +898,8 @@ def api_goal_decrement(goal_id: int):
         val = float(data.get('value', 1))
     except Exception:
         val = 1.0
-    storage.add_goal_log(goal_id, session['user_email'], 'decrement', val)
-    return jsonify({'ok': True})
+    ok = storage.add_goal_log(goal_id, session['user_id'], 'decrement', val)
+    return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
 
 @app.route('/api/register', methods=['POST'])
 def api_register():
@@ -886,7 +924,7 @@ def api_register():
         print(f"[API] Verification link for {email}: {verification_link}")
         # Attempt to send if configured, otherwise just report success
         if EMAIL_CONFIG.get('email') and EMAIL_CONFIG.get('password'):
-            err = send_verification_email(email, name or (email.split('@')[0] or 'User'), verification_link, EMAIL_CONFIG)
+            err = queue_verification_email(email, name or (email.split('@')[0] or 'User'), verification_link, verification_token)
             if err:
                 return jsonify({'success': True, 'email': email, 'name': name or email, 'message': f'Registered, but email sending failed: {err}', 'verification_link': verification_link})
             else:
@@ -911,11 +949,11 @@ def api_resend_verification():
     token_expires = (datetime.utcnow() + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
     storage.update_verification_token(email, token, token_expires)
     link = f"{get_host_link()}/verify-email?token={token}"
-    # Try sending if configured
+    # Queue the email if configured (sent in the background)
     if EMAIL_CONFIG.get('email') and EMAIL_CONFIG.get('password'):
-        err = send_verification_email(email, (email.split('@')[0] or 'User').strip().title(), link, EMAIL_CONFIG)
+        err = queue_verification_email(email, (email.split('@')[0] or 'User').strip().title(), link, token)
         if err:
-            return jsonify({'error': f'Failed to send verification email: {err}', 'verification_link': link}), 500
+            return jsonify({'error': f'Failed to queue verification email: {err}', 'verification_link': link}), 500
         return jsonify({'ok': True, 'message': 'Verification email sent', 'verification_link': link})
     # Not configured; return the link so user can proceed
     return jsonify({'ok': True, 'message': 'Email not configured; use verification link.', 'verification_link': link})
@@ -951,35 +989,20 @@ def api_completed_goals():
     # If not logged in, return empty array to avoid noisy errors
     if 'user_email' not in session:
         return jsonify([])
-    raw = storage.get_user_goals(session['user_email'])
+    raw = storage.get_user_goals(session['user_id'])
+    try:
+        states = storage.get_goal_states(session['user_id'])
+    except Exception:
+        states = {}
     out = []
     for g in raw:
-        # Parse extras
-        extras = {}
-        try:
-            if g.get('description'):
-                extras = json.loads(g['description']) if isinstance(g['description'], str) else (g['description'] or {})
-        except Exception:
-            extras = {}
+        # Typed goal columns
+        extras = goal_fields(g)
         start_val = extras.get('start_value', 0) or 0
         target_val = extras.get('target')
         task_type = extras.get('task_type', 'increment')
-        # compute current via logs
-        logs = []
-        try:
-            logs = storage.get_goal_logs(g.get('id'), session['user_email'])
-        except Exception:
-            logs = []
-        current = start_val
-        for l in reversed(logs):
-            act = (l.get('action') or '').lower()
-            val = float(l.get('value') or 0)
-            if act == 'increment':
-                current += val
-            elif act == 'decrement':
-                current -= val
-            elif act == 'update':
-                current = val
+        # current value from goal_state
+        current = current_value_from_goal_state(start_val, states.get(g.get('id')))
         # compute percent
         percent = 0
         try:
@@ -1009,46 +1032,51 @@ def api_completed_goals():
 def api_completed_goals_delete(goal_id: int):
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
-    ok = storage.delete_goal(goal_id, session['user_email'])
+    ok = storage.delete_goal(goal_id, session['user_id'])
     return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
 
 # --- Additional minimal endpoints to prevent UI 404s and network errors ---
+def _shape_log(l):
+    # shape to frontend expectations {id, goal_id, timestamp, value}
+    return {
+        'id': l['id'],
+        'goal_id': l['goal_id'],
+        'timestamp': l['created_at'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(l['created_at'], 'strftime') else str(l['created_at']),
+        'value': l['value'] if l['action'] == 'update' else (l['value'] if l['action'] == 'increment' else -l['value'])
+    }
+
+def _log_key(l):
+    return (l['created_at'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(l['created_at'], 'strftime') else str(l['created_at']), l['id'])
+
 @app.route('/api/goals/<int:goal_id>/logs')
 def api_goal_logs(goal_id: int):
     if 'user_email' not in session:
         return jsonify([])
-    logs = storage.get_goal_logs(goal_id, session['user_email'])
-    # shape to frontend expectations {id, timestamp, value}
-    shaped = [
-        {
-            'id': l['id'],
-            'timestamp': l['created_at'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(l['created_at'], 'strftime') else str(l['created_at']),
-            'value': l['value'] if l['action'] == 'update' else (l['value'] if l['action'] == 'increment' else -l['value'])
-        }
-        for l in logs
-    ]
-    return jsonify(shaped)
+    user_id = session['user_id']
+    return pagination.keyset_response(
+        lambda before, limit: storage.get_logs_page(user_id, goal_id=goal_id, before=before, limit=limit),
+        _log_key, _shape_log,
+        fetch_all=lambda: storage.get_goal_logs(goal_id, user_id),
+    )
 
 @app.route('/api/logs')
 def api_all_logs():
+    """The user's logs, newest first: all of them by default, ?limit=&cursor= pages (X-Next-Cursor),
+    ?format=ndjson streams all."""
     if 'user_email' not in session:
         return jsonify([])
-    logs = storage.get_all_logs_for_user(session['user_email'])
-    return jsonify([
-        {
-            'id': l['id'],
-            'goal_id': l['goal_id'],
-            'timestamp': l['created_at'].strftime('%Y-%m-%d %H:%M:%S') if hasattr(l['created_at'], 'strftime') else str(l['created_at']),
-            'value': l['value'] if l['action'] == 'update' else (l['value'] if l['action'] == 'increment' else -l['value'])
-        }
-        for l in logs
-    ])
+    user_id = session['user_id']
+    return pagination.keyset_response(
+        lambda before, limit: storage.get_logs_page(user_id, before=before, limit=limit),
+        _log_key, _shape_log,
+        fetch_all=lambda: storage.get_all_logs_for_user(user_id),
+    )
 
 @app.route('/api/logs/<int:log_id>', methods=['DELETE'])
 def api_delete_log(log_id: int):
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
-    ok = storage.delete_log(log_id, session['user_email'])
+    ok = storage.delete_log(log_id, session['user_id'])
     return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
 
 @app.route('/api/logs/<int:log_id>/rollback', methods=['POST'])
@@ -1056,16 +1084,17 @@ def api_rollback_log(log_id: int):
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
     # Simplified rollback: delete the last log (only safe for newest; frontend restricts)
-    ok = storage.delete_log(log_id, session['user_email'])
+    ok = storage.delete_log(log_id, session['user_id'])
     return (jsonify({'ok': True}) if ok else (jsonify({'error': 'not found'}), 404))
 
 @app.route('/api/reminder-preferences', methods=['GET'])
 def api_get_reminder_prefs():
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
-    prefs = _REMINDER_PREFS.get(session['user_email']) or {
-        'enabled': False,
+    prefs = storage.get_user_reminder_preferences(session['user_id']) or {
+        'enabled': True,
         'frequency': 'weekly',
+        'last_sent': None,
     }
     return jsonify({'preferences': prefs})
 
@@ -1074,10 +1103,19 @@ def api_set_reminder_prefs():
     if 'user_email' not in session:
         return jsonify({'error': 'unauthorized'}), 401
     data = request.get_json(silent=True) or {}
-    _REMINDER_PREFS[session['user_email']] = {
-        'enabled': bool(data.get('enabled', False)),
-        'frequency': data.get('frequency', 'weekly')
-    }
+    frequency = data.get('frequency', 'weekly')
+    enabled = bool(data.get('enabled', False))
+    if frequency == 'disabled':
+        frequency, enabled = 'weekly', False
+    if frequency not in reminder_scheduler.FREQUENCY_DAYS:
+        return jsonify({'error': f"invalid frequency, must be one of: {', '.join(reminder_scheduler.FREQUENCY_DAYS)}, disabled"}), 400
+    if not storage.update_user_reminder_preferences(session['user_id'], frequency, enabled):
+        return jsonify({'error': 'not found'}), 404
+    if REMINDER_SCHEDULER is not None:
+        prefs = storage.get_user_reminder_preferences(session['user_id']) or {}
+        REMINDER_SCHEDULER.schedule({'id': session['user_id'], 'email': session['user_email'],
+                                     'reminder_enabled': enabled, 'reminder_frequency': frequency,
+                                     'last_reminder_sent': prefs.get('last_sent')})
     return jsonify({'ok': True})
 
 @app.route('/api/send-reminder', methods=['POST'])
@@ -1088,45 +1126,27 @@ def api_send_reminder():
     try:
         user_email = session['user_email']
         # Fetch goals and compute summary
-        raw = storage.get_user_goals(user_email) or []
+        raw = storage.get_user_goals(session['user_id']) or []
+        try:
+            states = storage.get_goal_states(session['user_id'])
+        except Exception:
+            states = {}
         lines = []
         from datetime import datetime as _dt, date as _date
         html_rows = []
 
         for g in raw:
             title = g.get('title') or 'Untitled'
-            # parse extras from description JSON
-            extras = {}
-            try:
-                if g.get('description'):
-                    import json as _json
-                    extras = _json.loads(g['description']) if isinstance(g['description'], str) else (g['description'] or {})
-            except Exception:
-                extras = {}
+            # typed goal columns
+            extras = goal_fields(g)
 
             start_val = float(extras.get('start_value') or 0)
             target_val = extras.get('target')
             target_val_f = float(target_val) if target_val is not None else None
             task_type = (extras.get('task_type') or 'increment').lower()
 
-            # accumulate logs to compute current
-            current = start_val
-            try:
-                logs = storage.get_goal_logs(g.get('id'), user_email) or []
-            except Exception:
-                logs = []
-            for l in reversed(logs):
-                act = (l.get('action') or '').lower()
-                try:
-                    val = float(l.get('value') or 0)
-                except Exception:
-                    val = 0.0
-                if act == 'increment':
-                    current += val
-                elif act == 'decrement':
-                    current -= val
-                elif act == 'update':
-                    current = val
+            # current value from the goal's materialized state
+            current = current_value_from_goal_state(start_val, states.get(g.get('id')))
 
             # compute percent
             percent = 0.0
@@ -1266,228 +1286,280 @@ def api_send_reminder():
             print('[WEB] api_send_reminder error:', e)
         return jsonify({'error': 'internal error'}), 500
 
-# Cron-style endpoint: process reminders for all verified users
-@app.route('/api/process-reminders', methods=['POST'])
-def api_process_reminders():
-    try:
-        sent_count = 0
-        failed_count = 0
-        total_processed = 0
+def _reminder_goal_metrics(g: dict, extras: dict, state: dict = None):
+    """(current, percent, expected_pct, status label) for one goal of a reminder email.
 
-        # Fetch all verified users
-        users = []
+    ``state`` is the goal's goal_state row (storage.get_goal_states()).
+    """
+    start_val = float(extras.get('start_value') or 0)
+    target_val = extras.get('target')
+    target_val_f = float(target_val) if target_val is not None else None
+    task_type = (extras.get('task_type') or 'increment').lower()
+    from datetime import datetime as _dt, date as _date
+
+    # Current value from goal_state
+    current = current_value_from_goal_state(start_val, state)
+
+    # Compute percent
+    percent = 0.0
+    if task_type == 'percentage':
         try:
-            with storage.get_connection() as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT id, email FROM users WHERE is_verified = TRUE")
-                users = cur.fetchall() or []
-        except Exception as e:
-            if DEBUG_WEB:
-                print('[REMINDER] Failed to list users:', e)
-            return jsonify({'error': 'cannot list users'}), 500
+            percent = max(0.0, min(100.0, float(current)))
+        except Exception:
+            percent = 0.0
+    elif target_val_f is not None:
+        try:
+            denom = abs(target_val_f - start_val)
+            percent = 100.0 if denom == 0 else max(0.0, min(100.0, (abs(current - start_val) / denom) * 100.0))
+        except Exception:
+            percent = 0.0
 
-        # Helper to build summary for a given user email (reuse logic from manual endpoint)
-        def _build_summaries_for(email_addr: str):
-            raw = storage.get_user_goals(email_addr) or []
-            lines = []
-            html_rows = []
-            from datetime import datetime as _dt, date as _date
-            for g in raw:
-                title = g.get('title') or 'Untitled'
-                # description may contain JSON with extras
-                extras = {}
-                try:
-                    if g.get('description'):
-                        import json as _json
-                        extras = _json.loads(g['description']) if isinstance(g['description'], str) else (g['description'] or {})
-                except Exception:
-                    extras = {}
+    # Expected percent by time
+    expected_pct = None
+    try:
+        sd = extras.get('start_date')
+        ed = g.get('target_date')
+        fmt = '%Y-%m-%d'
+        if sd and isinstance(sd, str) and len(sd) >= 10:
+            start_d = _dt.strptime(sd[:10], fmt).date()
+        else:
+            cad = str(g.get('created_at'))[:10]
+            start_d = _dt.strptime(cad, fmt).date()
+        end_d = _dt.strptime(str(ed)[:10], fmt).date() if ed else None
+        if end_d:
+            today = _date.today()
+            total_days = max(1, (end_d - start_d).days + 1)
+            if today < start_d:
+                elapsed = 0
+            elif today > end_d:
+                elapsed = total_days
+            else:
+                elapsed = (today - start_d).days + 1
+            elapsed = max(1, min(total_days, elapsed))
+            expected_pct = (elapsed / float(total_days)) * 100.0
+    except Exception:
+        expected_pct = None
+
+    status = 'Pending'
+    if percent >= 100.0:
+        status = '🏁 Completed'
+    elif expected_pct is not None and expected_pct > 0:
+        ratio = percent / expected_pct
+        if ratio >= 1.3:
+            status = '🚀 Ahead'
+        elif ratio <= 0.7:
+            status = '🔴 Behind'
+        else:
+            status = '✅ On Track'
+    else:
+        status = '⏳ In Progress' if percent > 0 else 'Pending'
+    return current, percent, expected_pct, status
 
-                start_val = float(extras.get('start_value') or 0)
-                target_val = extras.get('target')
-                target_val_f = float(target_val) if target_val is not None else None
-                task_type = (extras.get('task_type') or 'increment').lower()
 
-                # Accumulate logs to compute current
-                current = start_val
-                try:
-                    logs = storage.get_goal_logs(g.get('id'), email_addr) or []
-                except Exception:
-                    logs = []
-                for l in reversed(logs):
-                    act = (l.get('action') or '').lower()
-                    try:
-                        val = float(l.get('value') or 0)
-                    except Exception:
-                        val = 0.0
-                    if act == 'increment':
-                        current += val
-                    elif act == 'decrement':
-                        current -= val
-                    elif act == 'update':
-                        current = val
-
-                # Compute percent
-                percent = 0.0
-                if task_type == 'percentage':
-                    try:
-                        percent = max(0.0, min(100.0, float(current)))
-                    except Exception:
-                        percent = 0.0
-                elif target_val_f is not None:
-                    try:
-                        denom = abs(target_val_f - start_val)
-                        percent = 100.0 if denom == 0 else max(0.0, min(100.0, (abs(current - start_val) / denom) * 100.0))
-                    except Exception:
-                        percent = 0.0
+_ENGINE_LABELS = {
+    progress_engine.PENDING: 'Pending',
+    progress_engine.IN_PROGRESS: '⏳ In Progress',
+    progress_engine.ON_TRACK: '✅ On Track',
+    progress_engine.AHEAD: '🚀 Ahead',
+    progress_engine.BEHIND: '🔴 Behind',
+    progress_engine.COMPLETED: '🏁 Completed',
+}
 
-                # Expected percent by time
-                expected_pct = None
-                try:
-                    sd = extras.get('start_date')
-                    ed = g.get('target_date')
-                    fmt = '%Y-%m-%d'
-                    if sd and isinstance(sd, str) and len(sd) >= 10:
-                        start_d = _dt.strptime(sd[:10], fmt).date()
-                    else:
-                        cad = str(g.get('created_at'))[:10]
-                        start_d = _dt.strptime(cad, fmt).date()
-                    end_d = _dt.strptime(str(ed)[:10], fmt).date() if ed else None
-                    if end_d:
-                        today = _date.today()
-                        total_days = max(1, (end_d - start_d).days + 1)
-                        if today < start_d:
-                            elapsed = 0
-                        elif today > end_d:
-                            elapsed = total_days
-                        else:
-                            elapsed = (today - start_d).days + 1
-                        elapsed = max(1, min(total_days, elapsed))
-                        expected_pct = (elapsed / float(total_days)) * 100.0
-                except Exception:
-                    expected_pct = None
 
-                end_date = g.get('target_date')
-                end_s = str(end_date)[:10] if end_date else '-'
-                if task_type == 'percentage':
-                    line = f"- {title}: {percent:.1f}% (target 100%) due {end_s}"
-                else:
-                    if target_val_f is not None:
-                        tgt_s = f"{int(target_val_f)}" if float(target_val_f).is_integer() else f"{target_val_f}"
-                    else:
-                        tgt_s = "?"
-                    cur_s = f"{int(current)}" if float(current).is_integer() else f"{current}"
-                    line = f"- {title}: {percent:.1f}% ({cur_s}/{tgt_s}) due {end_s}"
-                lines.append(line)
-
-                status = 'Pending'
-                if percent >= 100.0:
-                    status = '🏁 Completed'
-                elif expected_pct is not None and expected_pct > 0:
-                    ratio = percent / expected_pct
-                    if ratio >= 1.3:
-                        status = '🚀 Ahead'
-                    elif ratio <= 0.7:
-                        status = '🔴 Behind'
-                    else:
-                        status = '✅ On Track'
-                else:
-                    status = '⏳ In Progress' if percent > 0 else 'Pending'
-
-                prog_color = '#ff4444' if status == '🔴 Behind' else '#4CAF50'
-                target_display = f"{int(target_val_f)}" if (target_val_f is not None and float(target_val_f).is_integer()) else (f"{target_val_f}" if target_val_f is not None else '-')
-                current_display = f"{int(current)}" if float(current).is_integer() else f"{current}"
-                html_rows.append(f"""
-                    <tr>
-                      <td style='padding:8px;border-bottom:1px solid #eee;'>
-                        <div style='font-weight:600;color:#222'>{title}</div>
-                        <div style='color:#666;font-size:12px'>{current_display} of {target_display} completed</div>
-                      </td>
-                      <td style='padding:8px;border-bottom:1px solid #eee;'>
-                        <div style='width:140px;max-width:100%;height:8px;background:#eee;border-radius:4px;overflow:hidden;'>
-                          <div style='width:{percent:.1f}%;height:8px;background:{prog_color};'></div>
-                        </div>
-                      </td>
-                      <td style='padding:8px;border-bottom:1px solid #eee;text-align:right;white-space:nowrap;'>{percent:.1f}%</td>
-                      <td style='padding:8px;border-bottom:1px solid #eee;'>
-                        <span style='display:inline-block;padding:2px 8px;border-radius:12px;background:{"#ffd6d6" if status=="🔴 Behind" else "#e7f7ec"};color:{"#c00000" if status=="🔴 Behind" else "#1b5e20"};font-size:12px;'>{status}</span>
-                      </td>
-                    </tr>
-                """)
-
-            if not lines:
-                lines.append("(No active goals yet)")
-
-            name = (email_addr.split('@')[0] or 'User').strip().title()
-            subject = 'Your Year Plan reminder'
-            body = (
-                f"Hello {name},\n\n"
-                "Here is your current goals summary:\n\n"
-                + "\n".join(lines) +
-                "\n\nKeep going!\n"
-            )
-            table_rows_html = "".join(html_rows) if html_rows else "<tr><td colspan='4' style='padding:12px;color:#666;'>No goals yet</td></tr>"
-            body_html = f"""
-            <div style='font-family:Arial,Helvetica,sans-serif;color:#222;line-height:1.5;'>
-              <p>Hello {name},</p>
-              <p>Here is your current goals summary:</p>
-              <table role='presentation' cellspacing='0' cellpadding='0' border='0' width='100%' style='border-collapse:collapse;min-width:320px;'>
-                <thead>
-                  <tr>
-                    <th align='left' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Project Name</th>
-                    <th align='left' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Progress</th>
-                    <th align='right' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Complete</th>
-                    <th align='left' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Status</th>
-                  </tr>
-                </thead>
-                <tbody>
-                  {table_rows_html}
-                </tbody>
-              </table>
-              <p style='margin-top:16px;'>Keep going!</p>
-            </div>
-            """
-            return subject, body, body_html
-
-        for row in users:
-            # row could be a tuple or dict depending on cursor default
+def _reminder_metrics_vectorized(user_ids):
+    """_reminder_goal_metrics for every goal of the given users in one NumPy pass.
+
+    Two queries (goals, then their goal_state rows) instead of per-goal reads; see
+    yearplan.progress_engine. Returns {goal_id: (current, percent, expected_pct, status)}.
+    """
+    goals = storage.get_goals_for_users(user_ids)
+    if not goals:
+        return {}
+    rows = []
+    for g in goals:
+        extras = goal_fields(g)
+        sd = extras.get('start_date')
+        rows.append({
+            'task_type': (extras.get('task_type') or 'increment').lower(),
+            'start': float(extras.get('start_value') or 0),
+            'target': extras.get('target'),
+            'start_date': sd[:10] if isinstance(sd, str) and len(sd) >= 10 else str(g.get('created_at'))[:10],
+            'end_date': str(g.get('target_date'))[:10] if g.get('target_date') else None,
+        })
+    cols = progress_engine.GoalColumns.from_rows(rows)
+    states = storage.get_goal_states_for_goals([g['id'] for g in goals])
+    current = [current_value_from_goal_state(rows[i]['start'], states.get(g['id'])) for i, g in enumerate(goals)]
+    _, percent, expected, status = progress_engine.evaluate(cols, current, clamp=False, completed_first=True)
+    out = {}
+    for i, g in enumerate(goals):
+        exp = None if expected[i] != expected[i] else float(expected[i])  # NaN -> None
+        out[g['id']] = (float(current[i]), float(percent[i]), exp, _ENGINE_LABELS[int(status[i])])
+    return out
+
+
+def send_reminders(targets):
+    """Render and send reminders to these users ({'id', 'email'}) and record last_reminder_sent.
+
+    Used by /api/process-reminders and the in-process scheduler; returns the dispatch result rows.
+    """
+    # Optional NumPy engine: metrics for every goal of every user up front
+    precomputed = {}
+    if progress_engine.enabled():
+        try:
+            precomputed = _reminder_metrics_vectorized([u['id'] for u in targets if u.get('id')])
+        except Exception as e:
+            print('[REMINDER] vectorized progress failed, using per-goal path:', e)
+            precomputed = {}
+
+    # Helper to build summary for a given user (reuse logic from manual endpoint)
+    def _build_summaries_for(user_id: int, email_addr: str):
+        raw = storage.get_user_goals(user_id) or []
+        states = {}
+        if any(g.get('id') not in precomputed for g in raw):
             try:
-                user_id = row[0] if isinstance(row, tuple) else row.get('id')
-                email = row[1] if isinstance(row, tuple) else row.get('email')
+                states = storage.get_goal_states(user_id)
             except Exception:
-                continue
+                states = {}
+        lines = []
+        html_rows = []
+        from datetime import datetime as _dt, date as _date
+        for g in raw:
+            title = g.get('title') or 'Untitled'
+            # typed goal columns
+            extras = goal_fields(g)
 
-            # Honor in-memory user preferences if present
-            prefs = _REMINDER_PREFS.get(email, {'enabled': True, 'frequency': 'weekly'})
-            if not prefs.get('enabled', True):
-                continue
+            start_val = float(extras.get('start_value') or 0)
+            target_val = extras.get('target')
+            target_val_f = float(target_val) if target_val is not None else None
+            task_type = (extras.get('task_type') or 'increment').lower()
 
-            total_processed += 1
-            try:
-                subject, body, body_html = _build_summaries_for(email)
-                if EMAIL_CONFIG.get('email') and EMAIL_CONFIG.get('password'):
-                    err = send_test_email(email, EMAIL_CONFIG, subject=subject, body_text=body, body_html=body_html)
-                    if err:
-                        failed_count += 1
-                        if DEBUG_WEB:
-                            print(f"[REMINDER] Failed for {email}: {err}")
-                    else:
-                        sent_count += 1
+            metrics = precomputed.get(g.get('id'))
+            if metrics is None:
+                metrics = _reminder_goal_metrics(g, extras, states.get(g.get('id')))
+            current, percent, expected_pct, status = metrics
+
+            end_date = g.get('target_date')
+            end_s = str(end_date)[:10] if end_date else '-'
+            if task_type == 'percentage':
+                line = f"- {title}: {percent:.1f}% (target 100%) due {end_s}"
+            else:
+                if target_val_f is not None:
+                    tgt_s = f"{int(target_val_f)}" if float(target_val_f).is_integer() else f"{target_val_f}"
                 else:
-                    # Not configured: treat as sent in dev
-                    if DEBUG_WEB:
-                        print(f"[REMINDER] Email not configured; would send to {email}")
-                    sent_count += 1
-            except Exception as e:
-                failed_count += 1
-                if DEBUG_WEB:
-                    print(f"[REMINDER] Error building/sending for {email}: {e}")
+                    tgt_s = "?"
+                cur_s = f"{int(current)}" if float(current).is_integer() else f"{current}"
+                line = f"- {title}: {percent:.1f}% ({cur_s}/{tgt_s}) due {end_s}"
+            lines.append(line)
+
+            prog_color = '#ff4444' if status == '🔴 Behind' else '#4CAF50'
+            target_display = f"{int(target_val_f)}" if (target_val_f is not None and float(target_val_f).is_integer()) else (f"{target_val_f}" if target_val_f is not None else '-')
+            current_display = f"{int(current)}" if float(current).is_integer() else f"{current}"
+            html_rows.append(f"""
+                <tr>
+                  <td style='padding:8px;border-bottom:1px solid #eee;'>
+                    <div style='font-weight:600;color:#222'>{title}</div>
+                    <div style='color:#666;font-size:12px'>{current_display} of {target_display} completed</div>
+                  </td>
+                  <td style='padding:8px;border-bottom:1px solid #eee;'>
+                    <div style='width:140px;max-width:100%;height:8px;background:#eee;border-radius:4px;overflow:hidden;'>
+                      <div style='width:{percent:.1f}%;height:8px;background:{prog_color};'></div>
+                    </div>
+                  </td>
+                  <td style='padding:8px;border-bottom:1px solid #eee;text-align:right;white-space:nowrap;'>{percent:.1f}%</td>
+                  <td style='padding:8px;border-bottom:1px solid #eee;'>
+                    <span style='display:inline-block;padding:2px 8px;border-radius:12px;background:{"#ffd6d6" if status=="🔴 Behind" else "#e7f7ec"};color:{"#c00000" if status=="🔴 Behind" else "#1b5e20"};font-size:12px;'>{status}</span>
+                  </td>
+                </tr>
+            """)
+
+        if not lines:
+            lines.append("(No active goals yet)")
+
+        name = (email_addr.split('@')[0] or 'User').strip().title()
+        subject = 'Your Year Plan reminder'
+        body = (
+            f"Hello {name},\n\n"
+            "Here is your current goals summary:\n\n"
+            + "\n".join(lines) +
+            "\n\nKeep going!\n"
+        )
+        table_rows_html = "".join(html_rows) if html_rows else "<tr><td colspan='4' style='padding:12px;color:#666;'>No goals yet</td></tr>"
+        body_html = f"""
+        <div style='font-family:Arial,Helvetica,sans-serif;color:#222;line-height:1.5;'>
+          <p>Hello {name},</p>
+          <p>Here is your current goals summary:</p>
+          <table role='presentation' cellspacing='0' cellpadding='0' border='0' width='100%' style='border-collapse:collapse;min-width:320px;'>
+            <thead>
+              <tr>
+                <th align='left' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Project Name</th>
+                <th align='left' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Progress</th>
+                <th align='right' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Complete</th>
+                <th align='left' style='padding:8px;border-bottom:2px solid #ddd;font-size:13px;color:#555;'>Status</th>
+              </tr>
+            </thead>
+            <tbody>
+              {table_rows_html}
+            </tbody>
+          </table>
+          <p style='margin-top:16px;'>Keep going!</p>
+        </div>
+        """
+        return subject, body, body_html
+
+    configured = bool(EMAIL_CONFIG.get('email') and EMAIL_CONFIG.get('password'))
+
+    def render(user):
+        return _build_summaries_for(user['id'], user['email'])
+
+    def send(user, payload, mailer):
+        if not configured:
+            # Not configured: treat as sent in dev
+            if DEBUG_WEB:
+                print(f"[REMINDER] Email not configured; would send to {user['email']}")
+            return None
+        subject, body, body_html = payload
+        return send_test_email(user['email'], EMAIL_CONFIG, subject=subject, body_text=body,
+                               body_html=body_html, mailer=mailer)
+
+    def on_sent(user):
+        storage.update_last_reminder_sent(user['id'])
+
+    # Render and send in parallel; each sender keeps one SMTP session for the whole run
+    results = reminder_dispatch.dispatch(
+        targets, render, send,
+        mailer_factory=(lambda: SMTPMailer(EMAIL_CONFIG)) if configured else (lambda: None),
+        on_sent=on_sent,
+        bucket=reminder_dispatch.bucket_for(EMAIL_CONFIG.get('smtp_server', '')) if configured else None,
+    )
+    # Per-user outcomes stay in the server log; the endpoint only returns counts
+    for r in results:
+        if r['status'] == 'failed':
+            print(f"[REMINDER] Failed for user {r['user_id']} ({r['email']}): {r['reason']}")
+    return results
+
+
+# Cron-style endpoint: process reminders for verified users that are due
+@app.route('/api/process-reminders', methods=['POST'])
+def api_process_reminders():
+    try:
+        # Verified users with reminders on whose frequency has elapsed
+        try:
+            targets = storage.get_users_needing_reminders()
+        except Exception as e:
+            if DEBUG_WEB:
+                print('[REMINDER] Failed to list users:', e)
+            return jsonify({'error': 'cannot list users'}), 500
+        total_processed = len(targets)
+
+        results = send_reminders(targets)
+        counts = reminder_dispatch.summarize(results)
 
         return jsonify({
             'message': f'Processed reminders for {total_processed} users',
-            'sent': sent_count,
-            'failed': failed_count,
-            'total_processed': total_processed
+            'sent': counts['sent'],
+            'failed': counts['failed'],
+            'skipped': counts['skipped'],
+            'total_processed': total_processed,
         }), 200
     except Exception as e:
         if DEBUG_WEB:
@@ -0,0 +1,183 @@
+"""Per-request database instrumentation for the MySQL backend.
+
+MySQLStorage.get_connection() hands out connections whose cursors time every
+execute()/executemany(); the statement is reduced to a fingerprint (literals
+and IN lists replaced by ``?``) so identical queries group together and no
+user data is kept. Queries are summed per request (thread-local, started and
+finished by the Flask hooks in app_mysql) and statements slower than
+SLOW_QUERY_MS are kept in a ring buffer for /site-config/slow-queries.
+
+    YEARPLAN_SLOW_QUERY_MS     single statement threshold (default 100)
+    YEARPLAN_SLOW_REQUEST_MS   request log threshold (default 500)
+    YEARPLAN_SLOW_QUERY_BUFFER ring buffer size (default 200)
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+SLOW_QUERY_MS = float(os.environ.get('YEARPLAN_SLOW_QUERY_MS', '100'))
+SLOW_REQUEST_MS = float(os.environ.get('YEARPLAN_SLOW_REQUEST_MS', '500'))
+
+_slow = deque(maxlen=int(os.environ.get('YEARPLAN_SLOW_QUERY_BUFFER', '200')))
+_slow_lock = threading.Lock()
+_local = threading.local()
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql) -> str:
+    """Normalized statement text: literals and placeholders -> ?, IN (?, ?, ...) -> IN (...)."""
+    text = sql.decode('utf-8', 'replace') if isinstance(sql, bytes) else str(sql)
+    text = _STRING.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _SPACE.sub(' ', text).strip()
+    return _IN_LIST.sub('IN (...)', text)
+
+
+class _Request:
+    __slots__ = ('queries', 'db_ms', 'acquire_ms', 'rows', 'fingerprints', 'started')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.acquire_ms = 0.0
+        self.rows = 0
+        self.fingerprints = Counter()
+        self.started = time.perf_counter()
+
+
+def start_request(path=None):
+    _local.current = _Request()
+    _local.path = path
+
+
+def finish_request():
+    """Summary of the current request's DB work (None outside a request); resets the thread state."""
+    req = getattr(_local, 'current', None)
+    _local.current = None
+    _local.path = None
+    if req is None:
+        return None
+    return {
+        'queries': req.queries,
+        'db_ms': round(req.db_ms, 2),
+        'acquire_ms': round(req.acquire_ms, 2),
+        'rows': req.rows,
+        'total_ms': round((time.perf_counter() - req.started) * 1000.0, 2),
+        # most repeated statement: a high count here is the usual N+1 signature
+        'top': req.fingerprints.most_common(1)[0] if req.fingerprints else None,
+    }
+
+
+def record_acquire(ms: float):
+    req = getattr(_local, 'current', None)
+    if req is not None:
+        req.acquire_ms += ms
+
+
+def record_query(sql, ms: float, rows: int):
+    fp = fingerprint(sql)
+    req = getattr(_local, 'current', None)
+    if req is not None:
+        req.queries += 1
+        req.db_ms += ms
+        req.rows += max(rows, 0)
+        req.fingerprints[fp] += 1
+    if ms >= SLOW_QUERY_MS:
+        with _slow_lock:
+            _slow.append({
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'ms': round(ms, 2),
+                'rows': rows,
+                'fingerprint': fp,
+                'path': getattr(_local, 'path', None),
+            })
+
+
+def slow_queries() -> list:
+    """Slowest statements first, from the ring buffer."""
+    with _slow_lock:
+        items = list(_slow)
+    return sorted(items, key=lambda q: q['ms'], reverse=True)
+
+
+def clear_slow_queries():
+    with _slow_lock:
+        _slow.clear()
+
+
+def server_timing(summary) -> str:
+    """Server-Timing header value for a finish_request() summary."""
+    return (f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries", '
+            f'db-acquire;dur={summary["acquire_ms"]}')
+
+
+class InstrumentedCursor:
+    """Cursor proxy timing execute()/executemany(); everything else goes to the wrapped cursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query) if args is None else self._cursor.execute(query, args)
+        finally:
+            record_query(query, (time.perf_counter() - start) * 1000.0, getattr(self._cursor, 'rowcount', -1))
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            record_query(query, (time.perf_counter() - start) * 1000.0, getattr(self._cursor, 'rowcount', -1))
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are InstrumentedCursor."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def init_app(app):
+    """Flask hooks: per-request summary as a Server-Timing header, slow requests logged."""
+    from flask import request
+
+    @app.before_request
+    def _db_metrics_start():
+        start_request(request.path)
+
+    @app.after_request
+    def _db_metrics_finish(response):
+        summary = finish_request()
+        if summary is None:
+            return response
+        response.headers['Server-Timing'] = server_timing(summary)
+        if summary['total_ms'] >= SLOW_REQUEST_MS:
+            top = summary['top']
+            print(f"[SLOW] {request.method} {request.path} {summary['total_ms']}ms "
+                  f"db={summary['db_ms']}ms queries={summary['queries']} rows={summary['rows']} "
+                  f"acquire={summary['acquire_ms']}ms"
+                  + (f" top={top[1]}x {top[0][:120]}" if top else ''))
+        return response
@@ -0,0 +1,112 @@
+"""Reusable SMTP session for sending many messages.
+
+A reminder run used to open a connection, STARTTLS, log in, send one message
+and quit for every recipient. SMTPMailer keeps one authenticated session
+open across a batch:
+
+    with SMTPMailer(EMAIL_CONFIG) as mailer:
+        for msg in messages:
+            mailer.send(msg)
+
+The session is replaced after ``max_per_connection`` messages (providers cap
+messages per connection, YEARPLAN_SMTP_MAX_PER_CONN, default 100) and
+reopened transparently when the server has dropped it (timeouts, 421);
+the message is then sent once more on the fresh session. Other SMTP errors,
+e.g. a refused recipient, propagate to the caller and leave the session
+usable for the next message.
+"""
+import os
+import smtplib
+import ssl
+import threading
+
+MAX_PER_CONNECTION = int(os.environ.get('YEARPLAN_SMTP_MAX_PER_CONN', '100'))
+
+# Errors meaning the session is gone (not that this message was rejected)
+_DISCONNECTED = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, ssl.SSLError)
+
+
+def _shutdown(server):
+    """QUIT the session, or just close the socket if the server is not answering."""
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+class SMTPMailer:
+    def __init__(self, cfg: dict, max_per_connection: int = None, timeout: float = 10, starttls: bool = None):
+        self.cfg = dict(cfg)
+        self.max_per_connection = max_per_connection or MAX_PER_CONNECTION
+        self.timeout = timeout
+        # default: STARTTLS on the submission port, implicit TLS on 465, plain otherwise
+        self.starttls = starttls
+        self._server = None
+        self._sent_on_conn = 0
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.reconnects = 0
+        self.sent = 0
+
+    def _open(self):
+        port = int(self.cfg.get('smtp_port', 587))
+        host = self.cfg.get('smtp_server', '')
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(host, port, timeout=self.timeout)
+        try:
+            if port != 465 and (self.starttls or (self.starttls is None and port == 587)):
+                server.starttls()
+            email_cred = (self.cfg.get('email') or '').encode('ascii', 'ignore').decode('ascii')
+            password_cred = (self.cfg.get('password') or '').encode('ascii', 'ignore').decode('ascii')
+            if email_cred and password_cred:
+                server.login(email_cred, password_cred)
+        except BaseException:
+            _shutdown(server)  # don't leak the socket when STARTTLS or login fails
+            raise
+        self._server = server
+        self._sent_on_conn = 0
+        self.connections += 1
+
+    def _close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            _shutdown(server)
+
+    def send(self, msg):
+        """Send an email.message.Message; raises on failure."""
+        with self._lock:
+            if self._server is not None and self._sent_on_conn >= self.max_per_connection:
+                self._close()
+            if self._server is None:
+                self._open()
+            try:
+                self._server.send_message(msg)
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code != 421:
+                    raise
+                self._reopen_and_send(msg)
+            except _DISCONNECTED:
+                self._reopen_and_send(msg)
+            self._sent_on_conn += 1
+            self.sent += 1
+
+    def _reopen_and_send(self, msg):
+        self._close()
+        self.reconnects += 1
+        self._open()
+        self._server.send_message(msg)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,350 @@
+"""Ordered schema migrations for the MySQL backend.
+
+Each migration runs once and is recorded in ``schema_version``; process
+startup only compares MAX(version) with LATEST (see MySQLStorage). Apply
+pending migrations before starting or restarting the app:
+
+    python -m yearplan.mysql_migrations            # migrate to LATEST
+    python -m yearplan.mysql_migrations --status   # print current / latest
+    python -m yearplan.mysql_migrations --to N     # stop after version N
+
+Migrations are idempotent (IF NOT EXISTS / information_schema checks) so a
+database created by older releases, which have no schema_version table,
+is brought forward without errors.
+
+5 and 6 move goals/goal_logs from user_email to user_id. They are not a
+rolling-deploy pair: this release writes only user_id, which needs 6
+(user_email is NOT NULL until then), and releases before it write only
+user_email, which 6 drops. Stop the old release, migrate, then start this one.
+"""
+import pymysql
+
+LOCK_NAME = 'yearplan_schema_migrations'
+
+
+def _base_tables(storage, cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            verification_token VARCHAR(255) UNIQUE,
+            token_expires DATETIME,
+            is_verified BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_email (email),
+            INDEX idx_verification_token (verification_token)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS goals (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_email VARCHAR(255) NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            description TEXT,
+            target_date DATE,
+            status ENUM('active', 'completed', 'paused', 'cancelled') DEFAULT 'active',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_email) REFERENCES users(email) ON DELETE CASCADE,
+            INDEX idx_user_email (user_email),
+            INDEX idx_status (status),
+            INDEX idx_target_date (target_date)
+        )
+    """)
+    # Milestones table (for future use)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS milestones (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            goal_id INT NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            description TEXT,
+            target_date DATE,
+            is_completed BOOLEAN DEFAULT FALSE,
+            completed_at DATETIME NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (goal_id) REFERENCES goals(id) ON DELETE CASCADE,
+            INDEX idx_goal_id (goal_id),
+            INDEX idx_target_date (target_date)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS goal_logs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            goal_id INT NOT NULL,
+            user_email VARCHAR(255) NOT NULL,
+            action ENUM('increment','decrement','update') NOT NULL,
+            value DOUBLE NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (goal_id) REFERENCES goals(id) ON DELETE CASCADE,
+            INDEX idx_goal_id (goal_id),
+            INDEX idx_user_email (user_email),
+            INDEX idx_created_at (created_at)
+        )
+    """)
+
+
+def _goal_state(storage, cursor):
+    # Materialized per-goal progress, written together with goal_logs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS goal_state (
+            goal_id INT PRIMARY KEY,
+            current_value DOUBLE NOT NULL DEFAULT 0,
+            log_count INT NOT NULL DEFAULT 0,
+            last_log_at DATETIME NULL,
+            percent DOUBLE NOT NULL DEFAULT 0,
+            is_completed BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (goal_id) REFERENCES goals(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def _has_column(cursor, table, column) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column),
+    )
+    return bool(cursor.fetchone()[0])
+
+
+def _has_index(cursor, table, index) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index),
+    )
+    return bool(cursor.fetchone()[0])
+
+
+def _has_foreign_key(cursor, table, column) -> bool:
+    return bool(_foreign_keys(cursor, table, column))
+
+
+def _foreign_keys(cursor, table, column) -> list:
+    cursor.execute(
+        "SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s "
+        "AND REFERENCED_TABLE_NAME IS NOT NULL",
+        (table, column),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _goal_columns(storage, cursor):
+    """Typed start_value/target/task_type/start_date columns, filled from the description JSON.
+
+    ALGORITHM=INSTANT/INPLACE keeps the table writable while the columns and
+    the (user_email, status, target_date) index are added.
+    """
+    if not _has_column(cursor, 'goals', 'task_type'):
+        ddl = ("ALTER TABLE goals ADD COLUMN start_value DOUBLE NOT NULL DEFAULT 0, ADD COLUMN target DOUBLE NULL, "
+               "ADD COLUMN task_type VARCHAR(16) NULL, ADD COLUMN start_date DATE NULL")
+        try:
+            cursor.execute(ddl + ", ALGORITHM=INSTANT")
+        except pymysql.err.MySQLError:
+            cursor.execute(ddl + ", ALGORITHM=INPLACE, LOCK=NONE")
+    if not _has_index(cursor, 'goals', 'idx_user_status_target'):
+        cursor.execute("ALTER TABLE goals ADD INDEX idx_user_status_target (user_email, status, target_date), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    storage.backfill_goal_columns()
+
+
+def _log_keyset_indexes(storage, cursor):
+    """Composite indexes behind keyset pagination of /api/logs and /api/goals/<id>/logs."""
+    if not _has_index(cursor, 'goal_logs', 'idx_logs_user_created'):
+        cursor.execute("ALTER TABLE goal_logs ADD INDEX idx_logs_user_created (user_email, created_at, id), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    if not _has_index(cursor, 'goal_logs', 'idx_logs_goal_created'):
+        cursor.execute("ALTER TABLE goal_logs ADD INDEX idx_logs_goal_created (goal_id, created_at, id), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+
+
+def _alter(cursor, ddl):
+    """Run an ALTER TABLE without blocking writers: INSTANT where supported, else INPLACE/LOCK=NONE."""
+    try:
+        cursor.execute(ddl + ", ALGORITHM=INSTANT")
+    except pymysql.err.MySQLError:
+        cursor.execute(ddl + ", ALGORITHM=INPLACE, LOCK=NONE")
+
+
+def _backfill_user_ids(cursor, table, batch_size=5000):
+    """Copy users.id into table.user_id by primary-key range (autocommit: one short transaction per batch)."""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    top = int(cursor.fetchone()[0] or 0)
+    for lo in range(0, top, batch_size):
+        cursor.execute(
+            f"UPDATE {table} t JOIN users u ON u.email = t.user_email SET t.user_id = u.id "
+            f"WHERE t.id > %s AND t.id <= %s AND t.user_id IS NULL",
+            (lo, lo + batch_size),
+        )
+
+
+def _user_id_columns(storage, cursor):
+    """Nullable user_id -> users(id) on goals/goal_logs, backfilled, with (user_id, created_at) indexes.
+
+    user_email stays in place (and NOT NULL) until migration 6, so the
+    previous release still runs against version 5; this one needs 6.
+    """
+    for table in ('goals', 'goal_logs'):
+        if not _has_column(cursor, table, 'user_id'):
+            _alter(cursor, f"ALTER TABLE {table} ADD COLUMN user_id INT NULL")
+        _backfill_user_ids(cursor, table)
+    if not _has_index(cursor, 'goals', 'idx_goals_user_created'):
+        cursor.execute("ALTER TABLE goals ADD INDEX idx_goals_user_created (user_id, created_at), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    if not _has_index(cursor, 'goals', 'idx_goals_user_status_target'):
+        cursor.execute("ALTER TABLE goals ADD INDEX idx_goals_user_status_target (user_id, status, target_date), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    if not _has_index(cursor, 'goal_logs', 'idx_logs_user_id_created'):
+        cursor.execute("ALTER TABLE goal_logs ADD INDEX idx_logs_user_id_created (user_id, created_at, id), "
+                       "ALGORITHM=INPLACE, LOCK=NONE")
+    # With foreign_key_checks off InnoDB adds the constraint in place instead of copying the table;
+    # the backfill above has already checked every row against users.
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    try:
+        for table in ('goals', 'goal_logs'):
+            if not _has_foreign_key(cursor, table, 'user_id'):
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT fk_{table}_user_id FOREIGN KEY (user_id) "
+                               f"REFERENCES users(id) ON DELETE CASCADE, ALGORITHM=INPLACE, LOCK=NONE")
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+
+
+def _drop_user_email(storage, cursor):
+    """user_id NOT NULL; drop user_email, its FK to users(email) and the indexes on it."""
+    for table in ('goals', 'goal_logs'):
+        if not _has_column(cursor, table, 'user_email'):
+            continue
+        # rows written by the previous release if it ran on after migration 5
+        _backfill_user_ids(cursor, table)
+    if _has_column(cursor, 'goal_logs', 'user_email'):
+        # logs whose email matches no user were never visible (aggregates join on the goal's owner)
+        cursor.execute("DELETE FROM goal_logs WHERE user_id IS NULL")
+    for table, indexes in (('goals', ('idx_user_email', 'idx_user_status_target')),
+                           ('goal_logs', ('idx_user_email', 'idx_logs_user_created'))):
+        if not _has_column(cursor, table, 'user_email'):
+            continue
+        for name in _foreign_keys(cursor, table, 'user_email'):
+            cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY `{name}`, ALGORITHM=INPLACE, LOCK=NONE")
+        for index in indexes:
+            if _has_index(cursor, table, index):
+                cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}, ALGORITHM=INPLACE, LOCK=NONE")
+        cursor.execute(f"ALTER TABLE {table} MODIFY user_id INT NOT NULL, DROP COLUMN user_email, "
+                       f"ALGORITHM=INPLACE, LOCK=NONE")
+
+
+def _email_outbox(storage, cursor):
+    # Durable queue for yearplan.mysql_outbox / yearplan.outbox.OutboxSender
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            idempotency_key VARCHAR(191) NOT NULL,
+            to_email VARCHAR(255) NOT NULL,
+            subject VARCHAR(255) NOT NULL,
+            body_text MEDIUMTEXT,
+            body_html MEDIUMTEXT,
+            status ENUM('pending', 'sending', 'sent', 'dead') NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME NULL,
+            UNIQUE KEY uq_outbox_key (idempotency_key),
+            INDEX idx_outbox_due (status, next_attempt_at)
+        )
+    """)
+
+
+def _reminder_columns(storage, cursor):
+    """Reminder preferences on users (they used to live in a per-process dict in app_mysql)."""
+    if not _has_column(cursor, 'users', 'reminder_enabled'):
+        _alter(cursor, "ALTER TABLE users ADD COLUMN reminder_enabled BOOLEAN NOT NULL DEFAULT TRUE, "
+                       "ADD COLUMN reminder_frequency VARCHAR(16) NOT NULL DEFAULT 'weekly', "
+                       "ADD COLUMN last_reminder_sent DATETIME NULL")
+
+
+# (version, description, apply(storage, cursor)); append only, never renumber
+MIGRATIONS = [
+    (1, 'users, goals, milestones, goal_logs', _base_tables),
+    (2, 'goal_state', _goal_state),
+    (3, 'typed goal columns + idx_user_status_target', _goal_columns),
+    (4, 'goal_logs keyset pagination indexes', _log_keyset_indexes),
+    (5, 'goals/goal_logs user_id -> users(id), backfilled', _user_id_columns),
+    (6, 'drop goals/goal_logs user_email', _drop_user_email),
+    (7, 'email_outbox', _email_outbox),
+    (8, 'users reminder_enabled/reminder_frequency/last_reminder_sent', _reminder_columns),
+]
+LATEST = MIGRATIONS[-1][0]
+# Oldest schema the current code runs against: contract steps after it may be applied later
+REQUIRED = 8
+
+
+def current_version(cursor) -> int:
+    """Applied schema version, 0 when schema_version does not exist yet."""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+    except pymysql.err.ProgrammingError:  # 1146: table doesn't exist
+        return 0
+    value = row[0] if isinstance(row, tuple) else list(row.values())[0]
+    return int(value or 0)
+
+
+def migrate(storage, target: int = None) -> list:
+    """Apply pending migrations up to ``target`` (default LATEST); returns the versions applied.
+
+    A named MySQL lock keeps concurrent runners (e.g. several hosts starting
+    with YEARPLAN_AUTO_MIGRATE=1) from applying the same migration twice.
+    """
+    target = LATEST if target is None else target
+    applied = []
+    with storage.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 300)", (LOCK_NAME,))
+        if not cursor.fetchone()[0]:
+            raise RuntimeError('could not acquire the schema migration lock')
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            version = current_version(cursor)
+            for number, description, apply in MIGRATIONS:
+                if number <= version or number > target:
+                    continue
+                print(f"[DB] migration {number}: {description}")
+                apply(storage, cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (number, description),
+                )
+                conn.commit()
+                applied.append(number)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    return applied
+
+
+if __name__ == '__main__':
+    import sys
+    from yearplan.mysql_storage import MySQLStorage
+    args = sys.argv[1:]
+    target = None
+    if len(args) == 2 and args[0] == '--to' and args[1].isdigit():
+        target, args = int(args[1]), []
+    if args not in ([], ['--status']):
+        print('usage: python -m yearplan.mysql_migrations [--status | --to N]')
+        sys.exit(2)
+    storage = MySQLStorage(check_schema=False)
+    if args == ['--status']:
+        with storage.get_connection() as conn:
+            print(f"[DB] schema version {current_version(conn.cursor())}, latest {LATEST}")
+    else:
+        done = migrate(storage, target)
+        print(f"[DB] applied migrations {done}" if done else f"[DB] schema already at version {target or LATEST}")
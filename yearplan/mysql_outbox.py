@@ -0,0 +1,101 @@
+"""email_outbox table behind yearplan.outbox.OutboxSender for the MySQL app.
+
+enqueue() is a single INSERT IGNORE on the unique idempotency_key. claim()
+leases due rows with SELECT ... FOR UPDATE SKIP LOCKED, so every worker
+process can run a sender without two of them taking the same message; a
+lease left behind by a crashed sender expires after LEASE_SECONDS.
+"""
+import pymysql
+
+from .outbox import MAX_ATTEMPTS, retry_delay
+
+LEASE_SECONDS = 300
+
+
+class MySQLOutbox:
+    def __init__(self, storage):
+        self.storage = storage
+
+    def enqueue(self, key: str, to: str, subject: str, text: str, html: str = None) -> bool:
+        """Queue a message; False when ``key`` is already queued, sent or dead."""
+        with self.storage.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT IGNORE INTO email_outbox (idempotency_key, to_email, subject, body_text, body_html)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (key, to, subject, text, html),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def claim(self, limit: int = 50) -> list:
+        with self.storage.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            conn.begin()
+            cursor.execute(
+                """
+                SELECT id, idempotency_key AS `key`, to_email AS `to`, subject, body_text AS text,
+                       body_html AS html, attempts
+                FROM email_outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (int(limit),),
+            )
+            rows = cursor.fetchall()
+            if rows:
+                cursor.execute(
+                    f"""
+                    UPDATE email_outbox
+                    SET status = 'sending', next_attempt_at = NOW() + INTERVAL {LEASE_SECONDS} SECOND
+                    WHERE id IN ({', '.join(['%s'] * len(rows))})
+                    """,
+                    [r['id'] for r in rows],
+                )
+            conn.commit()
+            return list(rows)
+
+    def mark_sent(self, msg):
+        with self.storage.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE email_outbox SET status = 'sent', attempts = attempts + 1, sent_at = NOW() WHERE id = %s",
+                (msg['id'],),
+            )
+            conn.commit()
+
+    def mark_failed(self, msg, error: str):
+        attempts = msg['attempts'] + 1
+        with self.storage.get_connection() as conn:
+            cursor = conn.cursor()
+            if attempts >= MAX_ATTEMPTS:
+                cursor.execute(
+                    "UPDATE email_outbox SET status = 'dead', attempts = %s, last_error = %s WHERE id = %s",
+                    (attempts, error[:2000], msg['id']),
+                )
+            else:
+                cursor.execute(
+                    """
+                    UPDATE email_outbox
+                    SET status = 'pending', attempts = %s, last_error = %s,
+                        next_attempt_at = NOW() + INTERVAL %s SECOND
+                    WHERE id = %s
+                    """,
+                    (attempts, error[:2000], int(retry_delay(attempts)), msg['id']),
+                )
+            conn.commit()
+
+    def dead_letters(self) -> list:
+        with self.storage.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(
+                """
+                SELECT id, idempotency_key AS `key`, to_email AS `to`, subject, attempts, last_error, created_at
+                FROM email_outbox WHERE status = 'dead' ORDER BY id DESC LIMIT 500
+                """
+            )
+            return cursor.fetchall()
@@ -0,0 +1,187 @@
+"""Bounded, thread-safe connection pool for the MySQL backend.
+
+Connections are pinged on checkout, rolled back on return, recycled after a
+maximum lifetime and dropped (never closed) in a forked child, so a gunicorn pre-fork worker never
+talks over a socket it inherited from the master.
+"""
+import os
+import time
+import threading
+from typing import Any, Callable, Dict
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, connect: Callable[[], Any], max_size: int = 10, max_lifetime: float = 3600.0,
+                 timeout: float = 30.0):
+        """``connect`` opens a new DB-API connection (e.g. ``lambda: pymysql.connect(**config)``).
+
+        max_size      connections open at once (idle + in use)
+        max_lifetime  seconds after which a connection is closed instead of reused (0 = never)
+        timeout       seconds acquire() waits for a free connection before PoolTimeout
+        """
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.max_lifetime = float(max_lifetime or 0)
+        self.timeout = float(timeout)
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # Bound method keeps the pool alive; pools are created once per process anyway
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Start from an empty pool. In a forked child the parent's sockets are forgotten, not closed."""
+        self._pid = os.getpid()
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []        # [(conn, created_at)], most recently returned last
+        self._born = {}        # id(conn) -> created_at for connections in use
+        self._open = 0
+        self._metrics = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'ping_failures': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_total_ms': 0.0,
+            'wait_max_ms': 0.0,
+            'acquire_total_ms': 0.0,
+            'peak_in_use': 0,
+        }
+
+    def _check_pid(self):
+        # Backstop for platforms without os.register_at_fork
+        if self._pid != os.getpid():
+            self._reset()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn) -> bool:
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Borrow a connection, opening one if the pool is below max_size; blocks while it is full."""
+        self._check_pid()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            conn = None
+            fresh = False
+            with self._cond:
+                while not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(f"no free connection after {self.timeout:.1f}s (max_size={self.max_size})")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, created = self._idle.pop()
+                else:
+                    self._open += 1  # reserve the slot; connect outside the lock
+            if conn is not None:
+                if self.max_lifetime and time.monotonic() - created > self.max_lifetime:
+                    self._drop(conn, 'recycled')
+                    continue
+                if not self._healthy(conn):
+                    self._drop(conn, 'ping_failures')
+                    continue
+            else:
+                fresh = True
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                created = time.monotonic()
+            with self._cond:
+                self._born[id(conn)] = created
+                m = self._metrics
+                m['checkouts'] += 1
+                if fresh:
+                    m['created'] += 1
+                m['acquire_total_ms'] += (time.monotonic() - started) * 1000.0
+                m['peak_in_use'] = max(m['peak_in_use'], len(self._born))
+                if waited:
+                    wait_ms = (time.monotonic() - started) * 1000.0
+                    m['waits'] += 1
+                    m['wait_total_ms'] += wait_ms
+                    m['wait_max_ms'] = max(m['wait_max_ms'], wait_ms)
+            return conn
+
+    def _drop(self, conn, reason: str = None):
+        """Close a connection that is not coming back and free its slot."""
+        self._close(conn)
+        with self._cond:
+            if reason:
+                self._metrics[reason] += 1
+            self._open -= 1
+            self._cond.notify()
+
+    def release(self, conn, discard: bool = False):
+        """Return a borrowed connection; ``discard`` closes it instead (e.g. after a connection error).
+
+        A connection going back to the pool is rolled back first, so a transaction
+        left open by the borrower (and its row locks) never reaches the next one;
+        if the rollback fails the connection is discarded.
+        """
+        if self._pid != os.getpid():
+            return  # borrowed before a fork: belongs to the parent
+        with self._cond:
+            created = self._born.pop(id(conn), None)
+            if created is None:
+                return  # not ours (pool was reset meanwhile)
+        expired = self.max_lifetime and time.monotonic() - created > self.max_lifetime
+        if not discard and not expired:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard or expired:
+            self._drop(conn, 'discarded' if discard else 'recycled')
+            return
+        with self._cond:
+            self._idle.append((conn, created))
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection (shutdown); borrowed ones are unaffected."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, utilization and wait-time counters."""
+        with self._cond:
+            out = dict(self._metrics)
+            in_use = len(self._born)
+            out.update({
+                'max_size': self.max_size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': in_use,
+                'utilization': round(in_use / self.max_size, 3),
+                'wait_avg_ms': round(out['wait_total_ms'] / out['waits'], 3) if out['waits'] else 0.0,
+            })
+        for key in ('wait_total_ms', 'wait_max_ms', 'acquire_total_ms'):
+            out[key] = round(out[key], 3)
+        return out
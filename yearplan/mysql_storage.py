@@ -1,16 +1,139 @@
 import os
 import json
+import time
+import threading
 import traceback
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 import pymysql
 from contextlib import contextmanager
+from .mysql_pool import ConnectionPool
+from . import db_metrics
+from . import mysql_migrations
 
 # Toggle verbose debug logs with env
 DEBUG_DB = os.environ.get("YEARPLAN_DEBUG_DB", "0") in {"1", "true", "True", "yes"}
+# Apply pending schema migrations at startup instead of refusing to start (dev convenience)
+AUTO_MIGRATE = os.environ.get("YEARPLAN_AUTO_MIGRATE", "0") in {"1", "true", "True", "yes"}
+# Seconds get_stats() results are reused (users/goals counts for /, /stats, /dashboard)
+STATS_TTL = float(os.environ.get("YEARPLAN_STATS_TTL", "30"))
+
+
+def current_value_from_aggregate(start_value, agg: Optional[Dict[str, Any]]):
+    """Current value of a goal from its get_goal_log_aggregates() row.
+
+    Same result as replaying the logs oldest to newest: the last 'update' (or
+    the start value) plus increments minus decrements logged after it.
+    """
+    if not agg or not agg.get('log_count'):
+        return start_value
+    base = agg.get('last_update_value')
+    base = start_value if base is None else float(base)
+    return base + float(agg.get('inc_since_update') or 0) - float(agg.get('dec_since_update') or 0)
+
+
+def current_value_from_goal_state(start_value, state: Optional[Dict[str, Any]]):
+    """Current value of a goal from its goal_state row (start value while it has no logs)."""
+    if not state or not state.get('log_count'):
+        return start_value
+    return float(state['current_value'])
+
+
+def goal_extras(description) -> Dict[str, Any]:
+    """The goal's description JSON (start_value, target, task_type, ...) as a dict."""
+    try:
+        if description:
+            return json.loads(description) if isinstance(description, str) else dict(description)
+    except Exception:
+        pass
+    return {}
+
+
+def goal_percent(extras: Dict[str, Any], current) -> float:
+    """Completion percent 0..100, as the dashboard computes it."""
+    try:
+        start_val = float(extras.get('start_value', 0) or 0)
+        target_val = extras.get('target')
+        if (extras.get('task_type') or 'increment').lower() == 'percentage':
+            return max(0.0, min(100.0, float(current)))
+        if target_val is None:
+            return 0.0
+        denom = abs(float(target_val) - start_val)
+        if denom == 0:
+            return 100.0
+        return max(0.0, min(100.0, abs(float(current) - start_val) / denom * 100.0))
+    except Exception:
+        return 0.0
+
+
+# Columns goal_fields() reads
+GOAL_FIELD_COLUMNS = "id, description, start_value, target, task_type, start_date"
+
+
+def goal_columns(extras: Dict[str, Any]):
+    """(start_value, target, task_type, start_date) column values from description extras."""
+    try:
+        start_value = float(extras.get('start_value') or 0)
+    except Exception:
+        start_value = 0.0
+    try:
+        target = float(extras['target']) if extras.get('target') is not None else None
+    except Exception:
+        target = None
+    task_type = (extras.get('task_type') or 'increment').lower()
+    start_date = None
+    sd = extras.get('start_date')
+    if sd and isinstance(sd, str) and len(sd) >= 10:
+        try:
+            start_date = datetime.strptime(sd[:10], '%Y-%m-%d').date()
+        except Exception:
+            start_date = None
+    return start_value, target, task_type, start_date
+
+
+def goal_fields(goal: Dict[str, Any]) -> Dict[str, Any]:
+    """start_value, target, task_type and start_date (ISO string) of a goal row.
+
+    Read from the typed columns; rows the backfill has not reached yet
+    (task_type NULL) fall back to the description JSON.
+    """
+    if goal.get('task_type') is None:
+        return goal_extras(goal.get('description'))
+    sd = goal.get('start_date')
+    return {
+        'start_value': goal.get('start_value'),
+        'target': goal.get('target'),
+        'task_type': goal['task_type'],
+        'start_date': sd.isoformat() if hasattr(sd, 'isoformat') else sd,
+    }
+
+
+# Per-goal log aggregates; {where} filters the goals (g)
+LOG_AGGREGATES_SQL = """
+    SELECT g.id AS goal_id,
+           COUNT(l.id) AS log_count,
+           MAX(l.created_at) AS last_log_at,
+           lu.value AS last_update_value,
+           lu.created_at AS last_update_at,
+           COALESCE(SUM(CASE WHEN l.action = 'increment'
+                              AND (lu.id IS NULL OR (l.created_at, l.id) > (lu.created_at, lu.id))
+                             THEN l.value END), 0) AS inc_since_update,
+           COALESCE(SUM(CASE WHEN l.action = 'decrement'
+                              AND (lu.id IS NULL OR (l.created_at, l.id) > (lu.created_at, lu.id))
+                             THEN l.value END), 0) AS dec_since_update
+    FROM goals g
+    LEFT JOIN goal_logs lu ON lu.id = (
+        SELECT u.id FROM goal_logs u
+        WHERE u.goal_id = g.id AND u.user_id = g.user_id AND u.action = 'update'
+        ORDER BY u.created_at DESC, u.id DESC LIMIT 1
+    )
+    LEFT JOIN goal_logs l ON l.goal_id = g.id AND l.user_id = g.user_id
+    WHERE {where}
+    GROUP BY g.id, lu.id, lu.value, lu.created_at
+"""
 
 class MySQLStorage:
-    def __init__(self, connection_config: Dict[str, str] = None):
+    def __init__(self, connection_config: Dict[str, str] = None, check_schema: bool = True):
         """Initialize MySQL storage with connection configuration"""
         if connection_config is None:
             # Default configuration from environment variables
@@ -24,111 +147,110 @@ class MySQLStorage:
             }
         else:
             self.config = connection_config
-        
-        # Initialize database tables
-        self._create_tables()
+
+        # Shared by all request threads; sized per gunicorn worker
+        self.pool = ConnectionPool(
+            self._connect,
+            max_size=int(os.environ.get('MYSQL_POOL_SIZE', '10')),
+            max_lifetime=float(os.environ.get('MYSQL_POOL_MAX_LIFETIME', '3600')),
+            timeout=float(os.environ.get('MYSQL_POOL_TIMEOUT', '30')),
+        )
+
+        self._stats_cache = None  # (expires_at, stats)
+        self._stats_lock = threading.Lock()
+
+        # Tables are created/altered by yearplan.mysql_migrations, not on every start
+        if check_schema:
+            self._check_schema()
+
+    def _connect(self):
+        if DEBUG_DB:
+            print(f"[DB] Connecting with config: {{'host': '{self.config.get('host')}', 'user': '{self.config.get('user')}', 'database': '{self.config.get('database')}', 'charset': '{self.config.get('charset')}', 'autocommit': {self.config.get('autocommit')}}}")
+        return pymysql.connect(**self.config)
 
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
+        """Borrow a pooled connection for the duration of the block"""
         connection = None
+        broken = False
         try:
-            if DEBUG_DB:
-                print(f"[DB] Connecting with config: {{'host': '{self.config.get('host')}', 'user': '{self.config.get('user')}', 'database': '{self.config.get('database')}', 'charset': '{self.config.get('charset')}', 'autocommit': {self.config.get('autocommit')}}}")
-            connection = pymysql.connect(**self.config)
-            yield connection
+            start = time.perf_counter()
+            connection = self.pool.acquire()
+            db_metrics.record_acquire((time.perf_counter() - start) * 1000.0)
+            yield db_metrics.InstrumentedConnection(connection)
         except Exception as e:
             tb = traceback.format_exc()
             print(f"[DB] Connection error: {e}\n{tb}")
+            # Lost/unusable connections are closed rather than handed to the next request
+            broken = isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
             if connection:
                 try:
                     connection.rollback()
                 except Exception:
-                    pass
+                    broken = True
             # Do not swallow; propagate to caller so app can return 500 with details
             raise
         finally:
             if connection:
-                try:
-                    connection.close()
-                except Exception:
-                    pass
+                self.pool.release(connection, discard=broken)
 
-    def _create_tables(self):
-        """Create database tables if they don't exist"""
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool size, utilization and wait times."""
+        return self.pool.stats()
+
+    def _check_schema(self):
+        """One cheap query: fail fast (or migrate, with YEARPLAN_AUTO_MIGRATE=1) when the schema is behind."""
+        with self.get_connection() as conn:
+            version = mysql_migrations.current_version(conn.cursor())
+        if version >= mysql_migrations.LATEST:
+            return
+        if AUTO_MIGRATE:
+            mysql_migrations.migrate(self)
+            return
+        if version >= mysql_migrations.REQUIRED:
+            print(f"[DB] schema at version {version}, latest {mysql_migrations.LATEST}; "
+                  "run python -m yearplan.mysql_migrations once older processes are gone")
+            return
+        raise RuntimeError(
+            f"MySQL schema is at version {version}, this code needs {mysql_migrations.REQUIRED}; "
+            "run: python -m yearplan.mysql_migrations"
+        )
+
+    def backfill_goal_columns(self, batch_size: int = 500, pause: float = 0.0) -> int:
+        """Copy start_value/target/task_type/start_date out of the description JSON, one short batch at a time.
+
+        Safe to run while the app serves traffic: rows written since the columns
+        existed already have task_type set and are skipped, and each batch only
+        touches rows that are still unfilled.
+        """
+        done = 0
+        last_id = 0
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # Users table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    verification_token VARCHAR(255) UNIQUE,
-                    token_expires DATETIME,
-                    is_verified BOOLEAN DEFAULT FALSE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    INDEX idx_email (email),
-                    INDEX idx_verification_token (verification_token)
-                )
-            """)
-            
-            # Goals table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS goals (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_email VARCHAR(255) NOT NULL,
-                    title VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    target_date DATE,
-                    status ENUM('active', 'completed', 'paused', 'cancelled') DEFAULT 'active',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_email) REFERENCES users(email) ON DELETE CASCADE,
-                    INDEX idx_user_email (user_email),
-                    INDEX idx_status (status),
-                    INDEX idx_target_date (target_date)
-                )
-            """)
-            
-            # Milestones table (for future use)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS milestones (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    goal_id INT NOT NULL,
-                    title VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    target_date DATE,
-                    is_completed BOOLEAN DEFAULT FALSE,
-                    completed_at DATETIME NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (goal_id) REFERENCES goals(id) ON DELETE CASCADE,
-                    INDEX idx_goal_id (goal_id),
-                    INDEX idx_target_date (target_date)
+            while True:
+                cursor.execute(
+                    "SELECT id, description FROM goals WHERE task_type IS NULL AND id > %s ORDER BY id LIMIT %s",
+                    (last_id, batch_size),
                 )
-            """)
-
-            # Goal logs table to track progress
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS goal_logs (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    goal_id INT NOT NULL,
-                    user_email VARCHAR(255) NOT NULL,
-                    action ENUM('increment','decrement','update') NOT NULL,
-                    value DOUBLE NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (goal_id) REFERENCES goals(id) ON DELETE CASCADE,
-                    INDEX idx_goal_id (goal_id),
-                    INDEX idx_user_email (user_email),
-                    INDEX idx_created_at (created_at)
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                conn.begin()
+                cursor.executemany(
+                    """
+                    UPDATE goals SET start_value = %s, target = %s, task_type = %s, start_date = %s
+                    WHERE id = %s AND task_type IS NULL
+                    """,
+                    [goal_columns(goal_extras(desc)) + (gid,) for gid, desc in rows],
                 )
-                """
-            )
-            
-            conn.commit()
+                conn.commit()
+                done += len(rows)
+                if DEBUG_DB:
+                    print(f"[DB] backfill_goal_columns {done} row(s), last id {last_id}")
+                if pause:
+                    time.sleep(pause)
+        return done
 
     def add_user(self, email: str, password: str, verification_token: str, token_expires: str) -> bool:
         """Add a new user to the database"""
@@ -220,39 +342,44 @@ class MySQLStorage:
             conn.commit()
             return True
 
-    def add_goal(self, user_email: str, title: str, description: str, target_date: str) -> Optional[Dict[str, Any]]:
+    def add_goal(self, user_id: int, title: str, description: str, target_date: str) -> Optional[Dict[str, Any]]:
         """Add a new goal for a user"""
         with self.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] add_goal user_email={user_email} title={title}")
+                print(f"[DB] add_goal user_id={user_id} title={title}")
+            conn.begin()
 
             # Verify user exists and is verified
             cursor.execute(
                 """
-                SELECT id FROM users WHERE email = %s AND is_verified = TRUE
+                SELECT id FROM users WHERE id = %s AND is_verified = TRUE
                 """,
-                (user_email,),
+                (user_id,),
             )
 
             if not cursor.fetchone():
+                conn.rollback()
                 return None
 
             # Insert goal
             cursor.execute(
                 """
-                INSERT INTO goals (user_email, title, description, target_date, status)
-                VALUES (%s, %s, %s, %s, 'active')
+                INSERT INTO goals (user_id, title, description, target_date, status,
+                                   start_value, target, task_type, start_date)
+                VALUES (%s, %s, %s, %s, 'active', %s, %s, %s, %s)
                 """,
-                (user_email, title, description, target_date),
+                (user_id, title, description, target_date) + goal_columns(goal_extras(description)),
             )
 
             goal_id = cursor.lastrowid
+            self._refresh_goal_states(conn, [goal_id])
 
             # Fetch the created goal
             cursor.execute(
                 """
-                SELECT id, user_email, title, description, target_date, status, created_at
+                SELECT id, user_id, title, description, target_date, status, created_at,
+                       start_value, target, task_type, start_date
                 FROM goals WHERE id = %s
                 """,
                 (goal_id,),
@@ -262,97 +389,133 @@ class MySQLStorage:
             conn.commit()
             return goal
 
-    def get_user_goals(self, user_email: str) -> List[Dict[str, Any]]:
+    def get_user_goals(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all goals for a specific user"""
         with self.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] get_user_goals user_email={user_email}")
+                print(f"[DB] get_user_goals user_id={user_id}")
 
             cursor.execute(
                 """
-                SELECT id, user_email, title, description, target_date, status, created_at, updated_at
-                FROM goals WHERE user_email = %s ORDER BY created_at DESC
+                SELECT id, user_id, title, description, target_date, status, created_at, updated_at,
+                       start_value, target, task_type, start_date
+                FROM goals WHERE user_id = %s ORDER BY created_at DESC
                 """,
-                (user_email,),
+                (user_id,),
             )
 
             return cursor.fetchall()
 
-    def update_goal_status(self, goal_id: int, status: str, user_email: str) -> bool:
+    def update_goal_status(self, goal_id: int, status: str, user_id: int) -> bool:
         """Update goal status"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             if DEBUG_DB:
-                print(f"[DB] update_goal_status id={goal_id} status={status} user={user_email}")
+                print(f"[DB] update_goal_status id={goal_id} status={status} user={user_id}")
 
             cursor.execute(
                 """
                 UPDATE goals SET status = %s 
-                WHERE id = %s AND user_email = %s
+                WHERE id = %s AND user_id = %s
                 """,
-                (status, goal_id, user_email),
+                (status, goal_id, user_id),
             )
 
             conn.commit()
             return cursor.rowcount > 0
 
-    def get_goal_for_user(self, goal_id: int, user_email: str) -> Optional[Dict[str, Any]]:
+    def get_goal_for_user(self, goal_id: int, user_id: int) -> Optional[Dict[str, Any]]:
         """Fetch a single goal by id for a given user."""
         with self.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] get_goal_for_user id={goal_id} user={user_email}")
+                print(f"[DB] get_goal_for_user id={goal_id} user={user_id}")
             cursor.execute(
                 """
-                SELECT id, user_email, title, description, target_date, status, created_at, updated_at
-                FROM goals WHERE id = %s AND user_email = %s
+                SELECT id, user_id, title, description, target_date, status, created_at, updated_at,
+                       start_value, target, task_type, start_date
+                FROM goals WHERE id = %s AND user_id = %s
                 """,
-                (goal_id, user_email),
+                (goal_id, user_id),
             )
             return cursor.fetchone()
 
-    def update_goal_title(self, goal_id: int, user_email: str, title: str) -> bool:
+    def update_goal_title(self, goal_id: int, user_id: int, title: str) -> bool:
         """Update the title of a goal, ensuring it belongs to the user."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             if DEBUG_DB:
-                print(f"[DB] update_goal_title id={goal_id} title={title} user={user_email}")
+                print(f"[DB] update_goal_title id={goal_id} title={title} user={user_id}")
             cursor.execute(
                 """
-                UPDATE goals SET title = %s WHERE id = %s AND user_email = %s
+                UPDATE goals SET title = %s WHERE id = %s AND user_id = %s
                 """,
-                (title, goal_id, user_email),
+                (title, goal_id, user_id),
             )
             conn.commit()
             return cursor.rowcount > 0
 
-    def update_goal_description(self, goal_id: int, user_email: str, description: str) -> bool:
+    def update_goal_description(self, goal_id: int, user_id: int, description: str) -> bool:
         """Update the description JSON for a goal, ensuring it belongs to the user."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             if DEBUG_DB:
-                print(f"[DB] update_goal_description id={goal_id} user={user_email}")
+                print(f"[DB] update_goal_description id={goal_id} user={user_id}")
+            conn.begin()
             cursor.execute(
                 """
-                UPDATE goals SET description = %s WHERE id = %s AND user_email = %s
+                UPDATE goals SET description = %s, start_value = %s, target = %s, task_type = %s, start_date = %s
+                WHERE id = %s AND user_id = %s
                 """,
-                (description, goal_id, user_email),
+                (description,) + goal_columns(goal_extras(description)) + (goal_id, user_id),
             )
+            updated = cursor.rowcount > 0
+            if updated:
+                # start value / target may have changed the percent
+                self._refresh_goal_states(conn, [goal_id])
             conn.commit()
-            return cursor.rowcount > 0
+            return updated
+
+    def update_goal_target(self, goal_id: int, user_id: int, target) -> bool:
+        """Set a goal's target column (and the copy in its description JSON) in one statement."""
+        try:
+            target_f = float(target) if target is not None else None
+        except Exception:
+            target_f = None
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if DEBUG_DB:
+                print(f"[DB] update_goal_target id={goal_id} target={target} user={user_id}")
+            conn.begin()
+            cursor.execute(
+                """
+                UPDATE goals
+                SET target = %s,
+                    description = CASE WHEN JSON_VALID(description)
+                                       THEN JSON_SET(description, '$.target', CAST(%s AS JSON))
+                                       ELSE description END
+                WHERE id = %s AND user_id = %s
+                """,
+                (target_f, json.dumps(target), goal_id, user_id),
+            )
+            updated = cursor.rowcount > 0
+            if updated:
+                self._refresh_goal_states(conn, [goal_id])
+            conn.commit()
+            return updated
 
-    def delete_goal(self, goal_id: int, user_email: str) -> bool:
+    def delete_goal(self, goal_id: int, user_id: int) -> bool:
         """Delete a goal if it belongs to the user. goal_logs will cascade delete."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             if DEBUG_DB:
-                print(f"[DB] delete_goal id={goal_id} user={user_email}")
+                print(f"[DB] delete_goal id={goal_id} user={user_id}")
             cursor.execute(
                 """
-                DELETE FROM goals WHERE id = %s AND user_email = %s
+                DELETE FROM goals WHERE id = %s AND user_id = %s
                 """,
-                (goal_id, user_email),
+                (goal_id, user_id),
             )
             conn.commit()
             return cursor.rowcount > 0
@@ -377,74 +540,288 @@ class MySQLStorage:
     # --------------------
     # Logs operations
     # --------------------
-    def add_goal_log(self, goal_id: int, user_email: str, action: str, value: float) -> Optional[Dict[str, Any]]:
+    def add_goal_log(self, goal_id: int, user_id: int, action: str, value: float) -> Optional[Dict[str, Any]]:
         """Insert a log row and return the created log."""
         with self.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] add_goal_log goal_id={goal_id} user={user_email} action={action} value={value}")
+                print(f"[DB] add_goal_log goal_id={goal_id} user={user_id} action={action} value={value}")
+            conn.begin()
+            # Lock the goal so concurrent logs fold into goal_state one at a time
+            cursor.execute(f"SELECT {GOAL_FIELD_COLUMNS} FROM goals WHERE id = %s AND user_id = %s FOR UPDATE",
+                           (goal_id, user_id))
+            goal = cursor.fetchone()
+            if goal is None:
+                conn.rollback()
+                return None  # missing, or another user's goal
             cursor.execute(
                 """
-                INSERT INTO goal_logs (goal_id, user_email, action, value)
+                INSERT INTO goal_logs (goal_id, user_id, action, value)
                 VALUES (%s, %s, %s, %s)
                 """,
-                (goal_id, user_email, action, float(value)),
+                (goal_id, user_id, action, float(value)),
             )
             log_id = cursor.lastrowid
             cursor.execute(
                 """
-                SELECT id, goal_id, user_email, action, value, created_at
+                SELECT id, goal_id, user_id, action, value, created_at
                 FROM goal_logs WHERE id = %s
                 """,
                 (log_id,),
             )
             row = cursor.fetchone()
+            cursor.execute("SELECT current_value, log_count FROM goal_state WHERE goal_id = %s", (goal_id,))
+            state = cursor.fetchone()
+            if state is None:
+                self._refresh_goal_states(conn, [goal_id])
+            else:
+                extras = goal_fields(goal)
+                current = current_value_from_goal_state(float(extras.get('start_value') or 0), state)
+                if action == 'update':
+                    current = float(value)
+                elif action == 'increment':
+                    current += float(value)
+                elif action == 'decrement':
+                    current -= float(value)
+                percent = goal_percent(extras, current)
+                cursor.execute(
+                    """
+                    UPDATE goal_state
+                    SET current_value = %s, log_count = log_count + 1, last_log_at = %s,
+                        percent = %s, is_completed = %s
+                    WHERE goal_id = %s
+                    """,
+                    (current, row['created_at'], percent, percent >= 100, goal_id),
+                )
             conn.commit()
             return row
 
-    def get_goal_logs(self, goal_id: int, user_email: str) -> List[Dict[str, Any]]:
+    def get_goal_logs(self, goal_id: int, user_id: int) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] get_goal_logs goal_id={goal_id} user={user_email}")
+                print(f"[DB] get_goal_logs goal_id={goal_id} user={user_id}")
             cursor.execute(
                 """
-                SELECT id, goal_id, user_email, action, value, created_at
-                FROM goal_logs WHERE goal_id = %s AND user_email = %s
+                SELECT id, goal_id, user_id, action, value, created_at
+                FROM goal_logs WHERE goal_id = %s AND user_id = %s
                 ORDER BY created_at DESC, id DESC
                 """,
-                (goal_id, user_email),
+                (goal_id, user_id),
             )
             return cursor.fetchall()
 
-    def get_all_logs_for_user(self, user_email: str) -> List[Dict[str, Any]]:
+    def get_all_logs_for_user(self, user_id: int) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] get_all_logs_for_user user={user_email}")
+                print(f"[DB] get_all_logs_for_user user={user_id}")
             cursor.execute(
                 """
-                SELECT id, goal_id, user_email, action, value, created_at
-                FROM goal_logs WHERE user_email = %s
+                SELECT id, goal_id, user_id, action, value, created_at
+                FROM goal_logs WHERE user_id = %s
+                ORDER BY created_at DESC, id DESC
+                """,
+                (user_id,),
+            )
+            return cursor.fetchall()
+
+    def get_logs_page(self, user_id: int, goal_id: int = None, before=None, limit: int = 200) -> List[Dict[str, Any]]:
+        """One page of the user's logs (optionally one goal's), newest first by (created_at, id).
+
+        ``before`` is the (created_at, id) key of the previous page's last row;
+        served by the (user_id, created_at, id) / (goal_id, created_at, id) indexes.
+        """
+        where = ["user_id = %s"]
+        params = [user_id]
+        if goal_id is not None:
+            where.append("goal_id = %s")
+            params.append(goal_id)
+        if before is not None:
+            where.append("(created_at < %s OR (created_at = %s AND id < %s))")
+            params.extend([before[0], before[0], before[1]])
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            if DEBUG_DB:
+                print(f"[DB] get_logs_page user={user_id} goal_id={goal_id} before={before} limit={limit}")
+            cursor.execute(
+                f"""
+                SELECT id, goal_id, user_id, action, value, created_at
+                FROM goal_logs WHERE {' AND '.join(where)}
                 ORDER BY created_at DESC, id DESC
+                LIMIT %s
                 """,
-                (user_email,),
+                params + [int(limit)],
             )
             return cursor.fetchall()
 
-    def delete_log(self, log_id: int, user_email: str) -> bool:
+    def get_goal_log_aggregates(self, user_id: int) -> Dict[int, Dict[str, Any]]:
+        """Per-goal log aggregates for all of a user's goals in one query.
+
+        {goal_id: {log_count, last_log_at, last_update_value, last_update_at,
+        inc_since_update, dec_since_update}}; "since" follows log order (created_at, id) and covers
+        all logs when the goal has no 'update'. Goals without logs are included.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            if DEBUG_DB:
+                print(f"[DB] get_goal_log_aggregates user={user_id}")
+            cursor.execute(LOG_AGGREGATES_SQL.format(where="g.user_id = %s"), (user_id,))
+            return {row['goal_id']: row for row in cursor.fetchall()}
+
+    def _refresh_goal_states(self, conn, goal_ids: List[int]) -> int:
+        """Recompute goal_state rows for the given goals from their logs (inside the caller's transaction)."""
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        ids = [int(i) for i in goal_ids or []]
+        done = 0
+        for i in range(0, len(ids), 1000):
+            chunk = ids[i:i + 1000]
+            marks = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"SELECT {GOAL_FIELD_COLUMNS} FROM goals WHERE id IN ({marks})", chunk)
+            goals = {r['id']: r for r in cursor.fetchall()}
+            cursor.execute(LOG_AGGREGATES_SQL.format(where=f"g.id IN ({marks})"), chunk)
+            aggs = cursor.fetchall()
+            params = []
+            for agg in aggs:
+                extras = goal_fields(goals.get(agg['goal_id']) or {})
+                current = float(current_value_from_aggregate(float(extras.get('start_value') or 0), agg))
+                percent = goal_percent(extras, current)
+                params.append((agg['goal_id'], current, agg['log_count'], agg['last_log_at'], percent, percent >= 100))
+            if params:
+                cursor.executemany(
+                    """
+                    INSERT INTO goal_state (goal_id, current_value, log_count, last_log_at, percent, is_completed)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE current_value = VALUES(current_value), log_count = VALUES(log_count),
+                        last_log_at = VALUES(last_log_at), percent = VALUES(percent), is_completed = VALUES(is_completed)
+                    """,
+                    params,
+                )
+            done += len(params)
+        return done
+
+    def _goal_states_where(self, where: str, params) -> Dict[int, Dict[str, Any]]:
+        sql = f"""
+            SELECT g.id AS goal_id, s.current_value, s.log_count, s.last_log_at, s.percent, s.is_completed
+            FROM goals g LEFT JOIN goal_state s ON s.goal_id = g.id
+            WHERE {where}
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(sql, params)
+            out = {row['goal_id']: row for row in cursor.fetchall()}
+            missing = [gid for gid, row in out.items() if row['log_count'] is None]
+            if missing:
+                # Goals written before goal_state existed: materialize them now
+                if DEBUG_DB:
+                    print(f"[DB] goal_state missing for {len(missing)} goal(s); rebuilding")
+                conn.begin()
+                self._refresh_goal_states(conn, missing)
+                conn.commit()
+                cursor.execute(sql, params)
+                out = {row['goal_id']: row for row in cursor.fetchall()}
+            return out
+
+    def get_goal_states(self, user_id: int) -> Dict[int, Dict[str, Any]]:
+        """goal_state rows (current_value, log_count, last_log_at, percent, is_completed) of a user's goals."""
+        if DEBUG_DB:
+            print(f"[DB] get_goal_states user={user_id}")
+        return self._goal_states_where("g.user_id = %s", (user_id,))
+
+    def get_goal_states_for_goals(self, goal_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """goal_state rows for several goals (batch reminder runs)."""
+        ids = list(goal_ids or [])
+        if DEBUG_DB:
+            print(f"[DB] get_goal_states_for_goals n={len(ids)}")
+        out = {}
+        for i in range(0, len(ids), 1000):
+            chunk = ids[i:i + 1000]
+            out.update(self._goal_states_where(f"g.id IN ({', '.join(['%s'] * len(chunk))})", chunk))
+        return out
+
+    def rebuild_goal_states(self, batch_size: int = 500) -> int:
+        """Repair: recompute every goal_state row from goal_logs, one batch per transaction."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("SELECT id FROM goals ORDER BY id")
+            ids = [r[0] for r in cursor.fetchall()]
+            done = 0
+            for i in range(0, len(ids), batch_size):
+                conn.begin()
+                done += self._refresh_goal_states(conn, ids[i:i + batch_size])
+                conn.commit()
+                if DEBUG_DB:
+                    print(f"[DB] rebuild_goal_states {done}/{len(ids)}")
+            return done
+
+    def get_goals_for_users(self, user_ids: List[int]) -> List[Dict[str, Any]]:
+        """Goals of several users in one query (batch reminder runs)."""
+        out = []
+        ids = [int(i) for i in user_ids or []]
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
             if DEBUG_DB:
-                print(f"[DB] delete_log id={log_id} user={user_email}")
+                print(f"[DB] get_goals_for_users n={len(ids)}")
+            for i in range(0, len(ids), 1000):
+                chunk = ids[i:i + 1000]
+                cursor.execute(
+                    f"""
+                    SELECT id, user_id, title, description, target_date, status, created_at, updated_at,
+                       start_value, target, task_type, start_date
+                    FROM goals WHERE user_id IN ({', '.join(['%s'] * len(chunk))})
+                    ORDER BY user_id, created_at DESC
+                    """,
+                    chunk,
+                )
+                out.extend(cursor.fetchall())
+        return out
+
+    def get_logs_for_goals(self, goal_ids: List[int]) -> List[Dict[str, Any]]:
+        """Logs of several goals in one query, oldest first within each goal."""
+        out = []
+        ids = list(goal_ids or [])
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            if DEBUG_DB:
+                print(f"[DB] get_logs_for_goals n={len(ids)}")
+            for i in range(0, len(ids), 1000):
+                chunk = ids[i:i + 1000]
+                cursor.execute(
+                    f"""
+                    SELECT goal_id, action, value FROM goal_logs
+                    WHERE goal_id IN ({', '.join(['%s'] * len(chunk))})
+                    ORDER BY goal_id, created_at, id
+                    """,
+                    chunk,
+                )
+                out.extend(cursor.fetchall())
+        return out
+
+    def delete_log(self, log_id: int, user_id: int) -> bool:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if DEBUG_DB:
+                print(f"[DB] delete_log id={log_id} user={user_id}")
+            conn.begin()
+            cursor.execute(
+                "SELECT goal_id FROM goal_logs WHERE id = %s AND user_id = %s FOR UPDATE",
+                (log_id, user_id),
+            )
+            found = cursor.fetchone()
+            if not found:
+                conn.rollback()
+                return False
             cursor.execute(
                 """
-                DELETE FROM goal_logs WHERE id = %s AND user_email = %s
+                DELETE FROM goal_logs WHERE id = %s AND user_id = %s
                 """,
-                (log_id, user_email),
+                (log_id, user_id),
             )
+            deleted = cursor.rowcount > 0
+            # Removing a log can expose an older 'update': recompute from the remaining logs
+            self._refresh_goal_states(conn, [found[0]])
             conn.commit()
-            return cursor.rowcount > 0
+            return deleted
 
     def update_verification_token(self, email: str, token: str, token_expires: str) -> bool:
         """Set/refresh the user's verification token and expiry, and mark as unverified."""
@@ -470,35 +847,141 @@ class MySQLStorage:
             conn.commit()
             return cursor.rowcount > 0
 
-    def get_stats(self) -> Dict[str, int]:
-        """Get basic statistics"""
+    def update_user_reminder_preferences(self, user_id: int, frequency: str, enabled: bool = True) -> bool:
+        """Update user's reminder preferences"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             if DEBUG_DB:
-                print("[DB] get_stats")
-
-            # Count users
-            cursor.execute("SELECT COUNT(*) FROM users")
-            user_count = cursor.fetchone()[0]
+                print(f"[DB] update_user_reminder_preferences user_id={user_id} frequency={frequency} enabled={enabled}")
+            cursor.execute(
+                "UPDATE users SET reminder_frequency = %s, reminder_enabled = %s WHERE id = %s",
+                (frequency, bool(enabled), user_id),
+            )
+            conn.commit()
+            if cursor.rowcount > 0:
+                return True
+            # rowcount counts changed rows: saving the same preferences again is still a success
+            cursor.execute("SELECT 1 FROM users WHERE id = %s", (user_id,))
+            return cursor.fetchone() is not None
+
+    def get_user_reminder_preferences(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user's reminder preferences"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT reminder_frequency, reminder_enabled, last_reminder_sent FROM users WHERE id = %s",
+                (user_id,),
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            frequency, enabled, last_sent = row
+            return {
+                'frequency': frequency or 'weekly',
+                'enabled': bool(enabled),
+                'last_sent': last_sent.strftime('%Y-%m-%d %H:%M:%S') if last_sent else None,
+            }
 
-            # Count verified users
-            cursor.execute("SELECT COUNT(*) FROM users WHERE is_verified = TRUE")
-            verified_users = cursor.fetchone()[0]
+    def update_last_reminder_sent(self, user_id: int, timestamp=None) -> bool:
+        """Update when the last reminder was sent to user"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE users SET last_reminder_sent = %s WHERE id = %s",
+                (timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S'), user_id),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
 
-            # Count goals
-            cursor.execute("SELECT COUNT(*) FROM goals")
-            goal_count = cursor.fetchone()[0]
+    def get_reminder_schedule(self) -> List[Dict[str, Any]]:
+        """Verified users with reminders on, with frequency and last_reminder_sent (see yearplan.reminder_scheduler)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(
+                """
+                SELECT id, email, reminder_frequency, reminder_enabled, last_reminder_sent
+                FROM users WHERE is_verified = TRUE AND reminder_enabled = TRUE
+                """
+            )
+            return list(cursor.fetchall())
 
-            # Count completed goals
-            cursor.execute("SELECT COUNT(*) FROM goals WHERE status = 'completed'")
-            completed_goals = cursor.fetchone()[0]
+    def get_users_needing_reminders(self) -> List[Dict[str, Any]]:
+        """Verified users with reminders on whose frequency has elapsed since last_reminder_sent"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor(pymysql.cursors.DictCursor)
+            cursor.execute(
+                """
+                SELECT id, email, reminder_frequency, reminder_enabled, last_reminder_sent
+                FROM users
+                WHERE is_verified = TRUE AND reminder_enabled = TRUE
+                  AND (last_reminder_sent IS NULL OR last_reminder_sent <= NOW() - INTERVAL
+                       CASE reminder_frequency
+                           WHEN 'daily' THEN 1 WHEN 'weekly' THEN 7 WHEN 'biweekly' THEN 14 WHEN 'monthly' THEN 30
+                       END DAY)
+                ORDER BY id
+                """
+            )
+            return list(cursor.fetchall())
 
+    def _compute_stats(self) -> Dict[str, int]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if DEBUG_DB:
+                print("[DB] get_stats")
+            cursor.execute(
+                """
+                SELECT u.total, u.verified, g.total, g.completed
+                FROM (SELECT COUNT(*) AS total, COALESCE(SUM(is_verified = TRUE), 0) AS verified FROM users) u
+                CROSS JOIN (SELECT COUNT(*) AS total, COALESCE(SUM(status = 'completed'), 0) AS completed FROM goals) g
+                """
+            )
+            user_count, verified_users, goal_count, completed_goals = cursor.fetchone()
             return {
-                'total_users': user_count,
-                'verified_users': verified_users,
-                'total_goals': goal_count,
-                'completed_goals': completed_goals,
+                'total_users': int(user_count),
+                'verified_users': int(verified_users),
+                'total_goals': int(goal_count),
+                'completed_goals': int(completed_goals),
             }
 
+    def get_stats(self) -> Dict[str, int]:
+        """Get basic statistics (cached for STATS_TTL seconds, shared by all threads)"""
+        now = time.monotonic()
+        cached = self._stats_cache
+        if cached and now < cached[0]:
+            return dict(cached[1])
+        # One thread refreshes; the others keep serving the previous value meanwhile
+        if not self._stats_lock.acquire(blocking=cached is None):
+            return dict(cached[1])
+        try:
+            cached = self._stats_cache
+            if cached and time.monotonic() < cached[0]:
+                return dict(cached[1])
+            stats = self._compute_stats()
+            self._stats_cache = (time.monotonic() + STATS_TTL, stats)
+            return dict(stats)
+        finally:
+            self._stats_lock.release()
+
+    def ping(self) -> bool:
+        """Cheap liveness check for /health: borrow a connection (pinged on checkout) and SELECT 1."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()[0] == 1
+
 # Compatibility alias for existing code
-YearPlanStorage = MySQLStorage
\ No newline at end of file
+YearPlanStorage = MySQLStorage
+
+
+if __name__ == '__main__':
+    import sys
+    cmd = sys.argv[1:]
+    if cmd == ['repair-goal-state']:
+        n = MySQLStorage().rebuild_goal_states()
+        print(f"[DB] rebuilt goal_state for {n} goal(s)")
+    elif cmd == ['backfill-goal-columns']:
+        n = MySQLStorage().backfill_goal_columns()
+        print(f"[DB] backfilled typed columns for {n} goal(s)")
+    else:
+        print('usage: python -m yearplan.mysql_storage repair-goal-state | backfill-goal-columns')
+        sys.exit(2)
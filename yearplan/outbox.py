@@ -0,0 +1,309 @@
+"""Durable email outbox: request handlers enqueue, a background thread sends.
+
+Handlers call ``outbox.enqueue(key, to, subject, text, html)``, which is one
+append (FileOutbox) or one INSERT (yearplan.mysql_outbox.MySQLOutbox), and
+return without talking to SMTP. OutboxSender drains due messages through
+one SMTPMailer session per batch:
+
+- a failed send is retried after BASE_DELAY * 2**(attempts-1) seconds
+  (capped at MAX_DELAY, with jitter);
+- after MAX_ATTEMPTS failures the message is marked dead and kept for
+  inspection (``dead_letters()``);
+- ``key`` is an idempotency key: enqueueing a key that is already queued,
+  sent or dead is a no-op, so a retried request cannot mail twice.
+
+FileOutbox is an append-only JSON-lines journal (enqueue / attempt / sent /
+dead records). Any process may append; the process holding the sender lock
+replays the journal, sends, and compacts it from time to time. enqueue()
+checks the key against the journal under the file lock, so two processes
+enqueueing the same key append it once. Keys live as long as their record
+does: queued and dead messages are always kept, but compaction drops sent
+messages after SENT_RETENTION, and their keys can then be enqueued again.
+
+    YEARPLAN_OUTBOX_PATH          journal for the JSON app (default ~/.yearplan.outbox.jsonl)
+    YEARPLAN_OUTBOX_MAX_ATTEMPTS  default 8
+    YEARPLAN_OUTBOX_BASE_DELAY    seconds, default 30
+    YEARPLAN_OUTBOX_MAX_DELAY     seconds, default 3600
+    YEARPLAN_OUTBOX_POLL          seconds between checks when idle, default 5
+"""
+import json
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+from .mailer import SMTPMailer
+from .storage import _fsync_dir, _locked_file, fcntl
+
+MAX_ATTEMPTS = int(os.environ.get('YEARPLAN_OUTBOX_MAX_ATTEMPTS', '8'))
+BASE_DELAY = float(os.environ.get('YEARPLAN_OUTBOX_BASE_DELAY', '30'))
+MAX_DELAY = float(os.environ.get('YEARPLAN_OUTBOX_MAX_DELAY', '3600'))
+POLL_SECONDS = float(os.environ.get('YEARPLAN_OUTBOX_POLL', '5'))
+# Sent records are kept this long so their idempotency keys keep deduplicating
+SENT_RETENTION = timedelta(days=7)
+COMPACT_EVERY = 1000
+
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next try after ``attempts`` failures (exponential, jittered)."""
+    delay = min(MAX_DELAY, BASE_DELAY * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def build_mime(cfg: dict, msg: dict):
+    mime = MIMEMultipart('alternative')
+    mime['From'] = f"{cfg.get('from_name', 'Year Plan App')} <{cfg.get('email', '')}>"
+    mime['To'] = msg['to']
+    mime['Subject'] = msg['subject']
+    mime.attach(MIMEText(msg.get('text') or '', 'plain', 'utf-8'))
+    if msg.get('html'):
+        mime.attach(MIMEText(msg['html'], 'html', 'utf-8'))
+    return mime
+
+
+class FileOutbox:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock_path = self.path.with_name(self.path.name + '.lock')
+        self._leader_path = self.path.with_name(self.path.name + '.sender')
+        self._leader_fh = None
+        self._mutex = threading.Lock()
+        self._keys = set()      # keys of the enqueue records in the journal, read up to _keys_offset
+        self._keys_offset = 0
+        self._keys_generation = None  # _compact bumps the generation stored in the lock file
+        self._messages = {}     # key -> record; maintained by the sending process only
+        self._offset = 0
+        self._records = 0
+
+    # -- any process ---------------------------------------------------------
+    def _write(self, records):
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            for rec in records:
+                fh.write(json.dumps(rec, separators=(',', ':')) + '\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def _append(self, records):
+        with _locked_file(self._lock_path):
+            self._write(records)
+
+    def _scan_keys(self, lock_fh):
+        """Fold enqueue records appended since the last scan into _keys (``lock_fh``: the held lock file)."""
+        lock_fh.seek(0)
+        generation = lock_fh.read().strip()
+        if generation != self._keys_generation:
+            # rewritten by _compact since the last scan: start over, forgetting the keys it dropped
+            self._keys, self._keys_offset, self._keys_generation = set(), 0, generation
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as fh:
+            fh.seek(self._keys_offset)
+            for line in fh:
+                self._keys_offset += len(line)
+                if b'"op":"enqueue"' not in line:
+                    continue
+                try:
+                    self._keys.add(json.loads(line)['key'])
+                except Exception:
+                    continue
+
+    def enqueue(self, key: str, to: str, subject: str, text: str, html: str = None) -> bool:
+        """Queue a message; False when the journal already holds ``key`` (from any process)."""
+        with self._mutex, _locked_file(self._lock_path) as lock_fh:
+            self._scan_keys(lock_fh)
+            if key in self._keys:
+                return False
+            self._write([{'op': 'enqueue', 'key': key, 'to': to, 'subject': subject, 'text': text,
+                          'html': html, 'at': _now()}])
+            return True
+
+    # -- sending process -----------------------------------------------------
+    def _lead(self) -> bool:
+        """Hold the sender lock (non-blocking); only its holder replays and sends."""
+        if self._leader_fh is not None:
+            return True
+        fh = open(self._leader_path, 'a+')
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+        self._leader_fh = fh
+        return True
+
+    def _apply(self, rec):
+        key = rec.get('key')
+        op = rec.get('op')
+        if op == 'enqueue':
+            if key not in self._messages:  # idempotency: first enqueue wins
+                self._messages[key] = {
+                    'key': key, 'to': rec['to'], 'subject': rec['subject'], 'text': rec.get('text'),
+                    'html': rec.get('html'), 'status': 'pending', 'attempts': 0,
+                    'next_attempt_at': rec.get('at'), 'last_error': None, 'created_at': rec.get('at'),
+                    'sent_at': None,
+                }
+            return
+        msg = self._messages.get(key)
+        if msg is None:
+            return
+        if op == 'attempt':
+            msg.update(attempts=rec['attempts'], next_attempt_at=rec['next_attempt_at'], last_error=rec.get('error'))
+        elif op == 'sent':
+            msg.update(status='sent', sent_at=rec.get('at'), attempts=rec.get('attempts', msg['attempts']))
+        elif op == 'dead':
+            msg.update(status='dead', attempts=rec['attempts'], last_error=rec.get('error'))
+        elif op == 'snapshot':
+            msg.update({k: v for k, v in rec.items() if k not in ('op', 'key')})
+
+    def _replay(self):
+        """Fold journal lines written since the last call (by any process) into memory."""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as fh:
+            fh.seek(self._offset)
+            while True:
+                line = fh.readline()
+                if not line.endswith('\n'):
+                    break  # partial line: another process is mid-append
+                self._offset += len(line.encode('utf-8'))
+                self._records += 1
+                try:
+                    self._apply(json.loads(line))
+                except Exception:
+                    continue
+
+    def _compact(self):
+        """Rewrite the journal as one snapshot record per live message."""
+        cutoff = (datetime.now() - SENT_RETENTION).strftime('%Y-%m-%d %H:%M:%S')
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with _locked_file(self._lock_path) as lock_fh:
+            self._replay()  # pick up appends made since the last poll
+            keep = [m for m in self._messages.values() if m['status'] != 'sent' or (m['sent_at'] or '') >= cutoff]
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                for m in keep:
+                    fh.write(json.dumps({'op': 'enqueue', 'key': m['key'], 'to': m['to'], 'subject': m['subject'],
+                                         'text': m['text'], 'html': m['html'], 'at': m['created_at']},
+                                        separators=(',', ':')) + '\n')
+                    fh.write(json.dumps(dict(m, op='snapshot'), separators=(',', ':')) + '\n')
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path.parent)
+            lock_fh.seek(0)
+            generation = int(lock_fh.read().strip() or 0) + 1
+            lock_fh.seek(0)
+            lock_fh.truncate()
+            lock_fh.write(str(generation))
+            lock_fh.flush()
+            self._messages = {m['key']: m for m in keep}
+            self._offset = self.path.stat().st_size
+            self._records = 2 * len(keep)
+
+    def claim(self, limit: int = 50) -> list:
+        """Due messages (pending, next_attempt_at reached); [] unless this process is the sender."""
+        if not self._lead():
+            return []
+        self._replay()
+        if self._records >= COMPACT_EVERY and self._records > 4 * len(self._messages):
+            self._compact()
+        now = _now()
+        due = [m for m in self._messages.values() if m['status'] == 'pending' and (m['next_attempt_at'] or '') <= now]
+        due.sort(key=lambda m: m['next_attempt_at'] or '')
+        return [dict(m) for m in due[:limit]]
+
+    def mark_sent(self, msg):
+        self._append([{'op': 'sent', 'key': msg['key'], 'attempts': msg['attempts'] + 1, 'at': _now()}])
+
+    def mark_failed(self, msg, error: str):
+        attempts = msg['attempts'] + 1
+        if attempts >= MAX_ATTEMPTS:
+            self._append([{'op': 'dead', 'key': msg['key'], 'attempts': attempts, 'error': error}])
+            return
+        next_at = (datetime.now() + timedelta(seconds=retry_delay(attempts))).strftime('%Y-%m-%d %H:%M:%S')
+        self._append([{'op': 'attempt', 'key': msg['key'], 'attempts': attempts, 'next_attempt_at': next_at,
+                       'error': error}])
+
+    def dead_letters(self) -> list:
+        self._replay()
+        return [dict(m) for m in self._messages.values() if m['status'] == 'dead']
+
+
+class OutboxSender:
+    """Background thread draining an outbox; ``wake()`` after enqueue sends without waiting for the poll."""
+
+    def __init__(self, outbox, cfg: dict, mailer_factory=None, batch: int = 50, poll: float = None):
+        self.outbox = outbox
+        self.cfg = cfg  # live dict: config changes apply to the next batch
+        self.mailer_factory = mailer_factory or (lambda: SMTPMailer(self.cfg))
+        self.batch = batch
+        self.poll = POLL_SECONDS if poll is None else poll
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def _running(self) -> bool:
+        # threads do not survive a fork (gunicorn --preload): restart in the child
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        """Start the sender thread if it is not running in this process (cheap; called per request)."""
+        if self._running():
+            return
+        with self._start_lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                sent = self.drain()
+            except Exception as e:
+                print(f"[OUTBOX] drain failed: {e}")
+                sent = 0
+            if not sent:
+                self._wake.wait(self.poll)
+                self._wake.clear()
+
+    def _send(self, msg, mailer):
+        if mailer is None:
+            # Not configured (dev): log instead of sending
+            print(f"[OUTBOX] Email not configured; would send '{msg['subject']}' to {msg['to']}:\n{msg.get('text')}")
+            return
+        mailer.send(build_mime(self.cfg, msg))
+
+    def drain(self) -> int:
+        """Send one batch of due messages; returns how many were processed."""
+        msgs = self.outbox.claim(self.batch)
+        if not msgs:
+            return 0
+        configured = bool(self.cfg.get('email') and self.cfg.get('password'))
+        mailer = self.mailer_factory() if configured else None
+        try:
+            for msg in msgs:
+                try:
+                    self._send(msg, mailer)
+                except Exception as e:
+                    print(f"[OUTBOX] send to {msg['to']} failed (attempt {msg['attempts'] + 1}): {e}")
+                    self.outbox.mark_failed(msg, str(e) or e.__class__.__name__)
+                    continue
+                self.outbox.mark_sent(msg)
+        finally:
+            if mailer is not None:
+                mailer.close()
+        return len(msgs)
@@ -0,0 +1,86 @@
+"""Keyset pagination and NDJSON streaming for the log endpoints.
+
+Logs are listed newest first by (timestamp, id). A page ends with the key of
+its last row, handed to the client as an opaque ``cursor`` (X-Next-Cursor
+header); the next request continues strictly after that key, so pages stay
+stable while logs are added and the database can walk an index instead of
+counting an OFFSET. Requests without ``limit`` or ``cursor`` still get the
+full, unpaginated array, so clients written before pagination keep working;
+DEFAULT_LIMIT applies when a cursor comes without a limit.
+"""
+import base64
+import json
+from flask import Response, jsonify, request, stream_with_context
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+STREAM_BATCH = 1000
+
+
+def encode_cursor(key) -> str:
+    ts, row_id = key
+    raw = json.dumps([None if ts is None else str(ts), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value):
+    """(ts, id) from a cursor string, None when absent; ValueError when malformed."""
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        ts, row_id = json.loads(raw)
+        return ts, int(row_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def parse_limit(value) -> int:
+    if value in (None, ''):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except Exception:
+        raise ValueError('invalid limit')
+    if limit < 1:
+        raise ValueError('invalid limit')
+    return min(limit, MAX_LIMIT)
+
+
+def iter_keyset(fetch_page, key, batch: int = STREAM_BATCH):
+    """Yield every row by repeatedly calling fetch_page(before, limit); memory stays at one batch."""
+    before = None
+    while True:
+        rows = fetch_page(before, batch)
+        yield from rows
+        if len(rows) < batch:
+            return
+        before = key(rows[-1])
+
+
+def keyset_response(fetch_page, key, shape=lambda row: row, fetch_all=None):
+    """Flask response for a paginated listing.
+
+    fetch_page(before, limit) returns rows newest first strictly after ``before``;
+    key(row) gives a row's (ts, id). ``?limit=&cursor=`` returns one page as a JSON
+    array plus X-Next-Cursor when more rows follow; ``?format=ndjson`` streams all
+    rows, one JSON object per line. Without limit or cursor the whole listing is
+    returned as one JSON array, as before pagination existed: fetch_all() when
+    given, else every page of fetch_page.
+    """
+    if request.args.get('format') == 'ndjson':
+        lines = (json.dumps(shape(row), default=str) + '\n' for row in iter_keyset(fetch_page, key))
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    if not request.args.get('limit') and not request.args.get('cursor'):
+        rows = fetch_all() if fetch_all is not None else iter_keyset(fetch_page, key)
+        return jsonify([shape(row) for row in rows])
+    try:
+        before = decode_cursor(request.args.get('cursor'))
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = fetch_page(before, limit + 1)
+    resp = jsonify([shape(row) for row in rows[:limit]])
+    if len(rows) > limit:
+        resp.headers['X-Next-Cursor'] = encode_cursor(key(rows[limit - 1]))
+    return resp
@@ -0,0 +1,153 @@
+"""Vectorized progress maths for whole-population runs (reminder batches).
+
+Goals and their logs are loaded into columnar NumPy arrays and percent,
+expected (time-based) percent and status codes are computed for all of them
+at once. NumPy is optional: ``enabled()`` is False when it is not installed
+or YEARPLAN_NUMPY is not set, and callers fall back to their per-goal code.
+"""
+import os
+import functools
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+TASK_CODES = {'increment': 0, 'decrement': 1, 'percentage': 2}
+ACTION_CODES = {'increment': 0, 'decrement': 1, 'update': 2}
+
+# Status codes returned by evaluate(); each app maps them to its own labels
+PENDING, IN_PROGRESS, ON_TRACK, AHEAD, BEHIND, COMPLETED = range(6)
+
+
+def enabled() -> bool:
+    """True when NumPy is importable and YEARPLAN_NUMPY=1."""
+    return np is not None and os.environ.get('YEARPLAN_NUMPY', '0') in {'1', 'true', 'True', 'yes'}
+
+
+@functools.lru_cache(maxsize=4096)
+def day_ordinal(value) -> int:
+    """Proleptic ordinal of an ISO date/datetime string (or date), -1 if missing or invalid.
+
+    Cached: a batch has far fewer distinct dates than goals.
+    """
+    if not value:
+        return -1
+    try:
+        if isinstance(value, datetime):
+            return value.date().toordinal()
+        if isinstance(value, date):
+            return value.toordinal()
+        return datetime.fromisoformat(str(value)).date().toordinal()
+    except Exception:
+        return -1
+
+
+def _float_or_nan(value):
+    try:
+        return float(value) if value is not None else float('nan')
+    except Exception:
+        return float('nan')
+
+
+class GoalColumns:
+    """Per-goal columns: task type code, baseline, target (NaN if none), start/end day ordinals (-1 if none)."""
+
+    def __init__(self, task, start, target, start_ord, end_ord):
+        self.task = np.asarray(task, dtype=np.int8)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.target = np.asarray(target, dtype=np.float64)
+        self.start_ord = np.asarray(start_ord, dtype=np.int64)
+        self.end_ord = np.asarray(end_ord, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.task)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from dicts with task_type, start (baseline), target, start_date and end_date."""
+        task, start, target, start_ord, end_ord = [], [], [], [], []
+        for r in rows:
+            task.append(TASK_CODES.get(r.get('task_type') or 'increment', 0))
+            start.append(_float_or_nan(r.get('start')))
+            target.append(_float_or_nan(r.get('target')))
+            start_ord.append(day_ordinal(r.get('start_date')))
+            end_ord.append(day_ordinal(r.get('end_date')))
+        return cls(task, start, target, start_ord, end_ord)
+
+
+def fold_logs(n_goals: int, log_goal, log_action, log_value, baseline):
+    """Current value per goal when an 'update' log sets the value and increments/decrements move it.
+
+    log_goal holds the goal's row index (0..n_goals-1) for every log and logs
+    must be in chronological order. Result: value of each goal's last update
+    (or its baseline) plus the signed sum of the logs after it.
+    """
+    log_goal = np.asarray(log_goal, dtype=np.int64)
+    log_action = np.asarray(log_action, dtype=np.int8)
+    log_value = np.nan_to_num(np.asarray(log_value, dtype=np.float64))
+    pos = np.arange(len(log_goal))
+
+    is_update = log_action == ACTION_CODES['update']
+    last_update = np.full(n_goals, -1, dtype=np.int64)
+    np.maximum.at(last_update, log_goal[is_update], pos[is_update])
+
+    has_update = last_update >= 0
+    current = np.where(has_update, 0.0, np.asarray(baseline, dtype=np.float64))
+    current[has_update] = log_value[last_update[has_update]]
+
+    after = pos > last_update[log_goal]
+    signed = np.where(log_action == ACTION_CODES['increment'], log_value,
+                      np.where(log_action == ACTION_CODES['decrement'], -log_value, 0.0))
+    current += np.bincount(log_goal[after], weights=signed[after], minlength=n_goals)
+    return current
+
+
+def evaluate(cols: GoalColumns, current, today=None, clamp: bool = True, completed_first: bool = False):
+    """Vectorized progress for every goal in ``cols``.
+
+    Returns (progress, percent, expected_pct, status):
+      progress      current value, clamped into [start, target] when ``clamp``
+      percent       distance covered from start towards target, 0..100
+                    (percentage goals: the value itself)
+      expected_pct  share of the inclusive day range elapsed by ``today``, 0..100,
+                    NaN without both dates; at least one day counts as elapsed
+      status        PENDING/IN_PROGRESS/ON_TRACK/AHEAD/BEHIND/COMPLETED using the
+                    1.3 / 0.7 actual-to-expected ratio; with ``completed_first``
+                    a goal at 100% is COMPLETED even when a ratio applies
+    """
+    current = np.asarray(current, dtype=np.float64)
+    is_pct = cols.task == TASK_CODES['percentage']
+    has_target = ~np.isnan(cols.target)
+    start = np.nan_to_num(cols.start)
+
+    progress = current.copy()
+    if clamp:
+        lo = np.minimum(start, cols.target)
+        hi = np.maximum(start, cols.target)
+        bounded = has_target & ~is_pct
+        progress[bounded] = np.clip(current[bounded], lo[bounded], hi[bounded])
+
+    distance = np.abs(cols.target - start)
+    achieved = np.abs(progress - start)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio_pct = np.where(distance > 0, achieved / distance * 100.0,
+                             np.where(progress == cols.target, 100.0, 0.0) if clamp else 100.0)
+    percent = np.where(is_pct, current, np.where(has_target, ratio_pct, 0.0))
+    percent = np.clip(np.nan_to_num(percent), 0.0, 100.0)
+
+    today_ord = day_ordinal(today or date.today())
+    has_dates = (cols.start_ord >= 0) & (cols.end_ord >= 0)
+    total = np.maximum(1, cols.end_ord - cols.start_ord + 1)
+    elapsed = np.clip(today_ord - cols.start_ord + 1, 1, total)
+    expected_pct = np.where(has_dates, np.clip(elapsed / total * 100.0, 0.0, 100.0), np.nan)
+
+    status = np.where(percent >= 100.0, COMPLETED, np.where(percent > 0, IN_PROGRESS, PENDING))
+    has_expected = has_dates & (expected_pct > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = percent / expected_pct
+    by_ratio = np.where(ratio >= 1.3, AHEAD, np.where(ratio <= 0.7, BEHIND, ON_TRACK))
+    use_ratio = has_expected & ~(completed_first & (percent >= 100.0))
+    status = np.where(use_ratio, by_ratio, status).astype(np.int8)
+    return progress, percent, expected_pct, status
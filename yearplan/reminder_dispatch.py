@@ -0,0 +1,159 @@
+"""Pipelined reminder runs: render and send in bounded thread pools.
+
+/api/process-reminders used to build, send and record one user at a time.
+dispatch() overlaps the work instead:
+
+    users -> render pool (render_workers) -> bounded queue -> sender threads (send_workers)
+
+Renderers block when the queue is full, so only a few rendered messages
+wait at any time. Each sender thread keeps its own SMTP session
+(``mailer_factory``; see yearplan.mailer). Before each message it takes a
+token from the bucket of the SMTP provider, so the run respects the
+provider's rate limit however many senders there are. Every user gets a
+result row (sent / failed / skipped, with timings).
+
+    YEARPLAN_REMINDER_RENDER_WORKERS  default 4
+    YEARPLAN_REMINDER_SEND_WORKERS    default 4
+    YEARPLAN_SMTP_RATE                messages per second per provider (default 10, 0 = unlimited)
+    YEARPLAN_SMTP_BURST               bucket size (default: the rate)
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RENDER_WORKERS = int(os.environ.get('YEARPLAN_REMINDER_RENDER_WORKERS', '4'))
+SEND_WORKERS = int(os.environ.get('YEARPLAN_REMINDER_SEND_WORKERS', '4'))
+SMTP_RATE = float(os.environ.get('YEARPLAN_SMTP_RATE', '10'))
+SMTP_BURST = float(os.environ.get('YEARPLAN_SMTP_BURST', '0')) or None
+
+_DONE = object()
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` tokens per second, at most ``burst`` saved up."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(provider: str) -> TokenBucket:
+    """Process-wide bucket per SMTP provider (host), shared by every run."""
+    with _buckets_lock:
+        bucket = _buckets.get(provider)
+        if bucket is None:
+            bucket = _buckets[provider] = TokenBucket(SMTP_RATE, SMTP_BURST)
+        return bucket
+
+
+def dispatch(users, render, send, mailer_factory=lambda: None, on_sent=None, bucket=None,
+             render_workers: int = None, send_workers: int = None):
+    """Render and send a reminder for every user; returns one result dict per user, in input order.
+
+    render(user) -> payload, or None to skip the user
+    send(user, payload, mailer) -> None on success; raises or returns an error string on failure
+    on_sent(user) runs on the sender thread after a successful send (e.g. last_reminder_sent)
+    Result: {'user_id', 'email', 'status': 'sent'|'failed'|'skipped', 'reason', 'render_ms', 'send_ms'}
+    """
+    users = list(users or [])
+    render_workers = max(1, render_workers or RENDER_WORKERS)
+    send_workers = max(1, send_workers or SEND_WORKERS)
+    results = [
+        {'user_id': u.get('id'), 'email': u.get('email'), 'status': 'skipped', 'reason': None,
+         'render_ms': None, 'send_ms': None}
+        for u in users
+    ]
+    ready = queue.Queue(maxsize=send_workers * 2)
+
+    def _render(i):
+        start = time.perf_counter()
+        try:
+            payload = render(users[i])
+        except Exception as e:
+            results[i].update(status='failed', reason=f'render: {e}')
+            return
+        finally:
+            results[i]['render_ms'] = round((time.perf_counter() - start) * 1000.0, 2)
+        if payload is not None:
+            ready.put((i, payload))
+
+    def _sender():
+        try:
+            mailer = mailer_factory()
+        except Exception as e:
+            print(f"[REMINDER] could not create mailer, sending without a shared session: {e}")
+            mailer = None
+        try:
+            while True:
+                item = ready.get()
+                if item is _DONE:
+                    return
+                i, payload = item
+                if bucket is not None:
+                    bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    err = send(users[i], payload, mailer)
+                except Exception as e:
+                    err = str(e) or e.__class__.__name__
+                results[i]['send_ms'] = round((time.perf_counter() - start) * 1000.0, 2)
+                if err:
+                    results[i].update(status='failed', reason=str(err))
+                    continue
+                results[i]['status'] = 'sent'
+                if on_sent is not None:
+                    try:
+                        on_sent(users[i])
+                    except Exception as e:
+                        print(f"[REMINDER] sent to {users[i].get('email')} but could not record it: {e}")
+        finally:
+            if mailer is not None:
+                try:
+                    mailer.close()
+                except Exception:
+                    pass
+
+    senders = [threading.Thread(target=_sender, name=f'reminder-send-{n}', daemon=True)
+               for n in range(send_workers)]
+    for t in senders:
+        t.start()
+    try:
+        with ThreadPoolExecutor(max_workers=render_workers, thread_name_prefix='reminder-render') as pool:
+            list(pool.map(_render, range(len(users))))
+    finally:
+        for _ in senders:
+            ready.put(_DONE)
+        for t in senders:
+            t.join()
+    return results
+
+
+def summarize(results) -> dict:
+    """Counts for the JSON response of /api/process-reminders."""
+    counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+    for r in results:
+        counts[r['status']] += 1
+    return counts
@@ -0,0 +1,271 @@
+"""In-process reminder scheduler: a min-heap of users keyed on when their next reminder is due.
+
+Without it, reminders depend on cron curling /api/process-reminders, which
+looks at every user on each call. ReminderScheduler loads the users with
+reminders on once, computes each one's next due time from
+reminder_frequency and last_reminder_sent, and keeps them in a heap. A
+tick pops only the users that are due (O(due * log n)), sends through the
+same run function as the endpoint, and pushes them back with their next
+due time. A failed send is retried after RETRY_SECONDS.
+
+Every worker process starts the thread, but only the holder of the lease
+ticks: FileLease (flock, one host) for the JSON app, MySQLLease (GET_LOCK)
+for the MySQL app. If the holder dies, its lock is released and another
+worker takes over at its next tick. The heap is rebuilt from the database
+every RELOAD_SECONDS (and when a worker becomes the holder), so preference
+changes made in other workers are picked up; in the holder, call
+``schedule(user)`` after a change to apply it immediately.
+
+    YEARPLAN_REMINDER_SCHEDULER  1 to run it (leave send_reminders.sh out of crontab then)
+    YEARPLAN_REMINDER_TICK       max seconds between checks, default 60
+    YEARPLAN_REMINDER_RELOAD     seconds between reloads from the database, default 900
+    YEARPLAN_REMINDER_RETRY      seconds before retrying a failed send, default 3600
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process, the lease is always held
+    fcntl = None
+
+ENABLED = os.environ.get('YEARPLAN_REMINDER_SCHEDULER', '0') in {'1', 'true', 'True', 'yes'}
+TICK_SECONDS = float(os.environ.get('YEARPLAN_REMINDER_TICK', '60'))
+RELOAD_SECONDS = float(os.environ.get('YEARPLAN_REMINDER_RELOAD', '900'))
+RETRY_SECONDS = float(os.environ.get('YEARPLAN_REMINDER_RETRY', '3600'))
+
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7, 'biweekly': 14, 'monthly': 30}
+LOCK_NAME = 'yearplan_reminder_scheduler'
+
+
+def next_due(frequency, last_sent):
+    """Epoch seconds when the next reminder is due: 0 (now) if never sent or unreadable, None if never."""
+    if not last_sent:
+        return 0.0
+    if not isinstance(last_sent, datetime):
+        try:
+            last_sent = datetime.strptime(str(last_sent), '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return 0.0
+    days = FREQUENCY_DAYS.get(frequency or 'weekly')
+    if days is None:
+        return None
+    return (last_sent + timedelta(days=days)).timestamp()
+
+
+class FileLease:
+    """Scheduler election between processes on one host: holder of a non-blocking flock on ``path``."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+        self._pid = None
+
+    def held(self) -> bool:
+        if self._fh is not None and self._pid == os.getpid():
+            return True
+        fh = open(self.path, 'a+')
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+        self._fh, self._pid = fh, os.getpid()
+        return True
+
+
+class MySQLLease:
+    """Scheduler election across hosts: GET_LOCK on a dedicated connection (``connect`` opens one).
+
+    MySQL frees the lock when that connection closes, so a dead holder is
+    replaced at the next tick of another worker.
+    """
+
+    def __init__(self, connect, name: str = LOCK_NAME):
+        self.connect = connect
+        self.name = name
+        self._conn = None
+        self._pid = None
+        self._held = False
+
+    def _close(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn, self._held = None, False
+
+    def held(self) -> bool:
+        if self._conn is not None and self._pid != os.getpid():
+            self._conn, self._held = None, False  # inherited over fork: the parent's session
+        if self._conn is not None:
+            try:
+                self._conn.ping(reconnect=False)
+            except Exception:
+                self._close()  # session gone, and the lock with it
+        try:
+            if self._conn is None:
+                self._conn, self._pid = self.connect(), os.getpid()
+            if not self._held:
+                cursor = self._conn.cursor()
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (self.name,))
+                row = cursor.fetchone()
+                self._held = bool(row and row[0] == 1)
+        except Exception as e:
+            print(f"[REMINDER] scheduler lease check failed: {e}")
+            if self._conn is not None:
+                self._close()
+        return self._held
+
+
+class ReminderScheduler:
+    """Sends reminders as they fall due; see the module docstring.
+
+    load() -> users with reminders on ('id', 'reminder_frequency', 'last_reminder_sent', ...)
+    run(users) -> one reminder_dispatch result row per user (records last_reminder_sent itself)
+    lease: FileLease / MySQLLease, or None when this is the only process
+    """
+
+    def __init__(self, load, run, lease=None, tick: float = None, reload: float = None, retry: float = None):
+        self.load = load
+        self.run = run
+        self.lease = lease
+        self.tick_seconds = TICK_SECONDS if tick is None else tick
+        self.reload_seconds = RELOAD_SECONDS if reload is None else reload
+        self.retry_seconds = RETRY_SECONDS if retry is None else retry
+        self._heap = []     # (due, user_id); an entry whose due differs from _due[user_id] is stale
+        self._due = {}      # user_id -> (due, user)
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    # -- heap ----------------------------------------------------------------
+    def _push(self, user, due):
+        self._due[user['id']] = (due, user)
+        heapq.heappush(self._heap, (due, user['id']))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(d, uid) for uid, (d, _) in self._due.items()]  # drop stale entries
+            heapq.heapify(self._heap)
+
+    def rebuild(self, users, now: float = None):
+        """Replace the schedule with ``users`` (one heapify, O(n))."""
+        due = {}
+        for user in users:
+            at = next_due(user.get('reminder_frequency'), user.get('last_reminder_sent'))
+            if at is not None:
+                due[user['id']] = (at, user)
+        heap = [(d, uid) for uid, (d, _) in due.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._due, self._heap = due, heap
+            self._loaded_at = time.time() if now is None else now
+
+    def schedule(self, user):
+        """(Re)schedule one user after a preference change; disabled or unverified users are dropped."""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # not loaded (or not the lease holder): the next load reads the change
+            if not user.get('reminder_enabled', True) or not user.get('is_verified', True):
+                self._due.pop(user['id'], None)
+                return
+            at = next_due(user.get('reminder_frequency'), user.get('last_reminder_sent'))
+            if at is None:
+                self._due.pop(user['id'], None)
+                return
+            self._push(user, at)
+        self._wake.set()
+
+    def unschedule(self, user_id):
+        with self._lock:
+            self._due.pop(user_id, None)
+
+    def pop_due(self, now: float = None) -> list:
+        """Remove and return the users whose reminder is due at ``now``."""
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                at, uid = heapq.heappop(self._heap)
+                entry = self._due.get(uid)
+                if entry is None or entry[0] != at:
+                    continue  # rescheduled or removed since this entry was pushed
+                del self._due[uid]
+                due.append(entry[1])
+        return due
+
+    def next_wakeup(self):
+        """Epoch seconds of the earliest entry (possibly stale, which only wakes us early), or None."""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._due)
+
+    # -- ticks ---------------------------------------------------------------
+    def tick(self, now: float = None) -> list:
+        """Send to the users that are due; returns their result rows ([] when not the lease holder)."""
+        if self.lease is not None and not self.lease.held():
+            self._loaded_at = None  # reload from the database if this worker is elected later
+            return []
+        now = time.time() if now is None else now
+        if self._loaded_at is None or now - self._loaded_at >= self.reload_seconds:
+            self.rebuild(self.load(), now)
+        users = self.pop_due(now)
+        if not users:
+            return []
+        results = self.run(users)
+        status = {r['user_id']: r['status'] for r in results or []}
+        sent_at = datetime.fromtimestamp(now)
+        with self._lock:
+            for user in users:
+                if user['id'] in self._due:
+                    continue  # preferences changed while sending: keep the new schedule
+                if status.get(user['id']) == 'sent':
+                    user = dict(user, last_reminder_sent=sent_at)
+                    at = next_due(user.get('reminder_frequency'), sent_at)
+                    if at is not None:
+                        self._push(user, at)
+                else:
+                    self._push(user, now + self.retry_seconds)
+        return results
+
+    def _sleep_for(self) -> float:
+        at = self.next_wakeup()
+        if at is None:
+            return self.tick_seconds
+        return max(1.0, min(self.tick_seconds, at - time.time()))
+
+    # -- thread --------------------------------------------------------------
+    def _running(self) -> bool:
+        # threads do not survive a fork (gunicorn --preload): restart in the child
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def start(self):
+        """Start the scheduler thread if it is not running in this process (cheap; called per request)."""
+        if self._running():
+            return
+        with self._start_lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                results = self.tick()
+                if results:
+                    sent = sum(1 for r in results if r['status'] == 'sent')
+                    print(f"[REMINDER] scheduler sent {sent}/{len(results)} due reminders")
+            except Exception as e:
+                print(f"[REMINDER] scheduler tick failed: {e}")
+            self._wake.wait(self._sleep_for())
+            self._wake.clear()
@@ -0,0 +1,422 @@
+from pathlib import Path
+import json
+import heapq
+import itertools
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .storage import YearPlanStorage
+
+# Resident shards are evicted (least recently used first) once the memory their
+# loaded rows take passes this many bytes
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def _deep_sizeof(*roots) -> int:
+    """Bytes held by nested dicts/lists/tuples and their items; shared objects count once."""
+    seen, stack, size = set(), list(roots), 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return size
+
+
+class ShardedYearPlanStorage:
+    """JSON storage split into one file per user.
+
+    Layout under ``root``::
+
+        index.json         users plus a goal id -> owner map ('owners' rows)
+        users/<id>.json    that user's goals and logs
+        users/shared.json  goals created without a user
+        ids.seq            id counter shared by every file
+
+    Only the index is read at startup. A user's shard is loaded on first access
+    and kept in an LRU; once the resident shards exceed ``cache_bytes`` (the
+    memory their rows and lookup indexes take, which is several times the JSON
+    on disk) the least recently used ones are flushed and dropped. A write only
+    rewrites (or journals to) the owning user's file, plus the index when it
+    adds or removes a goal.
+
+    Shards are opened with shared=True so a shard evicted while another thread
+    still holds it stays coherent with the copy loaded in its place; pass
+    shared=True to also share the index between processes.
+    """
+
+    def __init__(self, root: Path, journal: bool = False, flush_interval: Optional[float] = None,
+                 shared: bool = False, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.root = Path(root)
+        (self.root / 'users').mkdir(parents=True, exist_ok=True)
+        self.journal = journal
+        self.flush_interval = flush_interval
+        self.cache_bytes = max(0, int(cache_bytes or 0))
+        self._lock = threading.RLock()
+        self._shards = OrderedDict()  # owner user id (None for shared goals) -> YearPlanStorage
+        self._sizes = {}  # owner user id -> ((goal count, log count), resident bytes)
+        self._index = YearPlanStorage(self.root / 'index.json', journal=journal, flush_interval=flush_interval,
+                                      shared=shared, id_file=self.id_path)
+
+    @property
+    def id_path(self) -> Path:
+        return self.root / 'ids.seq'
+
+    def shard_path(self, user_id) -> Path:
+        return self.root / 'users' / ('shared.json' if user_id is None else f'{int(user_id)}.json')
+
+    # --------------------
+    # Shard cache
+    # --------------------
+    def _open_shard(self, user_id, flush_interval=None) -> YearPlanStorage:
+        return YearPlanStorage(self.shard_path(user_id), journal=self.journal, flush_interval=flush_interval,
+                               shared=True, id_file=self.id_path)
+
+    def _shard(self, user_id) -> YearPlanStorage:
+        """Return the user's shard, loading it (and evicting others) if needed."""
+        with self._lock:
+            shard = self._shards.get(user_id)
+            if shard is not None:
+                self._shards.move_to_end(user_id)
+                return shard
+            shard = self._open_shard(user_id, self.flush_interval)
+            self._shards[user_id] = shard
+            self._evict(keep=user_id)
+            return shard
+
+    def _peek(self, user_id) -> YearPlanStorage:
+        """The user's shard for a one-off read: resident copy if any, else a throwaway load."""
+        with self._lock:
+            shard = self._shards.get(user_id)
+        return shard if shard is not None else self._open_shard(user_id)
+
+    def _footprint(self, user_id, shard: YearPlanStorage) -> int:
+        """Memory held by a resident shard; re-measured only when its row counts change."""
+        with shard._lock:
+            data = shard._data or {}
+            key = (len(data.get('goals', ())), len(data.get('logs', ())))
+            cached = self._sizes.get(user_id)
+            if cached is None or cached[0] != key:
+                cached = (key, _deep_sizeof(data, shard._by_id, shard._logs_by_goal, shard._goal_state))
+                self._sizes[user_id] = cached
+        return cached[1]
+
+    def _drop(self, user_id):
+        self._sizes.pop(user_id, None)
+        shard = self._shards.pop(user_id, None)
+        if shard is not None:
+            shard.close()
+
+    def _evict(self, keep=None):
+        with self._lock:
+            sizes = {uid: self._footprint(uid, s) for uid, s in self._shards.items()}
+            total = sum(sizes.values())
+            for uid in list(self._shards):
+                if total <= self.cache_bytes:
+                    break
+                if uid == keep:
+                    continue
+                self._drop(uid)
+                total -= sizes[uid]
+
+    def _owner_ids(self):
+        """Every shard on disk, as owner user ids."""
+        owners = []
+        for p in sorted((self.root / 'users').glob('*.json')):
+            if p.stem == 'shared':
+                owners.append(None)
+            else:
+                try:
+                    owners.append(int(p.stem))
+                except ValueError:
+                    pass
+        return owners
+
+    def _owner_of_goal(self, goal_id: int):
+        """(found, owner user id) for a goal, from the index."""
+        if self._index.shared:
+            with self._index._lock:
+                self._index._refresh()
+        row = self._index._find_row('owners', goal_id)
+        return (False, None) if row is None else (True, row.get('user_id'))
+
+    def _goal_owner_ids(self):
+        """Distinct owners in the goal map, plus None: the shared shard also keeps logs of unknown goals."""
+        owners = dict.fromkeys(row.get('user_id') for row in self._index._data.get('owners', []))
+        owners.setdefault(None)
+        return list(owners)
+
+    def _shard_for_goal(self, goal_id: int, user_id: int = None):
+        found, owner = self._owner_of_goal(goal_id)
+        if not found or (user_id is not None and owner != user_id):
+            return None
+        return self._shard(owner)
+
+    def _shard_for_log(self, log_id: int):
+        # Logs are not in the index. The owner's shard is normally resident (the
+        # request checked user_owns_log first), so look there, most recent first;
+        # otherwise only the shards of users that own goals can hold the log.
+        with self._lock:
+            resident = list(reversed(self._shards.items()))
+        for uid, shard in resident:
+            if shard._find_row('logs', log_id) is not None:
+                return self._shard(uid)
+        checked = {uid for uid, _ in resident}
+        for uid in self._goal_owner_ids():
+            if uid in checked:
+                continue
+            if self._open_shard(uid)._find_row('logs', log_id) is not None:
+                return self._shard(uid)
+        return None
+
+    # --------------------
+    # Durability
+    # --------------------
+    def flush(self) -> bool:
+        with self._lock:
+            shards = list(self._shards.values())
+        ok = self._index.flush()
+        for shard in shards:
+            ok = shard.flush() and ok
+        return ok
+
+    def checkpoint(self) -> bool:
+        with self._lock:
+            shards = list(self._shards.values())
+        ok = self._index.checkpoint()
+        for shard in shards:
+            ok = shard.checkpoint() and ok
+        return ok
+
+    def close(self):
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), OrderedDict()
+            self._sizes = {}
+        for shard in shards:
+            shard.close()
+        self._index.close()
+
+    # --------------------
+    # Goals
+    # --------------------
+    def _register_goal(self, gid: int, user_id):
+        with self._index.transaction():
+            self._index._commit(self._index._append_row('owners', {'id': gid, 'user_id': user_id}))
+
+    def add_goal(self, text: str, user_id: int = None):
+        gid = self._shard(user_id).add_goal(text, user_id)
+        self._register_goal(gid, user_id)
+        return gid
+
+    def add_goal_with_meta(self, text: str, start_date: Optional[str] = None, end_date: Optional[str] = None, target: Optional[float] = None, task_type: str = 'increment', user_id: int = None, start_value: Optional[float] = None):
+        gid = self._shard(user_id).add_goal_with_meta(text, start_date, end_date, target, task_type, user_id, start_value)
+        self._register_goal(gid, user_id)
+        return gid
+
+    def list_goals(self, user_id: int = None):
+        if user_id is not None:
+            return self._shard(user_id).list_goals(user_id)
+        goals = []
+        for uid in self._owner_ids():
+            goals.extend(self._peek(uid).list_goals())
+        return goals
+
+    def get_goal(self, goal_id: int, user_id: int = None):
+        shard = self._shard_for_goal(goal_id, user_id)
+        return shard.get_goal(goal_id, user_id) if shard else None
+
+    def _calculate_current_value(self, goal_id: int) -> float:
+        shard = self._shard_for_goal(goal_id)
+        return shard._calculate_current_value(goal_id) if shard else 0.0
+
+    def goal_progress_status(self, goal_id: int, today=None):
+        shard = self._shard_for_goal(goal_id)
+        return shard.goal_progress_status(goal_id, today=today) if shard else None
+
+    def _by_owner(self, goal_ids):
+        """({owner: [goal ids]}, [goal ids not in the index])."""
+        by_owner, missing = {}, []
+        for gid in goal_ids:
+            found, owner = self._owner_of_goal(gid)
+            if found:
+                by_owner.setdefault(owner, []).append(gid)
+            else:
+                missing.append(gid)
+        return by_owner, missing
+
+    def current_values_many(self, goal_ids) -> dict:
+        by_owner, missing = self._by_owner(goal_ids)
+        out = dict.fromkeys(missing, 0.0)
+        for owner, gids in by_owner.items():
+            out.update(self._shard(owner).current_values_many(gids))
+        return out
+
+    def progress_status_many(self, goal_ids, today=None) -> dict:
+        """Progress/status for several goals at once, one batch per owning shard."""
+        by_owner, missing = self._by_owner(goal_ids)
+        out = dict.fromkeys(missing)
+        for owner, gids in by_owner.items():
+            out.update(self._shard(owner).progress_status_many(gids, today=today))
+        return out
+
+    def mark_goal_completed(self, goal_id: int, user_id: int = None):
+        shard = self._shard_for_goal(goal_id, user_id)
+        return shard.mark_goal_completed(goal_id, user_id) if shard else False
+
+    def delete_goal(self, goal_id: int, user_id: int = None) -> bool:
+        shard = self._shard_for_goal(goal_id, user_id)
+        if shard is None or not shard.delete_goal(goal_id, user_id):
+            return False
+        with self._index.transaction():
+            self._index._commit(self._index._delete_rows('owners', [goal_id]))
+        return True
+
+    def set_goal_field(self, goal_id: int, field: str, value, user_id: int = None) -> bool:
+        shard = self._shard_for_goal(goal_id, user_id)
+        return shard.set_goal_field(goal_id, field, value, user_id) if shard else False
+
+    def update_goal_name(self, goal_id: int, new_text: str, user_id: int = None) -> bool:
+        shard = self._shard_for_goal(goal_id, user_id)
+        return shard.update_goal_name(goal_id, new_text, user_id) if shard else False
+
+    def update_goal_target(self, goal_id: int, new_target, user_id: int = None) -> bool:
+        shard = self._shard_for_goal(goal_id, user_id)
+        return shard.update_goal_target(goal_id, new_target, user_id) if shard else False
+
+    def update_goal_value(self, goal_id: int, action: str, value: float = 1, ts: str = None, user_id: int = None):
+        shard = self._shard_for_goal(goal_id, user_id)
+        return shard.update_goal_value(goal_id, action, value, ts, user_id) if shard else None
+
+    # --------------------
+    # Logs
+    # --------------------
+    def add_log(self, goal_id: int, action: str, value=None, ts=None):
+        found, owner = self._owner_of_goal(goal_id)
+        # Logs for unknown goals still need a home; keep them with the shared goals
+        return self._shard(owner if found else None).add_log(goal_id, action, value, ts)
+
+    def list_logs(self):
+        logs = []
+        for uid in self._owner_ids():
+            logs.extend(self._peek(uid).list_logs())
+        return logs
+
+    log_key = staticmethod(YearPlanStorage.log_key)
+
+    def page_logs(self, goal_id: int = None, user_id: int = None, before=None, limit: int = None):
+        if goal_id is not None:
+            shard = self._shard_for_goal(goal_id)
+            return shard.page_logs(goal_id=goal_id, before=before, limit=limit) if shard else []
+        if user_id is not None:
+            return self._shard(user_id).page_logs(user_id=user_id, before=before, limit=limit)
+        # Every shard's newest page, merged
+        pages = [self._peek(uid).page_logs(before=before, limit=limit) for uid in self._owner_ids()]
+        merged = heapq.merge(*pages, key=self.log_key, reverse=True)
+        return list(itertools.islice(merged, limit)) if limit else list(merged)
+
+    def get_logs_for_goal(self, goal_id: int):
+        shard = self._shard_for_goal(goal_id)
+        return shard.get_logs_for_goal(goal_id) if shard else None
+
+    def user_owns_log(self, log_id: int, user_id: int) -> bool:
+        return self._shard(user_id).user_owns_log(log_id, user_id)
+
+    def edit_log(self, log_id: int, **fields):
+        shard = self._shard_for_log(log_id)
+        return shard.edit_log(log_id, **fields) if shard else None
+
+    def delete_log(self, log_id: int) -> bool:
+        shard = self._shard_for_log(log_id)
+        return shard.delete_log(log_id) if shard else False
+
+    def rollback_log(self, log_id: int):
+        shard = self._shard_for_log(log_id)
+        return shard.rollback_log(log_id) if shard else None
+
+    # --------------------
+    # Users (index)
+    # --------------------
+    def delete_user(self, user_id: int) -> bool:
+        """Delete user and all associated data (drops the user's shard file)."""
+        try:
+            with self._lock:
+                self._drop(user_id)
+            gids = [row.get('id') for row in self._index._data.get('owners', []) if row.get('user_id') == user_id]
+            with self._index.transaction():
+                if not self._index.delete_user(user_id):
+                    return False
+                self._index._commit(self._index._delete_rows('owners', gids))
+            base = self.shard_path(user_id)
+            for p in (base, base.with_name(base.name + '.wal'), base.with_name(base.name + '.lock')):
+                try:
+                    p.unlink()
+                except FileNotFoundError:
+                    pass
+            return True
+        except Exception:
+            return False
+
+
+def _delegate_to_index(name):
+    def method(self, *args, **kwargs):
+        return getattr(self._index, name)(*args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(YearPlanStorage, name).__doc__
+    return method
+
+
+for _name in ('create_user', 'create_unverified_user', 'get_user_by_email', 'get_user_by_id', 'get_user_by_token',
+              'update_user_password', 'update_user_email', 'verify_user_email', 'update_verification_token',
+              'update_user_reminder_preferences', 'get_user_reminder_preferences', 'update_last_reminder_sent',
+              'get_reminder_schedule', 'get_users_needing_reminders', 'is_user_verified'):
+    setattr(ShardedYearPlanStorage, _name, _delegate_to_index(_name))
+
+
+def shard_existing(src: Path, root: Path) -> ShardedYearPlanStorage:
+    """Split a single-file JSON store (snapshot plus any WAL) into a sharded layout at ``root``."""
+    old = YearPlanStorage(src, journal=Path(str(src) + '.wal').exists())
+    store = ShardedYearPlanStorage(root)
+    goals_by_owner = {}
+    for g in old._data.get('goals', []):
+        goals_by_owner.setdefault(g.get('user_id'), []).append(g)
+    owner_of = {g.get('id'): g.get('user_id') for g in old._data.get('goals', [])}
+    logs_by_owner = {}
+    for l in old._data.get('logs', []):
+        logs_by_owner.setdefault(owner_of.get(l.get('goal_id')), []).append(l)
+
+    for uid in set(goals_by_owner) | set(logs_by_owner):
+        with open(store.shard_path(uid), 'w', encoding='utf-8') as fh:
+            json.dump({'goals': goals_by_owner.get(uid, []), 'logs': logs_by_owner.get(uid, [])}, fh, indent=2, ensure_ascii=False)
+    index = {
+        'users': old._data.get('users', []),
+        'owners': [{'id': gid, 'user_id': uid} for gid, uid in owner_of.items()],
+    }
+    with open(store.root / 'index.json', 'w', encoding='utf-8') as fh:
+        json.dump(index, fh, indent=2, ensure_ascii=False)
+    last_id = old._last_id
+    try:
+        last_id = max(last_id, int(old.seq_path.read_text().strip() or 0))
+    except Exception:
+        pass
+    with open(store.id_path, 'w', encoding='utf-8') as fh:
+        fh.write(str(last_id))
+    old.close()
+    store.close()
+    return ShardedYearPlanStorage(root)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        print('usage: python -m yearplan.sharded_storage <yearplan.json> <shard dir>')
+        sys.exit(2)
+    shard_existing(Path(sys.argv[1]).expanduser(), Path(sys.argv[2]).expanduser())
+    print(f"[storage] sharded {sys.argv[1]} into {sys.argv[2]}")
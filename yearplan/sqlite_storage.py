@@ -0,0 +1,665 @@
+from pathlib import Path
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from .storage import YearPlanStorage, compute_progress_status, current_value_from_state
+
+# Toggle verbose debug logs with env
+DEBUG_DB = os.environ.get("YEARPLAN_DEBUG_DB", "0") in {"1", "true", "True", "yes"}
+
+# Goal attributes with their own column; anything else set on a goal lives in the 'extra' JSON
+GOAL_COLUMNS = ('id', 'user_id', 'text', 'created_at', 'start_date', 'end_date', 'target', 'task_type',
+                'start_value', 'current_value', 'is_completed', 'completed_at', 'completed_value')
+USER_COLUMNS = ('id', 'name', 'email', 'password_hash', 'created_at', 'is_verified', 'verification_token',
+                'token_expires', 'reminder_frequency', 'reminder_enabled', 'last_reminder_sent')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    email TEXT UNIQUE,              -- the UNIQUE constraint doubles as the email index
+    password_hash TEXT,
+    created_at TEXT,
+    is_verified INTEGER,            -- NULL for accounts created before verification existed
+    verification_token TEXT,
+    token_expires TEXT,
+    reminder_frequency TEXT DEFAULT 'weekly',
+    reminder_enabled INTEGER DEFAULT 1,
+    last_reminder_sent TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_verification_token ON users(verification_token COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS goals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    text TEXT,
+    created_at TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    target NUMERIC,
+    task_type TEXT NOT NULL DEFAULT 'increment',
+    start_value NUMERIC,
+    current_value NUMERIC,
+    is_completed INTEGER,
+    completed_at TEXT,
+    completed_value NUMERIC,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_goals_user_id ON goals(user_id);
+
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    goal_id INTEGER NOT NULL REFERENCES goals(id) ON DELETE CASCADE,
+    action TEXT,
+    value NUMERIC,
+    ts TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logs_goal_id ON logs(goal_id, action, id);
+CREATE INDEX IF NOT EXISTS idx_logs_goal_ts ON logs(goal_id, COALESCE(ts, ''), id);
+"""
+
+# Per-goal log aggregates in the shape of YearPlanStorage._new_goal_state, computed
+# in SQL for a set of goals (the {ids} placeholder is filled with '?' markers)
+LOG_STATE_SQL = """
+WITH last_update AS (
+    SELECT goal_id, MAX(id) AS last_id FROM logs
+    WHERE action = 'update' AND goal_id IN ({ids}) GROUP BY goal_id
+), latest AS (
+    SELECT goal_id, COALESCE(value, 0) AS value,
+           ROW_NUMBER() OVER (PARTITION BY goal_id ORDER BY ts IS NULL, ts DESC, id) AS rn
+    FROM logs WHERE action = 'update' AND goal_id IN ({ids})
+)
+SELECT l.goal_id,
+       COALESCE(SUM(CASE l.action WHEN 'increment' THEN l.value WHEN 'update' THEN l.value
+                                  WHEN 'decrement' THEN -l.value END), 0) AS total,
+       MAX(CASE WHEN l.id = lu.last_id THEN COALESCE(l.value, 0) END) AS last_update,
+       COALESCE(SUM(CASE WHEN l.id > COALESCE(lu.last_id, 0) THEN
+                    CASE l.action WHEN 'increment' THEN l.value WHEN 'decrement' THEN -l.value END END), 0) AS delta,
+       (SELECT value FROM latest WHERE latest.goal_id = l.goal_id AND rn = 1) AS latest_value
+FROM logs l LEFT JOIN last_update lu ON lu.goal_id = l.goal_id
+WHERE l.goal_id IN ({ids})
+GROUP BY l.goal_id
+"""
+
+
+class SQLiteStorage:
+    def __init__(self, path: Path):
+        """SQLite storage with the same method surface as the JSON YearPlanStorage.
+
+        The database runs in WAL mode so readers never block the writer. Each
+        thread gets its own connection; every public mutator is one transaction,
+        and ``transaction()`` groups several of them.
+        """
+        self.path = Path(path)
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        self._create_tables()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if DEBUG_DB:
+                print(f"[DB] sqlite connect {self.path} thread={threading.get_ident()}")
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _create_tables(self):
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        """Group several changes into one transaction; nested blocks join the outer one."""
+        conn = self._conn()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield self
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield self
+        except BaseException:
+            self._local.depth = 0
+            conn.execute('ROLLBACK')
+            raise
+        self._local.depth = 0
+        conn.execute('COMMIT')
+
+    @contextmanager
+    def _write(self):
+        with self.transaction():
+            yield self._conn()
+
+    def flush(self) -> bool:
+        """Commits are already durable; kept for parity with the JSON store."""
+        return True
+
+    def checkpoint(self) -> bool:
+        """Fold the SQLite WAL back into the database file."""
+        try:
+            self._conn().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            return True
+        except Exception as e:
+            print(f"[DB] sqlite checkpoint failed: {e}")
+            return False
+
+    def close(self):
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+    # --------------------
+    # Row conversion
+    # --------------------
+    @staticmethod
+    def _goal_dict(row) -> Optional[dict]:
+        if row is None:
+            return None
+        g = {k: row[k] for k in GOAL_COLUMNS}
+        # Completion fields only exist once a goal is completed, as in the JSON store
+        for k in ('is_completed', 'completed_at', 'completed_value'):
+            if g[k] is None:
+                del g[k]
+        if 'is_completed' in g:
+            g['is_completed'] = bool(g['is_completed'])
+        if row['extra']:
+            try:
+                g.update(json.loads(row['extra']))
+            except ValueError:
+                pass
+        return g
+
+    @staticmethod
+    def _user_dict(row) -> Optional[dict]:
+        if row is None:
+            return None
+        u = {k: row[k] for k in USER_COLUMNS}
+        if u['is_verified'] is None:
+            del u['is_verified']
+        else:
+            u['is_verified'] = bool(u['is_verified'])
+        u['reminder_enabled'] = bool(u['reminder_enabled'])
+        return u
+
+    @staticmethod
+    def _log_dict(row) -> dict:
+        return {'id': row['id'], 'goal_id': row['goal_id'], 'action': row['action'], 'value': row['value'], 'ts': row['ts']}
+
+    # --------------------
+    # Goals
+    # --------------------
+    def add_goal(self, text: str, user_id: int = None):
+        # kept for backward-compat: simple add_goal(text)
+        with self._write() as conn:
+            return conn.execute("INSERT INTO goals (text, user_id) VALUES (?, ?)", (text, user_id)).lastrowid
+
+    def add_goal_with_meta(self, text: str, start_date: Optional[str] = None, end_date: Optional[str] = None, target: Optional[float] = None, task_type: str = 'increment', user_id: int = None, start_value: Optional[float] = None):
+        """Add a goal with optional scheduling/target metadata (see YearPlanStorage.add_goal_with_meta)."""
+        with self._write() as conn:
+            cur = conn.execute(
+                """
+                INSERT INTO goals (text, created_at, start_date, end_date, target, task_type, start_value, current_value, user_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (text, date.today().isoformat(), start_date, end_date, target, task_type or 'increment', start_value,
+                 target if task_type == 'decrement' else 0, user_id),
+            )
+            return cur.lastrowid
+
+    def list_goals(self, user_id: int = None):
+        if user_id is not None:
+            rows = self._conn().execute("SELECT * FROM goals WHERE user_id = ? ORDER BY id", (user_id,))
+        else:
+            rows = self._conn().execute("SELECT * FROM goals ORDER BY id")
+        return [self._goal_dict(r) for r in rows]
+
+    def get_goal(self, goal_id: int, user_id: int = None):
+        row = self._conn().execute("SELECT * FROM goals WHERE id = ?", (goal_id,)).fetchone()
+        g = self._goal_dict(row)
+        if g is None or (user_id is not None and g.get('user_id') != user_id):
+            return None
+        return g
+
+    def _log_states(self, goal_ids) -> dict:
+        """{goal_id: aggregate state} computed in SQL for the given goals."""
+        goal_ids = list(goal_ids)
+        states = {gid: YearPlanStorage._new_goal_state() for gid in goal_ids}
+        if not goal_ids:
+            return states
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(goal_ids), 300):
+            chunk = goal_ids[i:i + 300]
+            marks = ','.join('?' * len(chunk))
+            for r in self._conn().execute(LOG_STATE_SQL.format(ids=marks), chunk * 3):
+                state = states[r['goal_id']]
+                state['total'] = float(r['total'] or 0)
+                state['last_update'] = float(r['last_update']) if r['last_update'] is not None else None
+                state['delta'] = float(r['delta'] or 0)
+                state['latest_value'] = float(r['latest_value'] or 0)
+        return states
+
+    def _calculate_current_value(self, goal_id: int) -> float:
+        """Calculate current value based on goal type and logs"""
+        goal = self.get_goal(goal_id)
+        if not goal:
+            return 0.0
+        return current_value_from_state(goal, self._log_states([goal_id])[goal_id])
+
+    def goal_progress_status(self, goal_id: int, today: Optional[date] = None):
+        """Calculate goal progress and status"""
+        goal = self.get_goal(goal_id)
+        if not goal:
+            return None
+        return compute_progress_status(goal, self._calculate_current_value(goal_id), today)
+
+    def current_values_many(self, goal_ids) -> dict:
+        """{goal_id: current value} for several goals (0.0 for missing ones)."""
+        goals = self._goals_by_id(goal_ids)
+        states = self._log_states(goals)
+        return {gid: current_value_from_state(goals[gid], states[gid]) if gid in goals else 0.0 for gid in goal_ids}
+
+    def _goals_by_id(self, goal_ids) -> dict:
+        goal_ids = list(dict.fromkeys(goal_ids))
+        goals = {}
+        for i in range(0, len(goal_ids), 300):
+            chunk = goal_ids[i:i + 300]
+            for r in self._conn().execute(f"SELECT * FROM goals WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                goals[r['id']] = self._goal_dict(r)
+        return goals
+
+    def progress_status_many(self, goal_ids, today: Optional[date] = None) -> dict:
+        """Progress/status for several goals at once: {goal_id: status, or None if missing}."""
+        goal_ids = list(dict.fromkeys(goal_ids))
+        today = today or date.today()
+        goals = self._goals_by_id(goal_ids)
+        states = self._log_states(goals)
+        return {gid: compute_progress_status(goals[gid], current_value_from_state(goals[gid], states[gid]), today)
+                if gid in goals else None for gid in goal_ids}
+
+    def mark_goal_completed(self, goal_id: int, user_id: int = None):
+        """Mark a goal as completed and set completed_at timestamp."""
+        with self._write() as conn:
+            g = self.get_goal(goal_id, user_id)
+            if g is None:
+                return False
+            try:
+                value = float(self._calculate_current_value(goal_id))
+            except Exception:
+                value = g.get('target')
+            conn.execute(
+                "UPDATE goals SET is_completed = 1, completed_value = ?, completed_at = ? WHERE id = ?",
+                (value, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), goal_id),
+            )
+            return True
+
+    def delete_goal(self, goal_id: int, user_id: int = None) -> bool:
+        with self._write() as conn:
+            if self.get_goal(goal_id, user_id) is None:
+                return False  # Missing, or user doesn't own this goal
+            conn.execute("DELETE FROM goals WHERE id = ?", (goal_id,))
+            return True
+
+    def set_goal_field(self, goal_id: int, field: str, value, user_id: int = None) -> bool:
+        """Set an arbitrary field on a goal with optional user ownership check."""
+        try:
+            with self._write() as conn:
+                if self.get_goal(goal_id, user_id) is None:
+                    return False
+                if field in GOAL_COLUMNS and field != 'id':
+                    conn.execute(f"UPDATE goals SET {field} = ? WHERE id = ?", (value, goal_id))
+                else:
+                    raw = conn.execute("SELECT extra FROM goals WHERE id = ?", (goal_id,)).fetchone()['extra']
+                    extra = json.loads(raw) if raw else {}
+                    extra[field] = value
+                    conn.execute("UPDATE goals SET extra = ? WHERE id = ?", (json.dumps(extra), goal_id))
+                return True
+        except Exception:
+            return False
+
+    def update_goal_name(self, goal_id: int, new_text: str, user_id: int = None) -> bool:
+        """Update the display text/name of a goal."""
+        if not new_text:
+            return False
+        with self._write() as conn:
+            if self.get_goal(goal_id, user_id) is None:
+                return False
+            conn.execute("UPDATE goals SET text = ? WHERE id = ?", (str(new_text), goal_id))
+            return True
+
+    def update_goal_target(self, goal_id: int, new_target, user_id: int = None) -> bool:
+        """Update the target value for a goal. Does not modify logs or current value."""
+        try:
+            target = None if new_target is None or new_target == "" else float(new_target)
+            with self._write() as conn:
+                if self.get_goal(goal_id, user_id) is None:
+                    return False
+                conn.execute("UPDATE goals SET target = ? WHERE id = ?", (target, goal_id))
+                return True
+        except Exception:
+            return False
+
+    def update_goal_value(self, goal_id: int, action: str, value: float = 1, ts: str = None, user_id: int = None):
+        """Update goal value based on task type (see YearPlanStorage.update_goal_value)."""
+        with self._write() as conn:
+            goal = self.get_goal(goal_id, user_id)
+            if not goal:
+                return None
+
+            task_type = goal.get('task_type', 'increment')
+            if task_type == 'increment' and action not in ['increment', 'update']:
+                action = 'increment'
+            elif task_type == 'decrement' and action not in ['decrement', 'update']:
+                action = 'decrement'
+            elif task_type == 'percentage' and action != 'update':
+                action = 'update'
+
+            # Percentage goals never go down through a manual update
+            if task_type == 'percentage' and action == 'update':
+                if value < self._calculate_current_value(goal_id):
+                    return None
+
+            ts = ts or date.today().isoformat()
+            lid = conn.execute(
+                "INSERT INTO logs (goal_id, action, value, ts) VALUES (?, ?, ?, ?)", (goal_id, action, value, ts)
+            ).lastrowid
+            entry = {'id': lid, 'goal_id': goal_id, 'action': action, 'value': value, 'ts': ts}
+
+            # Auto-adjust target when the current value passes it
+            try:
+                new_current = self._calculate_current_value(goal_id)
+                tgt = goal.get('target')
+                if tgt is not None:
+                    if (task_type == 'decrement' and float(new_current) < float(tgt)) or \
+                            (task_type == 'increment' and float(new_current) > float(tgt)):
+                        conn.execute("UPDATE goals SET target = ? WHERE id = ?", (float(new_current), goal_id))
+            except Exception:
+                pass
+
+            try:
+                status = self.goal_progress_status(goal_id)
+                if status and status.get('percent', 0) >= 100:
+                    self.mark_goal_completed(goal_id, user_id)
+            except Exception:
+                pass
+            return entry
+
+    # --------------------
+    # Logs
+    # --------------------
+    def add_log(self, goal_id: int, action: str, value=None, ts=None):
+        with self._write() as conn:
+            lid = conn.execute(
+                "INSERT INTO logs (goal_id, action, value, ts) VALUES (?, ?, ?, ?)", (goal_id, action, value, ts)
+            ).lastrowid
+        return {'id': lid, 'goal_id': goal_id, 'action': action, 'value': value, 'ts': ts}
+
+    def list_logs(self):
+        return [self._log_dict(r) for r in self._conn().execute("SELECT * FROM logs ORDER BY id")]
+
+    log_key = staticmethod(YearPlanStorage.log_key)
+
+    def page_logs(self, goal_id: int = None, user_id: int = None, before=None, limit: int = None):
+        """Logs newest first by (ts, id), strictly after the ``before`` key, at most ``limit``."""
+        where, params = [], []
+        if goal_id is not None:
+            where.append("goal_id = ?")
+            params.append(goal_id)
+        elif user_id is not None:
+            where.append("goal_id IN (SELECT id FROM goals WHERE user_id = ?)")
+            params.append(user_id)
+        if before is not None:
+            where.append("(COALESCE(ts, ''), id) < (?, ?)")
+            params.extend([str(before[0] or ''), before[1]])
+        sql = "SELECT * FROM logs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY COALESCE(ts, '') DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        out = []
+        for r in self._conn().execute(sql, params):
+            log = self._log_dict(r)
+            log['timestamp'] = log.get('ts') or ''
+            out.append(log)
+        return out
+
+    def get_logs_for_goal(self, goal_id: int):
+        """Get all logs for a specific goal, with timestamp field added."""
+        if self.get_goal(goal_id) is None:
+            return None
+        logs = []
+        for r in self._conn().execute("SELECT * FROM logs WHERE goal_id = ? ORDER BY id", (goal_id,)):
+            log = self._log_dict(r)
+            log['timestamp'] = log.get('ts') or ''
+            logs.append(log)
+        return logs
+
+    def edit_log(self, log_id: int, **fields):
+        """Edit a log entry by id. Fields can include action, value, ts."""
+        allowed = {k: v for k, v in fields.items() if k in ('action', 'value', 'ts')}
+        with self._write() as conn:
+            for k, v in allowed.items():
+                conn.execute(f"UPDATE logs SET {k} = ? WHERE id = ?", (v, log_id))
+            row = conn.execute("SELECT * FROM logs WHERE id = ?", (log_id,)).fetchone()
+            return self._log_dict(row) if row else None
+
+    def delete_log(self, log_id: int) -> bool:
+        with self._write() as conn:
+            return conn.execute("DELETE FROM logs WHERE id = ?", (log_id,)).rowcount > 0
+
+    def rollback_log(self, log_id: int):
+        """Delete the specified log entry"""
+        with self._write() as conn:
+            row = conn.execute("SELECT goal_id FROM logs WHERE id = ?", (log_id,)).fetchone()
+            if row is None:
+                return None
+            deleted = conn.execute("DELETE FROM logs WHERE id = ?", (log_id,)).rowcount
+            return {'deleted_count': deleted, 'deleted_log_ids': [log_id], 'goal_id': row['goal_id']}
+
+    def user_owns_log(self, log_id: int, user_id: int) -> bool:
+        """Check if user owns the goal that this log belongs to"""
+        if user_id is None:
+            row = self._conn().execute("SELECT 1 FROM logs l JOIN goals g ON g.id = l.goal_id WHERE l.id = ?",
+                                       (log_id,)).fetchone()
+        else:
+            row = self._conn().execute(
+                "SELECT 1 FROM logs l JOIN goals g ON g.id = l.goal_id WHERE l.id = ? AND g.user_id = ?",
+                (log_id, user_id)).fetchone()
+        return row is not None
+
+    # --------------------
+    # Users
+    # --------------------
+    def _insert_user(self, **fields):
+        fields.setdefault('created_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        fields.setdefault('reminder_frequency', 'weekly')
+        fields.setdefault('reminder_enabled', True)
+        cols = ', '.join(fields)
+        with self._write() as conn:
+            uid = conn.execute(f"INSERT INTO users ({cols}) VALUES ({', '.join('?' * len(fields))})",
+                               tuple(fields.values())).lastrowid
+            return self.get_user_by_id(uid)
+
+    def create_user(self, name: str, email: str, password_hash: str):
+        """Create a new user account"""
+        return self._insert_user(name=name, email=email, password_hash=password_hash)
+
+    def create_unverified_user(self, name: str, email: str, password_hash: str, verification_token: str):
+        """Create a new unverified user account"""
+        return self._insert_user(
+            name=name, email=email, password_hash=password_hash, is_verified=False,
+            verification_token=verification_token,
+            token_expires=(datetime.now() + timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S'),
+        )
+
+    def get_user_by_email(self, email: str):
+        """Get user by email address"""
+        return self._user_dict(self._conn().execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone())
+
+    def get_user_by_id(self, user_id: int):
+        """Get user by ID"""
+        return self._user_dict(self._conn().execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone())
+
+    def get_user_by_token(self, token: str):
+        """Get user by verification token (case/whitespace-insensitive)."""
+        tok = str(token or '').strip()
+        if not tok:
+            return None
+        row = self._conn().execute(
+            "SELECT * FROM users WHERE verification_token = ? COLLATE NOCASE", (tok,)).fetchone()
+        return self._user_dict(row)
+
+    def _update_user(self, user_id: int, **fields) -> bool:
+        sets = ', '.join(f"{k} = ?" for k in fields)
+        with self._write() as conn:
+            return conn.execute(f"UPDATE users SET {sets} WHERE id = ?", (*fields.values(), user_id)).rowcount > 0
+
+    def update_user_password(self, user_id: int, new_password_hash: str) -> bool:
+        """Update user password"""
+        return self._update_user(user_id, password_hash=new_password_hash)
+
+    def update_user_email(self, user_id: int, new_email: str) -> bool:
+        """Update user email"""
+        return self._update_user(user_id, email=new_email)
+
+    def delete_user(self, user_id: int) -> bool:
+        """Delete user and all associated data"""
+        try:
+            with self._write() as conn:
+                # goal logs go with their goals (ON DELETE CASCADE)
+                conn.execute("DELETE FROM goals WHERE user_id = ?", (user_id,))
+                conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            return True
+        except Exception:
+            return False
+
+    def verify_user_email(self, token: str) -> bool:
+        """Verify user email with token (robust parsing and comparison)."""
+        try:
+            with self._write():
+                user = self.get_user_by_token(token)
+                if user is None or user.get('is_verified', False):
+                    return False
+                token_expires = user.get('token_expires')
+                if token_expires:
+                    try:
+                        if datetime.now() > datetime.strptime(token_expires, '%Y-%m-%d %H:%M:%S'):
+                            return False  # Token expired
+                    except Exception:
+                        pass
+                return self._update_user(user['id'], is_verified=True, verification_token=None, token_expires=None)
+        except Exception:
+            return False
+
+    def update_verification_token(self, email: str, token: str, token_expires: str) -> bool:
+        """Set/refresh the user's verification token and expiry."""
+        with self._write() as conn:
+            return conn.execute("UPDATE users SET verification_token = ?, token_expires = ? WHERE email = ?",
+                                (token, token_expires, email)).rowcount > 0
+
+    def update_user_reminder_preferences(self, user_id: int, frequency: str, enabled: bool = True):
+        """Update user's reminder preferences"""
+        return self._update_user(user_id, reminder_frequency=frequency, reminder_enabled=enabled)
+
+    def get_user_reminder_preferences(self, user_id: int):
+        """Get user's reminder preferences"""
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return None
+        return {
+            'frequency': user.get('reminder_frequency') or 'weekly',
+            'enabled': user.get('reminder_enabled', True),
+            'last_sent': user.get('last_reminder_sent'),
+        }
+
+    def update_last_reminder_sent(self, user_id: int, timestamp: str = None):
+        """Update when the last reminder was sent to user"""
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return self._update_user(user_id, last_reminder_sent=timestamp)
+
+    def get_reminder_schedule(self):
+        """Users with reminders on (enabled and verified), whether due or not"""
+        rows = self._conn().execute(
+            "SELECT * FROM users WHERE COALESCE(reminder_enabled, 1) AND COALESCE(is_verified, 1) ORDER BY id"
+        )
+        return [self._user_dict(r) for r in rows]
+
+    def get_users_needing_reminders(self):
+        """Get all users who need reminders based on their preferences and last reminder sent"""
+        rows = self._conn().execute(
+            """
+            SELECT * FROM users
+            WHERE COALESCE(reminder_enabled, 1) AND COALESCE(is_verified, 1)
+              AND (last_reminder_sent IS NULL OR julianday(last_reminder_sent) IS NULL
+                   OR julianday('now', 'localtime') - julianday(last_reminder_sent) >=
+                      CASE COALESCE(reminder_frequency, 'weekly')
+                          WHEN 'daily' THEN 1 WHEN 'weekly' THEN 7 WHEN 'biweekly' THEN 14 WHEN 'monthly' THEN 30
+                      END)
+            ORDER BY id
+            """
+        )
+        return [self._user_dict(r) for r in rows]
+
+    def is_user_verified(self, user_id: int) -> bool:
+        """Check if user is verified"""
+        user = self.get_user_by_id(user_id)
+        return user.get('is_verified', False) if user else False
+
+
+def import_json(src: Path, dst: Path) -> SQLiteStorage:
+    """Copy a JSON store (snapshot plus any WAL) into a new SQLite database, keeping ids."""
+    old = YearPlanStorage(src, journal=Path(str(src) + '.wal').exists())
+    store = SQLiteStorage(dst)
+    goal_ids = set()
+    with store._write() as conn:
+        for u in old._data.get('users', []):
+            cols = [c for c in USER_COLUMNS if c in u]
+            conn.execute(f"INSERT INTO users ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                         [u[c] for c in cols])
+        for g in old._data.get('goals', []):
+            cols = [c for c in GOAL_COLUMNS if c in g]
+            extra = {k: v for k, v in g.items() if k not in GOAL_COLUMNS}
+            conn.execute(f"INSERT INTO goals ({', '.join(cols)}, extra) VALUES ({', '.join('?' * (len(cols) + 1))})",
+                         [g[c] for c in cols] + [json.dumps(extra) if extra else None])
+            goal_ids.add(g.get('id'))
+        for l in old._data.get('logs', []):
+            if l.get('goal_id') not in goal_ids:
+                continue  # orphaned by an old delete_goal
+            conn.execute("INSERT INTO logs (id, goal_id, action, value, ts) VALUES (?, ?, ?, ?, ?)",
+                         (l.get('id'), l.get('goal_id'), l.get('action'), l.get('value'), l.get('ts')))
+    old.close()
+    return store
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        print('usage: python -m yearplan.sqlite_storage <yearplan.json> <yearplan.sqlite3>')
+        sys.exit(2)
+    import_json(Path(sys.argv[1]).expanduser(), Path(sys.argv[2]).expanduser())
+    print(f"[storage] imported {sys.argv[1]} into {sys.argv[2]}")
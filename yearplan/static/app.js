@@ -169,43 +169,55 @@ function renderCard(g){
     </div>`
 }
 
-function showLogsForGoal(goalId) {
+// Per-goal logs arrive newest first in pages, like the All Logs modal (X-Next-Cursor)
+let goalLogsCursor = null
+
+async function showLogsForGoal(goalId) {
   currentLogsGoalId = goalId // Store for later use in rollback
   document.getElementById('logs-title').textContent = `Logs for Goal ${goalId}`
 
-  fetch(`/api/goals/${goalId}/logs`)
-    .then(response => response.json())
-    .then(logs => {
-      const logsTableBody = document.querySelector('#logs-table tbody')
-      logsTableBody.innerHTML = ''
-
-      if (!Array.isArray(logs) || logs.length === 0) {
-        const row = logsTableBody.insertRow()
-        row.innerHTML = `<td colspan="3" style="text-align: center; color: #666;">No logs found for this goal</td>`
-        document.getElementById('logs-modal').style.display = 'block'
-        return
-      }
-
-      // Sort logs by timestamp (newest first)
-      logs.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp))
-
-      logs.forEach((log, index) => {
-        const row = logsTableBody.insertRow()
-        const date = new Date(log.timestamp)
-        const formattedDate = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], {hour: '2-digit', minute:'2-digit', second:'2-digit'})
-
-        // Only show rollback button for the most recent entry (index 0)
-        const rollbackButton = index === 0 ? `<button class="log-btn rollback-btn" onclick="rollbackLog(${log.id})">Rollback</button>` : ''
-
-        row.innerHTML = `
-          <td>${formattedDate}</td>
-          <td class="log-value">${log.value}</td>
-          <td>${rollbackButton}</td>
-        `
-      })
+  const logsTableBody = document.querySelector('#logs-table tbody')
+  logsTableBody.innerHTML = ''
+  goalLogsCursor = null
+  const count = await appendGoalLogsPage(goalId)
+  if (count === 0) {
+    const row = logsTableBody.insertRow()
+    row.innerHTML = `<td colspan="3" style="text-align: center; color: #666;">No logs found for this goal</td>`
+  }
+  document.getElementById('logs-modal').style.display = 'block'
+}
 
-      document.getElementById('logs-modal').style.display = 'block'
-    })
+async function appendGoalLogsPage(goalId) {
+  const url = `/api/goals/${goalId}/logs?limit=200` + (goalLogsCursor ? `&cursor=${encodeURIComponent(goalLogsCursor)}` : '')
+  const response = await fetch(url)
+  const logs = await response.json()
+  goalLogsCursor = response.headers.get('X-Next-Cursor')
+  if (!Array.isArray(logs)) return 0
+
+  const logsTableBody = document.querySelector('#logs-table tbody')
+  const moreRow = logsTableBody.querySelector('.load-more-row')
+  if (moreRow) moreRow.remove()
+  const first = logsTableBody.rows.length === 0
+  logs.forEach((log, index) => {
+    const row = logsTableBody.insertRow()
+    const date = new Date(log.timestamp)
+    const formattedDate = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], {hour: '2-digit', minute:'2-digit', second:'2-digit'})
+
+    // Only show rollback button for the most recent entry (first row of the first page)
+    const rollbackButton = first && index === 0 ? `<button class="log-btn rollback-btn" onclick="rollbackLog(${log.id})">Rollback</button>` : ''
+
+    row.innerHTML = `
+      <td>${formattedDate}</td>
+      <td class="log-value">${log.value}</td>
+      <td>${rollbackButton}</td>
+    `
+  })
+  if (goalLogsCursor) {
+    const row = logsTableBody.insertRow()
+    row.className = 'load-more-row'
+    row.innerHTML = `<td colspan="3" style="text-align:center;"><button class="log-btn load-more">Load more</button></td>`
+  }
+  return logs.length
 }
 
 async function deleteLog(logId) {
@@ -730,6 +742,18 @@ document.getElementById('goal-modal').addEventListener('click', (e) => {
   }
 })
 
+document.getElementById('logs-table').addEventListener('click', async (e) => {
+  const moreBtn = e.target.closest('.log-btn.load-more')
+  if (!moreBtn || !currentLogsGoalId) return
+  moreBtn.disabled = true
+  try {
+    await appendGoalLogsPage(currentLogsGoalId)
+  } catch (err) {
+    console.error(err)
+    moreBtn.disabled = false
+  }
+})
+
 document.getElementById('logs-modal').addEventListener('click', (e) => {
   if (e.target.id === 'logs-modal') {
     document.getElementById('logs-modal').style.display = 'none'
@@ -737,9 +761,9 @@ document.getElementById('logs-modal').addEventListener('click', (e) => {
 })
 
 async function resetTask(goalId) {
-  // Delete all logs for this goal
-  const allLogs = await fetch('/api/logs').then(r => r.json())
-  const goalLogs = allLogs.filter(l => l.goal_id == goalId)
+  // Delete all logs for this goal (streamed as NDJSON, one log per line)
+  const ndjson = await fetch(`/api/goals/${goalId}/logs?format=ndjson`).then(r => r.text())
+  const goalLogs = ndjson.split('\n').filter(line => line.trim()).map(line => JSON.parse(line))
   
   for (const log of goalLogs) {
     await fetch(`/api/logs/${log.id}`, { method: 'DELETE' })
@@ -1435,40 +1459,19 @@ function escapeHtml(text) {
 }
 
 // Reusable: show All Logs modal and populate table
+// Logs arrive newest first in pages; X-Next-Cursor marks where the next page starts
+let allLogsCursor = null
+
 async function showAllLogsModal() {
   try {
-    const res = await fetch('/api/logs')
-    if (!res.ok) throw new Error('Failed to fetch logs')
-    const logs = await res.json()
-
-    // build goals map
-    const goalsMap = {}
-    for (const g of (goalsData || [])) goalsMap[g.id] = g.text
-
     const tbody = document.querySelector('#all-logs-table tbody')
     tbody.innerHTML = ''
-    if (!logs || logs.length === 0) {
+    allLogsCursor = null
+    const count = await appendAllLogsPage()
+    if (count === 0) {
       const tr = document.createElement('tr')
       tr.innerHTML = `<td colspan="4" style="text-align:center;color:#666;">No logs found</td>`
       tbody.appendChild(tr)
-    } else {
-      // newest first
-      logs.sort((a,b) => new Date(b.timestamp) - new Date(a.timestamp))
-      for (const log of logs) {
-        const date = new Date(log.timestamp)
-        const formatted = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit', second:'2-digit'})
-        const tr = document.createElement('tr')
-        tr.innerHTML = `
-          <td>${formatted}</td>
-          <td>${goalsMap[log.goal_id] || ('Goal ' + log.goal_id)}</td>
-          <td class="log-value">${log.value}</td>
-          <td>
-            <button class="log-btn edit" data-log-id="${log.id}">Edit</button>
-            <button class="log-btn delete" data-log-id="${log.id}">Delete</button>
-          </td>
-        `
-        tbody.appendChild(tr)
-      }
     }
     document.getElementById('all-logs-modal').style.display = 'block'
   } catch (e) {
@@ -1477,6 +1480,44 @@ async function showAllLogsModal() {
   }
 }
 
+async function appendAllLogsPage() {
+  const url = '/api/logs?limit=200' + (allLogsCursor ? `&cursor=${encodeURIComponent(allLogsCursor)}` : '')
+  const res = await fetch(url)
+  if (!res.ok) throw new Error('Failed to fetch logs')
+  const logs = await res.json()
+  allLogsCursor = res.headers.get('X-Next-Cursor')
+
+  // build goals map
+  const goalsMap = {}
+  for (const g of (goalsData || [])) goalsMap[g.id] = g.text
+
+  const tbody = document.querySelector('#all-logs-table tbody')
+  const moreRow = tbody.querySelector('.load-more-row')
+  if (moreRow) moreRow.remove()
+  for (const log of (logs || [])) {
+    const date = new Date(log.timestamp)
+    const formatted = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit', second:'2-digit'})
+    const tr = document.createElement('tr')
+    tr.innerHTML = `
+      <td>${formatted}</td>
+      <td>${goalsMap[log.goal_id] || ('Goal ' + log.goal_id)}</td>
+      <td class="log-value">${log.value}</td>
+      <td>
+        <button class="log-btn edit" data-log-id="${log.id}">Edit</button>
+        <button class="log-btn delete" data-log-id="${log.id}">Delete</button>
+      </td>
+    `
+    tbody.appendChild(tr)
+  }
+  if (allLogsCursor) {
+    const tr = document.createElement('tr')
+    tr.className = 'load-more-row'
+    tr.innerHTML = `<td colspan="4" style="text-align:center;"><button class="log-btn load-more">Load more</button></td>`
+    tbody.appendChild(tr)
+  }
+  return (logs || []).length
+}
+
 document.addEventListener('DOMContentLoaded', function() {
   const goalEndInput = document.getElementById('goal-end')
   if (goalEndInput) {
@@ -1550,7 +1591,16 @@ document.addEventListener('DOMContentLoaded', function() {
     allLogsTable.addEventListener('click', async (e) => {
       const editBtn = e.target.closest('.log-btn.edit')
       const deleteBtn = e.target.closest('.log-btn.delete')
-      if (editBtn) {
+      const moreBtn = e.target.closest('.log-btn.load-more')
+      if (moreBtn) {
+        moreBtn.disabled = true
+        try {
+          await appendAllLogsPage()
+        } catch (err) {
+          console.error(err)
+          moreBtn.disabled = false
+        }
+      } else if (editBtn) {
         const logId = editBtn.getAttribute('data-log-id')
         const row = editBtn.closest('tr')
         const currentValueText = row?.querySelector('.log-value')?.textContent || '0'
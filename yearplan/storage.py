@@ -1,39 +1,771 @@
 from pathlib import Path
+import os
 import json
+import atexit
+import functools
+import heapq
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
 from typing import Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+# Number of journal records after which the WAL is folded back into the snapshot
+DEFAULT_CHECKPOINT_EVERY = 1000
+
+
+@contextmanager
+def _locked_file(path: Path):
+    """Open (creating if needed) a small sidecar file and hold an exclusive lock on it."""
+    fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644)
+    fh = os.fdopen(fd, 'r+', encoding='utf-8')
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        yield fh
+    finally:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            fh.close()
+
+
+def _fsync_dir(path: Path):
+    """Make a rename inside ``path`` durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except Exception:
+        return
+    try:
+        os.fsync(fd)
+    except Exception:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic(method):
+    """Run a storage mutator inside ``self.transaction()``.
+
+    The mutator then holds the storage lock, persists once however many rows it
+    touches, and leaves no partial in-memory change behind if it raises.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.transaction():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _fresh(method):
+    """Pick up changes made by other processes before a read (shared mode only)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.shared and not self._txn_depth:
+            with self._lock:
+                self._refresh()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _stat_key(path: Path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+_MISSING = object()
+
+
+def current_value_from_state(goal: dict, state: dict) -> float:
+    """Current value of a goal from its log aggregates (see YearPlanStorage._new_goal_state)."""
+    task_type = goal.get('task_type', 'increment')
+    target = goal.get('target', 0)
+
+    if task_type == 'increment':
+        # Sum all increments and subtract decrements (for rollbacks)
+        return max(0, state['total'])  # Don't go below 0
+
+    elif task_type == 'decrement':
+        # Start at baseline (start_value if provided, else target), subtract decrements, add increments;
+        # an 'update' log resets the running value
+        if state['last_update'] is not None:
+            current = state['last_update']
+        else:
+            try:
+                current = float(goal.get('start_value')) if goal.get('start_value') is not None else float(target or 0)
+            except Exception:
+                current = float(target or 0)
+        return max(0, current + state['delta'])  # Don't go below 0
+
+    elif task_type == 'percentage':
+        # For percentage tasks, the most recent update value
+        return min(100, max(0, state['latest_value']))  # Clamp between 0-100
+
+    return 0.0
+
+
+def compute_progress_status(goal: dict, current_value: float, today: Optional[date] = None) -> dict:
+    """Progress/status dict for a goal given its current value (shared by the storage engines)."""
+    task_type = goal.get('task_type', 'increment')
+    target = goal.get('target')
+    start_date = goal.get('start_date')
+    end_date = goal.get('end_date')
+    # Start baseline:
+    # 1) If goal has explicit start_value, use it
+    # 2) Else for decrement use target (typical baseline), else 0
+    try:
+        if 'start_value' in goal and goal.get('start_value') is not None:
+            start_baseline = float(goal.get('start_value'))
+        elif task_type == 'decrement':
+            start_baseline = float(target or 0)
+        else:
+            start_baseline = 0.0
+    except Exception:
+        start_baseline = 0.0
+
+    # Clamp current within [min(start, target), max(start, target)] for non-percentage goals
+    clamped_current = current_value
+    try:
+        if task_type != 'percentage' and target is not None:
+            t = float(target)
+            s = float(start_baseline)
+            lo = min(s, t)
+            hi = max(s, t)
+            clamped_current = max(lo, min(hi, float(current_value)))
+    except Exception:
+        pass
+
+    # Calculate progress percentage using absolute goal distance = |target - start|
+    progress_pct = 0.0
+    if task_type == 'percentage':
+        progress_pct = current_value
+    else:
+        try:
+            if target is not None:
+                total_distance = abs(float(target) - float(start_baseline))
+                if total_distance > 0:
+                    # distance achieved relative to baseline (symmetric)
+                    achieved = abs(float(clamped_current) - float(start_baseline))
+                    progress_pct = max(0.0, min(100.0, (achieved / total_distance) * 100.0))
+                else:
+                    progress_pct = 100.0 if float(clamped_current) == float(target) else 0.0
+            else:
+                progress_pct = 0.0
+        except Exception:
+            progress_pct = 0.0
+
+    # Calculate expected progress based on dates (inclusive day counting)
+    expected = None
+    in_track = True
+    if start_date and end_date:
+        try:
+            start = datetime.fromisoformat(start_date).date()
+            end = datetime.fromisoformat(end_date).date()
+            # allow injected 'today' for testing, else use current date
+            today_dt = today or date.today()
+
+            total_days_inclusive = (end - start).days + 1
+            if total_days_inclusive <= 0:
+                total_days_inclusive = 1
+
+            if today_dt < start:
+                time_progress = 0.0
+            elif today_dt > end:
+                time_progress = 1.0
+            else:
+                elapsed_inclusive = (today_dt - start).days + 1
+                if elapsed_inclusive < 0:
+                    elapsed_inclusive = 0
+                if elapsed_inclusive > total_days_inclusive:
+                    elapsed_inclusive = total_days_inclusive
+                time_progress = elapsed_inclusive / total_days_inclusive
+
+            if task_type == 'percentage':
+                expected = 100 * time_progress
+            else:
+                # expected value along the path from start_baseline to target
+                try:
+                    t = float(target or 0.0)
+                    s = float(start_baseline)
+                    expected = s + (t - s) * time_progress
+                except Exception:
+                    expected = (target or 0)
+
+            # Determine if in track (only when expected non-zero)
+            try:
+                if expected not in (None, 0):
+                    # Compare achieved distance vs expected distance from baseline
+                    try:
+                        s = float(start_baseline)
+                        exp_dist = abs(float(expected) - s)
+                        cur_dist = abs(float(clamped_current) - s)
+                        ratio = (cur_dist / exp_dist) if exp_dist not in (None, 0) else 1.0
+                    except Exception:
+                        ratio = 1.0
+                    in_track = 0.7 <= ratio <= 1.3
+            except Exception:
+                pass
+        except Exception:
+            pass
+
+    return {
+        'progress': clamped_current,
+        'percent': min(100, max(0, progress_pct)),
+        'target': target,
+        'start': start_baseline,
+        'expected': expected,
+        'in_track': in_track,
+        'task_type': task_type
+    }
+
 
 class YearPlanStorage:
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, journal: bool = False, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+                 flush_interval: Optional[float] = None, shared: bool = False, id_file: Optional[Path] = None):
+        """JSON file storage.
+
+        With journal=True every mutation appends one compact record to a write-ahead
+        log next to the snapshot (``<path>.wal``) instead of rewriting the whole file.
+        The WAL is replayed on load and folded into the snapshot every
+        ``checkpoint_every`` records.
+
+        With flush_interval (seconds) set, mutations only mark the store dirty and a
+        background thread writes them out at most that long afterwards; call
+        ``flush()`` where a change must be on disk before continuing.
+
+        With shared=True several processes (e.g. gunicorn workers) can use the same
+        file: writes take an exclusive lock on ``<path>.lock`` and merge in other
+        processes' changes first, and reads check the files' stat signature and
+        reload (or replay just the new WAL records) when another process wrote.
+
+        id_file overrides the id counter file (default ``<path>.seq``) so several
+        stores can draw ids from one sequence.
+        """
         self.path = Path(path)
+        self.journal = journal
+        self.shared = shared
+        self.checkpoint_every = max(1, int(checkpoint_every or DEFAULT_CHECKPOINT_EVERY))
+        self.flush_interval = flush_interval
+        self._id_file = Path(id_file) if id_file else None
+        self._wal_records = 0
+        self._wal_offset = 0  # bytes of the WAL already applied
+        self._seen = None     # stat signature of the files as of our last read/write
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending = []   # committed records not yet written
+        self._dirty = False
+        self._txn_depth = 0
+        self._txn_records = []
+        self._txn_undo = []
         self._data = None
         self._load()
+        self._flusher = None
+        if flush_interval:
+            self._start_flusher()
+
+    # --------------------
+    # Secondary indexes
+    # --------------------
+    # Hash lookups maintained alongside the row lists in _data. They are built once
+    # when the document is loaded and kept in sync by the row-level helpers below.
+    def _reindex(self):
+        self._last_id = 0  # id high-water mark, recovered while indexing
+        self._by_id = {'goals': {}, 'logs': {}, 'users': {}}
+        self._logs_by_goal = {}
+        self._goal_state = {}  # per-goal running aggregates, filled lazily
+        self._users_by_email = {}
+        self._users_by_token = {}
+        data = self.__data or {}
+        for coll, rows in data.items():
+            if isinstance(rows, list):
+                for row in rows:
+                    self._index_row(coll, row)
+
+    @staticmethod
+    def _token_key(token):
+        tok = str(token or '').strip().lower()
+        return tok or None
+
+    def _index_row(self, coll: str, row: dict):
+        ids = self._by_id.setdefault(coll, {})
+        ids.setdefault(row.get('id'), row)
+        if isinstance(row.get('id'), int) and row['id'] > self._last_id:
+            self._last_id = row['id']
+        if coll == 'logs':
+            self._logs_by_goal.setdefault(row.get('goal_id'), []).append(row)
+            state = self._goal_state.get(row.get('goal_id'))
+            if state is not None:
+                self._fold_log(state, row)
+        elif coll == 'users':
+            if row.get('email') is not None:
+                self._users_by_email.setdefault(row.get('email'), row)
+            tok = self._token_key(row.get('verification_token'))
+            if tok:
+                self._users_by_token.setdefault(tok, row)
+
+    def _unindex_row(self, coll: str, row: dict):
+        ids = self._by_id.get(coll, {})
+        if ids.get(row.get('id')) is row:
+            del ids[row.get('id')]
+        if coll == 'logs':
+            self._goal_state.pop(row.get('goal_id'), None)
+            siblings = self._logs_by_goal.get(row.get('goal_id'))
+            if siblings:
+                siblings[:] = [l for l in siblings if l is not row]
+                if not siblings:
+                    del self._logs_by_goal[row.get('goal_id')]
+        elif coll == 'users':
+            if self._users_by_email.get(row.get('email')) is row:
+                del self._users_by_email[row.get('email')]
+            tok = self._token_key(row.get('verification_token'))
+            if tok and self._users_by_token.get(tok) is row:
+                del self._users_by_token[tok]
+
+    # --------------------
+    # Per-goal aggregates
+    # --------------------
+    # Running state per goal, enough to derive the current value of any task type
+    # without replaying its logs: appends fold in O(1); edits and deletes drop the
+    # goal's state so it is rebuilt from that goal's logs on the next read.
+    @staticmethod
+    def _new_goal_state():
+        return {
+            'total': 0.0,         # increment goals: increments/updates minus decrements
+            'last_update': None,  # decrement goals: value of the last 'update' log ...
+            'delta': 0.0,         # ... plus increments minus decrements after it
+            'latest_ts': None,    # percentage goals: newest 'update' by timestamp
+            'latest_value': 0.0,
+        }
+
+    @staticmethod
+    def _fold_log(state: dict, l: dict):
+        action = l.get('action')
+        v = l.get('value', 1)
+        try:
+            value = float(v) if v is not None else 0.0
+        except Exception:
+            value = None
+        if value is not None:
+            if action in ['increment', 'update']:
+                state['total'] += value
+            elif action == 'decrement':
+                state['total'] -= value
+            if action == 'decrement':
+                state['delta'] -= value
+            elif action == 'increment':
+                state['delta'] += value
+            elif action == 'update':
+                state['last_update'] = value
+                state['delta'] = 0.0
+        if action == 'update':
+            ts = l.get('ts')
+            if state['latest_ts'] is None or (ts and ts > state['latest_ts']):
+                state['latest_ts'] = ts
+                try:
+                    state['latest_value'] = float(l.get('value', 0))
+                except Exception:
+                    pass
+
+    def _state_for(self, goal_id: int) -> dict:
+        state = self._goal_state.get(goal_id)
+        if state is None:
+            state = self._new_goal_state()
+            for l in self._logs_by_goal.get(goal_id, ()):
+                self._fold_log(state, l)
+            self._goal_state[goal_id] = state
+        return state
+
+    @property
+    def _data(self):
+        return self.__data
+
+    @_data.setter
+    def _data(self, value):
+        # Replacing the whole document (load, tests) rebuilds the lookup indexes
+        self.__data = value
+        self._reindex()
+
+    @property
+    def wal_path(self) -> Path:
+        return self.path.with_name(self.path.name + '.wal')
+
+    @property
+    def seq_path(self) -> Path:
+        return self._id_file or self.path.with_name(self.path.name + '.seq')
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_name(self.path.name + '.lock')
 
     def _load(self):
+        self._wal_records = 0
+        self._wal_offset = 0
+        self._pending = []
+        self._dirty = False
+        # Stat before reading so a concurrent write shows up as a change next time
+        seen = (_stat_key(self.path), _stat_key(self.wal_path) if self.journal else None)
         if not self.path.exists():
             self._data = {'goals': []}
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as fh:
+                    self._data = json.load(fh)
+            except Exception:
+                self._data = {'goals': []}
+        if self.journal:
+            self._replay_wal()
+        self._seen = seen
+
+    def _replay_wal(self, start: int = 0):
+        """Apply journal records written since the last checkpoint (from byte ``start``)."""
+        try:
+            with open(self.wal_path, 'rb') as fh:
+                fh.seek(start)
+                chunk = fh.read()
+        except OSError:
+            return
+        offset = start
+        for raw in chunk.splitlines(keepends=True):
+            if not raw.endswith(b'\n'):
+                # Torn tail (crash mid-append, or another process still writing);
+                # stop before it so a later replay picks it up once complete
+                break
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # fragment left by a crashed append
+            self._apply_record(rec)
+            self._wal_records += 1
+        self._wal_offset = offset
+
+    # --------------------
+    # Multi-process coherence
+    # --------------------
+    def _refresh(self):
+        """Merge in changes other processes wrote since we last looked.
+
+        Cheap when nothing changed (two stat calls). If only the WAL grew, just
+        the new records are applied; otherwise the snapshot is reloaded. Our own
+        committed-but-unwritten records are re-applied on top either way. Caller
+        holds self._lock.
+        """
+        if not self.shared or self._txn_depth:
             return
+        seen = (_stat_key(self.path), _stat_key(self.wal_path) if self.journal else None)
+        if seen == self._seen:
+            return
+        (snap, wal), (old_snap, old_wal) = seen, self._seen or (None, None)
+        if snap == old_snap and wal and old_wal and wal[2] == old_wal[2] and wal[1] >= self._wal_offset:
+            # Same snapshot, same WAL file that only grew: apply the new tail
+            self._replay_wal(start=self._wal_offset)
+            self._seen = seen
+            return
+        pending = self._pending
+        self._load()
+        for rec in pending:
+            self._apply_record(rec)
+        self._pending = pending
+        self._dirty = bool(pending)
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive cross-process lock for writers (no-op unless shared)."""
+        if not self.shared:
+            yield
+            return
+        with _locked_file(self.lock_path):
+            yield
+
+    def _save(self) -> bool:
+        """Write the full snapshot atomically (temp file + fsync + rename).
+
+        A crash mid-write leaves the previous snapshot intact instead of a
+        truncated file.
+        """
+        with self._lock:
+            payload = json.dumps(self._data, indent=2, ensure_ascii=False)
+        tmp = None
         try:
-            with open(self.path, 'r', encoding='utf-8') as fh:
-                self._data = json.load(fh)
-        except Exception:
-            self._data = {'goals': []}
+            fd, tmp = tempfile.mkstemp(prefix='.' + self.path.name + '.', suffix='.tmp', dir=str(self.path.parent))
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                fh.write(payload)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path.parent)
+            self._seen = (_stat_key(self.path), _stat_key(self.wal_path) if self.journal else None)
+            return True
+        except Exception as e:
+            print(f"[storage] snapshot write to {self.path} failed: {e}")
+            if tmp:
+                try:
+                    os.unlink(tmp)
+                except Exception:
+                    pass
+            return False
+
+    # --------------------
+    # Row-level mutations
+    # --------------------
+    # Every change to _data goes through these helpers. Each returns a journal
+    # record describing the change; records are idempotent so replaying a WAL
+    # over a snapshot that already contains some of them is harmless.
+    def _find_row(self, coll: str, row_id):
+        return self._by_id.get(coll, {}).get(row_id)
+
+    def _append_row(self, coll: str, row: dict) -> dict:
+        self._data.setdefault(coll, []).append(row)
+        self._index_row(coll, row)
+        if self._txn_depth:
+            self._txn_undo.append(('pop', coll, row))
+        return {'op': 'append', 'coll': coll, 'row': row}
+
+    def _update_row(self, coll: str, row: dict, fields: dict) -> dict:
+        # Only re-key when an indexed field changes, so a log keeps its position
+        # among its goal's logs
+        if coll == 'users':
+            rekey = 'email' in fields or 'verification_token' in fields
+        else:
+            rekey = coll == 'logs' and 'goal_id' in fields
+        if self._txn_depth:
+            self._txn_undo.append(('fields', coll, row, {k: row.get(k, _MISSING) for k in fields}))
+        if rekey:
+            self._unindex_row(coll, row)
+        row.update(fields)
+        if rekey:
+            self._index_row(coll, row)
+        if coll == 'logs':
+            self._goal_state.pop(row.get('goal_id'), None)
+        return {'op': 'set', 'coll': coll, 'id': row.get('id'), 'fields': dict(fields)}
+
+    def _delete_rows(self, coll: str, ids) -> dict:
+        ids = set(ids)
+        index = self._by_id.get(coll, {})
+        doomed = [index[i] for i in ids if i in index]
+        for row in doomed:
+            self._unindex_row(coll, row)
+        rows = self._data.get(coll)
+        if rows and doomed:
+            if self._txn_depth:
+                self._txn_undo.append(('insert', coll, [(i, r) for i, r in enumerate(rows) if r.get('id') in ids]))
+            rows[:] = [r for r in rows if r.get('id') not in ids]
+        return {'op': 'delete', 'coll': coll, 'ids': sorted(ids, key=str)}
+
+    def _apply_record(self, rec: dict):
+        """Re-apply a journal record (used by WAL replay)."""
+        op = rec.get('op')
+        coll = rec.get('coll')
+        if op == 'append':
+            row = rec.get('row') or {}
+            existing = self._find_row(coll, row.get('id'))
+            if existing is not None:
+                existing.clear()
+                existing.update(row)
+            else:
+                self._append_row(coll, row)
+        elif op == 'set':
+            row = self._find_row(coll, rec.get('id'))
+            if row is not None:
+                self._update_row(coll, row, rec.get('fields') or {})
+        elif op == 'delete':
+            self._delete_rows(coll, rec.get('ids') or [])
+
+    # --------------------
+    # Transactions
+    # --------------------
+    @contextmanager
+    def transaction(self):
+        """Group several changes so they are persisted once, all or nothing.
 
-    def _save(self):
+        Saves requested inside the block are deferred and written together when the
+        outermost block exits (one snapshot write, or one WAL append in journal
+        mode). If the block raises, every in-memory change made inside it is undone
+        and nothing is written. Nested blocks join the outer transaction. The block
+        holds the storage lock, so other threads' writes are not mixed in.
+
+            with storage.transaction():
+                storage.add_log(gid, 'increment', 1)
+                storage.mark_goal_completed(gid)
+        """
+        with self._lock:
+            outermost = self._txn_depth == 0
+            if outermost:
+                self._refresh()
+                self._txn_records = []
+                self._txn_undo = []
+            self._txn_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if outermost:
+                    self._rollback()
+                raise
+            finally:
+                self._txn_depth -= 1
+                if outermost:
+                    records, self._txn_records, self._txn_undo = self._txn_records, [], []
+            if outermost and records:
+                self._commit(*records)
+
+    def _rollback(self):
+        """Undo the in-memory changes of the current transaction."""
+        for entry in reversed(self._txn_undo):
+            kind, coll = entry[0], entry[1]
+            rows = self._data.setdefault(coll, [])
+            if kind == 'pop':
+                rows[:] = [r for r in rows if r is not entry[2]]
+            elif kind == 'fields':
+                row, old = entry[2], entry[3]
+                for k, v in old.items():
+                    if v is _MISSING:
+                        row.pop(k, None)
+                    else:
+                        row[k] = v
+            elif kind == 'insert':
+                for i, r in entry[2]:
+                    rows.insert(i, r)
+        # Rare path: rebuild indexes and aggregates rather than unwinding them piecemeal
+        self._reindex()
+
+    def _commit(self, *records):
+        """Persist the given change records (WAL append in journal mode, else full snapshot).
+
+        Inside a transaction the records are buffered until it ends; with a
+        background flusher they are only queued.
+        """
+        if self._txn_depth:
+            self._txn_records.extend(records)
+            return
+        with self._lock:
+            self._pending.extend(records)
+            self._dirty = True
+            if self._flusher is not None:
+                self._wake.set()
+                return
+            self._flush_pending()
+
+    def _flush_pending(self) -> bool:
+        with self._lock:
+            if not self._dirty:
+                return True
+        with self._write_lock():
+            with self._lock:
+                # Fold in other processes' writes first so the snapshot we write keeps them
+                self._refresh()
+                records, self._pending, self._dirty = self._pending, [], False
+            ok = self._write_records(records) if self.journal else self._save()
+            if not ok:
+                # Keep the changes queued so the next flush retries them
+                with self._lock:
+                    self._pending[:0] = records
+                    self._dirty = True
+            return ok
+
+    def _write_records(self, records) -> bool:
         try:
-            with open(self.path, 'w', encoding='utf-8') as fh:
-                json.dump(self._data, fh, indent=2, ensure_ascii=False)
+            payload = ''.join(json.dumps(r, separators=(',', ':'), ensure_ascii=False) + '\n' for r in records)
+            with open(self.wal_path, 'a+b') as fh:
+                end = fh.seek(0, os.SEEK_END)
+                if end:
+                    fh.seek(end - 1)
+                    if fh.read(1) != b'\n':
+                        # Keep a torn fragment from a crashed append on a line of its own
+                        payload = '\n' + payload
+                fh.write(payload.encode('utf-8'))
+                fh.flush()
+                os.fsync(fh.fileno())
+                self._wal_offset = fh.tell()
+            self._wal_records += len(records)
+            self._seen = (self._seen[0] if self._seen else _stat_key(self.path), _stat_key(self.wal_path))
         except Exception:
-            pass
+            # Could not journal: fall back to a full snapshot so the change is not lost
+            return self._checkpoint()
+        if self._wal_records >= self.checkpoint_every:
+            self._checkpoint()
+        return True
+
+    def _flush_guard(self):
+        # Lock order: in sync mode request threads hold _lock while taking the file
+        # lock, so flush must too; the background flusher takes _flush_lock instead
+        # and only grabs _lock briefly.
+        return self._lock if self._flusher is None else self._flush_lock
 
+    def flush(self) -> bool:
+        """Durability barrier: return once every committed change is on disk."""
+        with self._flush_guard():
+            return self._flush_pending()
+
+    def _start_flusher(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flusher_loop, name='yearplan-flusher', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _flusher_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            # Let writes that arrive within the interval share one flush
+            if self._stop.wait(self.flush_interval):
+                break
+            self.flush()
+
+    def close(self):
+        """Stop the background flusher (if any) and write out pending changes."""
+        if self._flusher is not None:
+            self._stop.set()
+            self._wake.set()
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        self.flush()
+
+    def checkpoint(self) -> bool:
+        """Fold the WAL into the snapshot and truncate it."""
+        with self._flush_guard():
+            if not self._flush_pending():
+                return False
+            with self._write_lock():
+                with self._lock:
+                    self._refresh()
+                return self._checkpoint()
+
+    def _checkpoint(self) -> bool:
+        # Caller holds the write lock (when shared)
+        if not self._save():
+            return False
+        if self.journal:
+            try:
+                if self.wal_path.exists():
+                    self.wal_path.unlink()
+            except Exception:
+                pass
+            self._wal_records = 0
+            self._wal_offset = 0
+            self._seen = (self._seen[0] if self._seen else None, None)
+        return True
+
+    @_atomic
     def add_goal(self, text: str, user_id: int = None):
         # kept for backward-compat: simple add_goal(text)
         gid = self._next_id('goal')
-        self._data['goals'].append({'id': gid, 'text': text, 'created_at': None, 'user_id': user_id})
-        self._save()
+        self._commit(self._append_row('goals', {'id': gid, 'text': text, 'created_at': None, 'user_id': user_id}))
         return gid
 
+    @_atomic
     def add_goal_with_meta(self, text: str, start_date: Optional[str] = None, end_date: Optional[str] = None, target: Optional[float] = None, task_type: str = 'increment', user_id: int = None, start_value: Optional[float] = None):
         """Add a goal with optional scheduling/target metadata.
 
@@ -53,10 +785,10 @@ class YearPlanStorage:
             'current_value': target if task_type == 'decrement' else 0,  # Start at target for decrement, 0 for others
             'user_id': user_id
         }
-        self._data['goals'].append(entry)
-        self._save()
+        self._commit(self._append_row('goals', entry))
         return gid
 
+    @_fresh
     def list_goals(self, user_id: int = None):
         goals = self._data.get('goals', [])
         if user_id is not None:
@@ -64,243 +796,137 @@ class YearPlanStorage:
         return list(goals)
 
     def _next_id(self, prefix='id'):
-        # create a simple incrementing id
-        max_id = 0
-        for g in self._data.get('goals', []):
-            if isinstance(g.get('id'), int) and g['id'] > max_id:
-                max_id = g['id']
-        for l in self._data.get('logs', []):
-            if isinstance(l.get('id'), int) and l['id'] > max_id:
-                max_id = l['id']
-        for u in self._data.get('users', []):
-            if isinstance(u.get('id'), int) and u['id'] > max_id:
-                max_id = u['id']
-        return max_id + 1
+        """Allocate the next id (shared by goals, logs and users) in O(1).
 
+        The high-water mark is persisted in ``<path>.seq`` and advanced under an
+        exclusive file lock, so processes sharing the same file never hand out the
+        same id. Ids are never reused, even after the newest row is deleted.
+        """
+        try:
+            with _locked_file(self.seq_path) as fh:
+                raw = fh.read().strip()
+                stored = int(raw) if raw else 0
+                new_id = max(stored, self._last_id) + 1
+                fh.seek(0)
+                fh.truncate()
+                fh.write(str(new_id))
+                fh.flush()
+        except Exception:
+            # Sidecar not writable: fall back to the in-memory mark
+            new_id = self._last_id + 1
+        self._last_id = new_id
+        return new_id
+
+    @_fresh
     def get_goal(self, goal_id: int, user_id: int = None):
-        for g in self._data.get('goals', []):
-            if g.get('id') == goal_id:
-                if user_id is not None and g.get('user_id') != user_id:
-                    return None  # User doesn't own this goal
-                return g
-        return None
+        g = self._find_row('goals', goal_id)
+        if g is None:
+            return None
+        if user_id is not None and g.get('user_id') != user_id:
+            return None  # User doesn't own this goal
+        return g
 
     def _calculate_current_value(self, goal_id: int) -> float:
         """Calculate current value based on goal type and logs"""
         goal = self.get_goal(goal_id)
         if not goal:
             return 0.0
-            
-        task_type = goal.get('task_type', 'increment')
-        target = goal.get('target', 0)
-        
-        if task_type == 'increment':
-            # Sum all increments and subtract decrements (for rollbacks)
-            total = 0.0
-            for l in self._data.get('logs', []):
-                if l.get('goal_id') == goal_id:
-                    action = l.get('action')
-                    v = l.get('value', 1)
-                    try:
-                        value = float(v) if v is not None else 0.0
-                        if action in ['increment', 'update']:
-                            total += value
-                        elif action == 'decrement':  # This handles rollbacks of increments
-                            total -= value
-                    except Exception:
-                        continue
-            return max(0, total)  # Don't go below 0
-            
-        elif task_type == 'decrement':
-            # Start at baseline (start_value if provided, else target), subtract decrements, add increments
-            try:
-                baseline = float(goal.get('start_value')) if goal.get('start_value') is not None else float(target or 0)
-            except Exception:
-                baseline = float(target or 0)
-            current = baseline
-            for l in self._data.get('logs', []):
-                if l.get('goal_id') == goal_id:
-                    action = l.get('action')
-                    v = l.get('value', 1)
-                    try:
-                        value = float(v) if v is not None else 0.0
-                        if action == 'decrement':
-                            current -= value
-                        elif action == 'increment':
-                            current += value
-                        elif action == 'update':
-                            current = value
-                    except Exception:
-                        continue
-            return max(0, current)  # Don't go below 0
-            
-        elif task_type == 'percentage':
-            # For percentage tasks, find the most recent update value
-            latest_value = 0.0
-            latest_ts = None
-            
-            for l in self._data.get('logs', []):
-                if l.get('goal_id') == goal_id and l.get('action') == 'update':
-                    ts = l.get('ts')
-                    if latest_ts is None or (ts and ts > latest_ts):
-                        latest_ts = ts
-                        try:
-                            latest_value = float(l.get('value', 0))
-                        except Exception:
-                            pass
-            
-            return min(100, max(0, latest_value))  # Clamp between 0-100
-        
-        return 0.0
+        return current_value_from_state(goal, self._state_for(goal_id))
 
+    @_fresh
     def goal_progress_status(self, goal_id: int, today: Optional[date] = None):
         """Calculate goal progress and status"""
         goal = self.get_goal(goal_id)
         if not goal:
             return None
+        return compute_progress_status(goal, self._calculate_current_value(goal_id), today)
 
-        current_value = self._calculate_current_value(goal_id)
-        task_type = goal.get('task_type', 'increment')
-        target = goal.get('target')
-        start_date = goal.get('start_date')
-        end_date = goal.get('end_date')
-        # Start baseline:
-        # 1) If goal has explicit start_value, use it
-        # 2) Else for decrement use target (typical baseline), else 0
-        try:
-            if 'start_value' in goal and goal.get('start_value') is not None:
-                start_baseline = float(goal.get('start_value'))
-            elif task_type == 'decrement':
-                start_baseline = float(target or 0)
-            else:
-                start_baseline = 0.0
-        except Exception:
-            start_baseline = 0.0
-
-        # Clamp current within [min(start, target), max(start, target)] for non-percentage goals
-        clamped_current = current_value
-        try:
-            if task_type != 'percentage' and target is not None:
-                t = float(target)
-                s = float(start_baseline)
-                lo = min(s, t)
-                hi = max(s, t)
-                clamped_current = max(lo, min(hi, float(current_value)))
-        except Exception:
-            pass
+    @_fresh
+    def current_values_many(self, goal_ids) -> dict:
+        """{goal_id: current value} for several goals (0.0 for missing ones)."""
+        out = {}
+        with self._lock:
+            for gid in goal_ids:
+                goal = self._find_row('goals', gid)
+                out[gid] = current_value_from_state(goal, self._state_for(gid)) if goal is not None else 0.0
+        return out
 
-        # Calculate progress percentage using absolute goal distance = |target - start|
-        progress_pct = 0.0
-        if task_type == 'percentage':
-            progress_pct = current_value
-        else:
-            try:
-                if target is not None:
-                    total_distance = abs(float(target) - float(start_baseline))
-                    if total_distance > 0:
-                        # distance achieved relative to baseline (symmetric)
-                        achieved = abs(float(clamped_current) - float(start_baseline))
-                        progress_pct = max(0.0, min(100.0, (achieved / total_distance) * 100.0))
-                    else:
-                        progress_pct = 100.0 if float(clamped_current) == float(target) else 0.0
-                else:
-                    progress_pct = 0.0
-            except Exception:
-                progress_pct = 0.0
+    @_fresh
+    def progress_status_many(self, goal_ids, today: Optional[date] = None) -> dict:
+        """Progress/status for several goals at once: {goal_id: status, or None if missing}.
 
-        # Calculate expected progress based on dates (inclusive day counting)
-        expected = None
-        in_track = True
-        if start_date and end_date:
-            try:
-                start = datetime.fromisoformat(start_date).date()
-                end = datetime.fromisoformat(end_date).date()
-                # allow injected 'today' for testing, else use current date
-                today_dt = today or date.today()
-
-                total_days_inclusive = (end - start).days + 1
-                if total_days_inclusive <= 0:
-                    total_days_inclusive = 1
-
-                if today_dt < start:
-                    time_progress = 0.0
-                elif today_dt > end:
-                    time_progress = 1.0
-                else:
-                    elapsed_inclusive = (today_dt - start).days + 1
-                    if elapsed_inclusive < 0:
-                        elapsed_inclusive = 0
-                    if elapsed_inclusive > total_days_inclusive:
-                        elapsed_inclusive = total_days_inclusive
-                    time_progress = elapsed_inclusive / total_days_inclusive
-
-                if task_type == 'percentage':
-                    expected = 100 * time_progress
+        Uses the per-goal log aggregates, so a whole dashboard costs one pass over
+        the requested goals' logs at most, instead of a lookup and sweep per goal.
+        """
+        today = today or date.today()
+        out = {}
+        with self._lock:
+            for gid in goal_ids:
+                goal = self._find_row('goals', gid)
+                if goal is None:
+                    out[gid] = None
                 else:
-                    # expected value along the path from start_baseline to target
-                    try:
-                        t = float(target or 0.0)
-                        s = float(start_baseline)
-                        expected = s + (t - s) * time_progress
-                    except Exception:
-                        expected = (target or 0)
-
-                # Determine if in track (only when expected non-zero)
-                try:
-                    if expected not in (None, 0):
-                        # Compare achieved distance vs expected distance from baseline
-                        try:
-                            s = float(start_baseline)
-                            exp_dist = abs(float(expected) - s)
-                            cur_dist = abs(float(clamped_current) - s)
-                            ratio = (cur_dist / exp_dist) if exp_dist not in (None, 0) else 1.0
-                        except Exception:
-                            ratio = 1.0
-                        in_track = 0.7 <= ratio <= 1.3
-                except Exception:
-                    pass
-            except Exception:
-                pass
-
-        return {
-            'progress': clamped_current,
-            'percent': min(100, max(0, progress_pct)),
-            'target': target,
-            'start': start_baseline,
-            'expected': expected,
-            'in_track': in_track,
-            'task_type': task_type
-        }
+                    out[gid] = compute_progress_status(goal, current_value_from_state(goal, self._state_for(gid)), today)
+        return out
 
+    @_atomic
     def add_log(self, goal_id: int, action: str, value=None, ts=None):
         lid = self._next_id('log')
         entry = {'id': lid, 'goal_id': goal_id, 'action': action, 'value': value, 'ts': ts}
-        self._data.setdefault('logs', []).append(entry)
-        self._save()
+        self._commit(self._append_row('logs', entry))
         return entry
 
+    @_fresh
     def list_logs(self):
         return list(self._data.get('logs', []))
 
+    @staticmethod
+    def log_key(log) -> tuple:
+        """(ts, id) of a log, the keyset-pagination order; logs without ts sort oldest."""
+        return (str(log.get('ts') or ''), log.get('id') or 0)
+
+    @_fresh
+    def page_logs(self, goal_id: int = None, user_id: int = None, before=None, limit: int = None):
+        """Logs newest first by (ts, id), strictly after the ``before`` key, at most ``limit``.
+
+        goal_id / user_id narrow the listing to one goal / the user's goals
+        (None: all logs). Rows carry ``timestamp`` like get_logs_for_goal().
+        """
+        with self._lock:
+            if goal_id is not None:
+                source = list(self._logs_by_goal.get(goal_id, ()))
+            elif user_id is not None:
+                source = [l for g in self.list_goals(user_id) for l in self._logs_by_goal.get(g.get('id'), ())]
+            else:
+                source = list(self._data.get('logs', []))
+        if before is not None:
+            bound = (str(before[0] or ''), before[1])
+            source = [l for l in source if self.log_key(l) < bound]
+        if limit:
+            rows = heapq.nlargest(limit, source, key=self.log_key)
+        else:
+            rows = sorted(source, key=self.log_key, reverse=True)
+        return [dict(l, timestamp=l.get('ts') or '') for l in rows]
+
+    @_atomic
     def mark_goal_completed(self, goal_id: int, user_id: int = None):
         """Mark a goal as completed and set completed_at timestamp."""
-        for g in self._data.get('goals', []):
-            if g.get('id') == goal_id:
-                if user_id is not None and g.get('user_id') != user_id:
-                    return False
-                g['is_completed'] = True
-                try:
-                    g['completed_value'] = float(self._calculate_current_value(goal_id))
-                except Exception:
-                    g['completed_value'] = g.get('target')
-                try:
-                    g['completed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                except Exception:
-                    g['completed_at'] = date.today().isoformat()
-                self._save()
-                return True
-        return False
+        g = self.get_goal(goal_id, user_id)
+        if g is None:
+            return False
+        fields = {'is_completed': True}
+        try:
+            fields['completed_value'] = float(self._calculate_current_value(goal_id))
+        except Exception:
+            fields['completed_value'] = g.get('target')
+        try:
+            fields['completed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        except Exception:
+            fields['completed_at'] = date.today().isoformat()
+        self._commit(self._update_row('goals', g, fields))
+        return True
 
+    @_fresh
     def get_logs_for_goal(self, goal_id: int):
         """Get all logs for a specific goal, with timestamp field added."""
         # First check if the goal exists
@@ -310,92 +936,79 @@ class YearPlanStorage:
         
         # Filter logs by goal_id and add timestamp field
         logs = []
-        for log in self._data.get('logs', []):
-            if log.get('goal_id') == goal_id:
-                # Create a copy and add timestamp field
-                log_copy = log.copy()
-                log_copy['timestamp'] = log.get('ts', '')  # Use 'ts' field as 'timestamp'
-                logs.append(log_copy)
+        for log in self._logs_by_goal.get(goal_id, ()):
+            # Create a copy and add timestamp field
+            log_copy = log.copy()
+            log_copy['timestamp'] = log.get('ts', '')  # Use 'ts' field as 'timestamp'
+            logs.append(log_copy)
         
         return logs
 
+    @_atomic
     def edit_log(self, log_id: int, **fields):
         """Edit a log entry by id. Fields can include action, value, ts."""
-        for l in self._data.setdefault('logs', []):
-            if l.get('id') == log_id:
-                for k, v in fields.items():
-                    if k in ('action', 'value', 'ts'):
-                        l[k] = v
-                self._save()
-                return l
-        return None
+        l = self._find_row('logs', log_id)
+        if l is None:
+            return None
+        allowed = {k: v for k, v in fields.items() if k in ('action', 'value', 'ts')}
+        self._commit(self._update_row('logs', l, allowed))
+        return l
 
+    @_atomic
     def delete_log(self, log_id: int) -> bool:
-        logs = self._data.setdefault('logs', [])
-        for i, l in enumerate(logs):
-            if l.get('id') == log_id:
-                del logs[i]
-                self._save()
-                return True
-        return False
+        if self._find_row('logs', log_id) is None:
+            return False
+        self._commit(self._delete_rows('logs', [log_id]))
+        return True
 
+    @_atomic
     def delete_goal(self, goal_id: int, user_id: int = None) -> bool:
-        goals = self._data.get('goals', [])
-        for i, g in enumerate(goals):
-            if g.get('id') == goal_id:
-                if user_id is not None and g.get('user_id') != user_id:
-                    return False  # User doesn't own this goal
-                del goals[i]
-                self._save()
-                return True
-        return False
+        if self.get_goal(goal_id, user_id) is None:
+            return False  # Missing, or user doesn't own this goal
+        self._commit(self._delete_rows('goals', [goal_id]))
+        return True
 
+    @_atomic
     def set_goal_field(self, goal_id: int, field: str, value, user_id: int = None) -> bool:
         """Set an arbitrary field on a goal with optional user ownership check."""
         try:
-            for g in self._data.get('goals', []):
-                if g.get('id') == goal_id:
-                    if user_id is not None and g.get('user_id') != user_id:
-                        return False
-                    g[field] = value
-                    self._save()
-                    return True
+            g = self.get_goal(goal_id, user_id)
+            if g is None:
+                return False
+            self._commit(self._update_row('goals', g, {field: value}))
+            return True
         except Exception:
             return False
-        return False
 
+    @_atomic
     def update_goal_name(self, goal_id: int, new_text: str, user_id: int = None) -> bool:
         """Update the display text/name of a goal."""
         if not new_text:
             return False
-        for g in self._data.get('goals', []):
-            if g.get('id') == goal_id:
-                if user_id is not None and g.get('user_id') != user_id:
-                    return False
-                g['text'] = str(new_text)
-                self._save()
-                return True
-        return False
+        g = self.get_goal(goal_id, user_id)
+        if g is None:
+            return False
+        self._commit(self._update_row('goals', g, {'text': str(new_text)}))
+        return True
 
+    @_atomic
     def update_goal_target(self, goal_id: int, new_target, user_id: int = None) -> bool:
         """Update the target value for a goal. Does not modify logs or current value."""
         try:
-            goals = self._data.get('goals', [])
-            for g in goals:
-                if g.get('id') == goal_id:
-                    if user_id is not None and g.get('user_id') != user_id:
-                        return False
-                    # Coerce numeric target or set None
-                    if new_target is None or new_target == "":
-                        g['target'] = None
-                    else:
-                        g['target'] = float(new_target)
-                    self._save()
-                    return True
+            g = self.get_goal(goal_id, user_id)
+            if g is None:
+                return False
+            # Coerce numeric target or set None
+            if new_target is None or new_target == "":
+                target = None
+            else:
+                target = float(new_target)
+            self._commit(self._update_row('goals', g, {'target': target}))
+            return True
         except Exception:
             return False
-        return False
 
+    @_atomic
     def update_goal_value(self, goal_id: int, action: str, value: float = 1, ts: str = None, user_id: int = None):
         """Update goal value based on task type.
         
@@ -432,7 +1045,7 @@ class YearPlanStorage:
             'ts': ts or date.today().isoformat()
         }
         # Append log first so current reflects this update
-        self._data.setdefault('logs', []).append(entry)
+        records = [self._append_row('logs', entry)]
 
         # Auto-adjust target based on new current value and task type
         try:
@@ -442,32 +1055,29 @@ class YearPlanStorage:
                 if task_type == 'decrement':
                     # If we've gone below the target, move target down to current
                     if float(new_current) < float(tgt):
-                        goal['target'] = float(new_current)
+                        records.append(self._update_row('goals', goal, {'target': float(new_current)}))
                 elif task_type == 'increment':
                     # If we've exceeded the target, move target up to current
                     if float(new_current) > float(tgt):
-                        goal['target'] = float(new_current)
-            # Mark completed if percent >= 100
+                        records.append(self._update_row('goals', goal, {'target': float(new_current)}))
+        except Exception:
+            pass
+        self._commit(*records)
+
+        # Mark completed if percent >= 100
+        try:
             status = self.goal_progress_status(goal_id)
             if status and status.get('percent', 0) >= 100:
                 self.mark_goal_completed(goal_id, user_id)
         except Exception:
             pass
-
-        self._save()
         return entry
 
+    @_atomic
     def rollback_log(self, log_id: int):
         """Delete the specified log entry and all subsequent entries for the same goal"""
         # Find the log to rollback
-        original_log = None
-        logs = self._data.get('logs', [])
-        
-        for log in logs:
-            if log.get('id') == log_id:
-                original_log = log
-                break
-        
+        original_log = self._find_row('logs', log_id)
         if not original_log:
             return None
         
@@ -478,18 +1088,11 @@ class YearPlanStorage:
 
         # Simply delete the original log entry - no reverse operations needed
         logs_to_delete_ids = [log.get('id') for log in logs_to_rollback]
-        deleted_count = 0
-        
+
         # Remove the original logs
-        logs = self._data.get('logs', [])
-        for log_id_to_delete in logs_to_delete_ids:
-            for i, log in enumerate(logs):
-                if log.get('id') == log_id_to_delete:
-                    del logs[i]
-                    deleted_count += 1
-                    break
-        
-        self._save()
+        before = len(self._data.get('logs', []))
+        self._commit(self._delete_rows('logs', logs_to_delete_ids))
+        deleted_count = before - len(self._data.get('logs', []))
         
         # Return info about what was done
         return {
@@ -499,6 +1102,7 @@ class YearPlanStorage:
         }
 
     # User management methods
+    @_atomic
     def create_user(self, name: str, email: str, password_hash: str):
         """Create a new user account"""
         user_id = self._next_id('user')
@@ -513,80 +1117,70 @@ class YearPlanStorage:
             'last_reminder_sent': None
         }
         
-        self._data.setdefault('users', []).append(user)
-        self._save()
+        self._commit(self._append_row('users', user))
         return user
 
+    @_fresh
     def get_user_by_email(self, email: str):
         """Get user by email address"""
-        for user in self._data.get('users', []):
-            if user.get('email') == email:
-                return user
-        return None
+        return self._users_by_email.get(email)
 
+    @_fresh
     def get_user_by_id(self, user_id: int):
         """Get user by ID"""
-        for user in self._data.get('users', []):
-            if user.get('id') == user_id:
-                return user
-        return None
+        return self._find_row('users', user_id)
 
+    @_fresh
     def user_owns_log(self, log_id: int, user_id: int) -> bool:
         """Check if user owns the goal that this log belongs to"""
-        # Find the log
-        for log in self._data.get('logs', []):
-            if log.get('id') == log_id:
-                goal_id = log.get('goal_id')
-                if goal_id:
-                    goal = self.get_goal(goal_id, user_id)
-                    return goal is not None
-                return False
+        log = self._find_row('logs', log_id)
+        if log is None:
+            return False
+        goal_id = log.get('goal_id')
+        if goal_id:
+            goal = self.get_goal(goal_id, user_id)
+            return goal is not None
         return False
 
+    @_atomic
     def update_user_password(self, user_id: int, new_password_hash: str) -> bool:
         """Update user password"""
-        users = self._data.get('users', [])
-        for user in users:
-            if user.get('id') == user_id:
-                user['password_hash'] = new_password_hash
-                self._save()
-                return True
-        return False
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return False
+        self._commit(self._update_row('users', user, {'password_hash': new_password_hash}))
+        return True
 
+    @_atomic
     def update_user_email(self, user_id: int, new_email: str) -> bool:
         """Update user email"""
-        users = self._data.get('users', [])
-        for user in users:
-            if user.get('id') == user_id:
-                user['email'] = new_email
-                self._save()
-                return True
-        return False
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return False
+        self._commit(self._update_row('users', user, {'email': new_email}))
+        return True
 
+    @_atomic
     def delete_user(self, user_id: int) -> bool:
         """Delete user and all associated data"""
         try:
-            # Remove all user's goals
+            # Goal IDs that belonged to this user
             goals = self._data.get('goals', [])
-            self._data['goals'] = [g for g in goals if g.get('user_id') != user_id]
-            
-            # Remove all logs associated with user's goals
-            # First get list of goal IDs that belonged to this user
-            user_goal_ids = [g.get('id') for g in goals if g.get('user_id') == user_id]
-            
-            # Remove logs for those goals
-            logs = self._data.get('logs', [])
-            self._data['logs'] = [l for l in logs if l.get('goal_id') not in user_goal_ids]
-            
-            # Remove the user
-            users = self._data.get('users', [])
-            self._data['users'] = [u for u in users if u.get('id') != user_id]
-            
-            self._save()
+            user_goal_ids = set(g.get('id') for g in goals if g.get('user_id') == user_id)
+
+            # Logs for those goals
+            user_log_ids = [l.get('id') for gid in user_goal_ids for l in self._logs_by_goal.get(gid, ())]
+
+            self._commit(
+                self._delete_rows('logs', user_log_ids),
+                self._delete_rows('goals', user_goal_ids),
+                self._delete_rows('users', [user_id]),
+            )
             return True
         except Exception:
             return False
 
+    @_atomic
     def create_unverified_user(self, name: str, email: str, password_hash: str, verification_token: str):
         """Create a new unverified user account"""
         user_id = self._next_id('user')
@@ -604,10 +1198,10 @@ class YearPlanStorage:
             'last_reminder_sent': None
         }
         
-        self._data.setdefault('users', []).append(user)
-        self._save()
+        self._commit(self._append_row('users', user))
         return user
 
+    @_atomic
     def verify_user_email(self, token: str) -> bool:
         """Verify user email with token (robust parsing and comparison)."""
         try:
@@ -615,85 +1209,94 @@ class YearPlanStorage:
             if not tok:
                 return False
             # Normalize to lowercase for UUID string comparison
-            tok_norm = tok.lower()
-            users = self._data.get('users', []) or []
-            for user in users:
-                if user.get('is_verified', False):
-                    continue
-                u_tok = user.get('verification_token')
-                if u_tok is None:
-                    continue
-                u_tok_norm = str(u_tok).strip().lower()
-                if u_tok_norm != tok_norm:
-                    continue
-
-                # Check expiry if present (tolerate bad format)
-                token_expires = user.get('token_expires')
-                if token_expires:
-                    try:
-                        expires_dt = datetime.strptime(token_expires, '%Y-%m-%d %H:%M:%S')
-                        if datetime.now() > expires_dt:
-                            return False  # Token expired
-                    except Exception:
-                        # If unparsable, proceed as not expired to avoid false negatives
-                        pass
-
-                # Mark verified and clear token fields
-                user['is_verified'] = True
-                user['verification_token'] = None
-                user['token_expires'] = None
-                self._save()
-                return True
+            user = self._users_by_token.get(self._token_key(tok))
+            if user is None or user.get('is_verified', False):
+                return False
+
+            # Check expiry if present (tolerate bad format)
+            token_expires = user.get('token_expires')
+            if token_expires:
+                try:
+                    expires_dt = datetime.strptime(token_expires, '%Y-%m-%d %H:%M:%S')
+                    if datetime.now() > expires_dt:
+                        return False  # Token expired
+                except Exception:
+                    # If unparsable, proceed as not expired to avoid false negatives
+                    pass
+
+            # Mark verified and clear token fields
+            self._commit(self._update_row('users', user, {
+                'is_verified': True,
+                'verification_token': None,
+                'token_expires': None,
+            }))
+            return True
         except Exception:
             return False
-        return False
 
+    @_atomic
+    def update_verification_token(self, email: str, token: str, token_expires: str) -> bool:
+        """Set/refresh the user's verification token and expiry."""
+        user = self.get_user_by_email(email)
+        if not user:
+            return False
+        self._commit(self._update_row('users', user, {
+            'verification_token': token,
+            'token_expires': token_expires,
+        }))
+        return True
+
+    @_fresh
     def get_user_by_token(self, token: str):
         """Get user by verification token (case/whitespace-insensitive)."""
-        tok = str(token or '').strip().lower()
+        tok = self._token_key(token)
         if not tok:
             return None
-        for user in self._data.get('users', []) or []:
-            u_tok = user.get('verification_token')
-            if u_tok is None:
-                continue
-            if str(u_tok).strip().lower() == tok:
-                return user
-        return None
+        return self._users_by_token.get(tok)
 
+    @_atomic
     def update_user_reminder_preferences(self, user_id: int, frequency: str, enabled: bool = True):
         """Update user's reminder preferences"""
-        for user in self._data.get('users', []):
-            if user.get('id') == user_id:
-                user['reminder_frequency'] = frequency
-                user['reminder_enabled'] = enabled
-                self._save()
-                return True
-        return False
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return False
+        self._commit(self._update_row('users', user, {
+            'reminder_frequency': frequency,
+            'reminder_enabled': enabled,
+        }))
+        return True
 
+    @_fresh
     def get_user_reminder_preferences(self, user_id: int):
         """Get user's reminder preferences"""
-        for user in self._data.get('users', []):
-            if user.get('id') == user_id:
-                return {
-                    'frequency': user.get('reminder_frequency', 'weekly'),
-                    'enabled': user.get('reminder_enabled', True),
-                    'last_sent': user.get('last_reminder_sent')
-                }
-        return None
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return None
+        return {
+            'frequency': user.get('reminder_frequency', 'weekly'),
+            'enabled': user.get('reminder_enabled', True),
+            'last_sent': user.get('last_reminder_sent')
+        }
 
+    @_atomic
     def update_last_reminder_sent(self, user_id: int, timestamp: str = None):
         """Update when the last reminder was sent to user"""
         if timestamp is None:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        for user in self._data.get('users', []):
-            if user.get('id') == user_id:
-                user['last_reminder_sent'] = timestamp
-                self._save()
-                return True
-        return False
 
+        user = self.get_user_by_id(user_id)
+        if user is None:
+            return False
+        self._commit(self._update_row('users', user, {'last_reminder_sent': timestamp}))
+        return True
+
+    @_fresh
+    def get_reminder_schedule(self):
+        """Users with reminders on (enabled and verified), whether due or not (see yearplan.reminder_scheduler)"""
+        return [u for u in self._data.get('users', [])
+                if u.get('reminder_enabled', True) and u.get('is_verified', True)]
+
+    @_fresh
     def get_users_needing_reminders(self):
         """Get all users who need reminders based on their preferences and last reminder sent"""
         users_needing_reminders = []
@@ -739,6 +1342,7 @@ class YearPlanStorage:
         return users_needing_reminders
         return None
 
+    @_fresh
     def is_user_verified(self, user_id: int) -> bool:
         """Check if user is verified"""
         user = self.get_user_by_id(user_id)